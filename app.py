@@ -1,11 +1,17 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, g, Response
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage
 import os
+import signal
+import sys
 import threading
+import time
 from datetime import datetime
 import uuid
 import traceback
 from pathlib import Path
+import hashlib
+import io
 import json
 import tempfile
 
@@ -17,15 +23,25 @@ from backend.data_collection.new_admin_manager import NewAdminManager
 from backend.expense_automation.data_processor import ExpenseDataProcessor
 from backend.expense_automation.groupware_bot import GroupwareAutomation
 from backend.data_collection.config import DateConfig, AccountConfig, ElementConfig
-from backend.preprocessing.anhous_preprocessing import AnhousPreprocessor
-from backend.preprocessing.kolon_preprocessing import KolonPreprocessor
-from backend.preprocessing.sk_preprocessing import SKPreprocessor
-from backend.preprocessing.deciders_preprocessing import DecidersPreprocessor
 from backend.preprocessing.bill_processor import BillProcessor
-from backend.storage.admin_storage import AdminStorage
+from backend.preprocessing.preprocess_jobs import (
+    run_company_preprocessing, PreprocessError, PREPROCESS_STAGES, SUPPORTED_COMPANIES
+)
+from backend.preprocessing.batch_pipeline import run_preprocess_batch
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache
+from backend.storage.admin_storage import create_admin_storage
+from backend.storage.file_catalog import get_file_catalog
+from backend.storage.blob_store import get_blob_store
+from backend.storage.retention import RetentionManager
+from backend.utils.firebase_registry import get_firebase_registry
+from backend.utils.reference_cache import get_reference_cache
+from backend.utils.metrics import registry as metrics_registry, LONG_TASK_BUCKETS, SIZE_BUCKETS
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
+# 앞단 프록시(nginx 등)가 파일을 직접 전송하도록 X-Sendfile 헤더만 반환 (프록시 설정 필요)
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "0") == "1"
 
 # 전역 예외 핸들러 추가
 @app.errorhandler(500)
@@ -61,21 +77,61 @@ def log_response_info(response):
         sys.stdout.flush()
     return response
 
-# 크롤링 모듈 초기화
-db_manager = DatabaseManager()
-login_manager = LoginManager()
-data_manager = DataManager(login_manager)
-new_admin_manager = NewAdminManager(data_manager)
-admin_storage = AdminStorage()
-bill_processor = BillProcessor(admin_storage)
-print("크롤링 시스템 초기화 완료")
+# 요청 지연/처리량 메트릭 (/api/metrics에서 Prometheus 텍스트 포맷으로 노출)
+HTTP_REQUESTS = metrics_registry.counter(
+    "http_requests_total", "라우트별 HTTP 요청 수", ("method", "route", "status"))
+HTTP_ERRORS = metrics_registry.counter(
+    "http_request_errors_total", "5xx 응답 또는 처리되지 않은 예외 수", ("method", "route"))
+HTTP_LATENCY = metrics_registry.histogram(
+    "http_request_duration_seconds", "라우트별 요청 처리 시간(초)", ("method", "route"))
+HTTP_IN_FLIGHT = metrics_registry.gauge(
+    "http_requests_in_flight", "처리 중인 요청 수", ("route",))
+HTTP_RESPONSE_SIZE = metrics_registry.histogram(
+    "http_response_size_bytes", "라우트별 응답 크기(바이트)", ("route",), buckets=SIZE_BUCKETS)
+PREPROCESS_DURATION = metrics_registry.histogram(
+    "preprocess_duration_seconds", "고객사별 전처리 소요 시간(초)", ("company", "result"),
+    buckets=LONG_TASK_BUCKETS)
+CRAWL_DURATION = metrics_registry.histogram(
+    "crawl_duration_seconds", "고객사별 데이터 수집(크롤링) 소요 시간(초)", ("company", "result"),
+    buckets=LONG_TASK_BUCKETS)
+
+
+def _metrics_route():
+    """라벨 카디널리티를 제한하기 위해 실제 경로 대신 라우트 규칙 사용"""
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_route = _metrics_route()
+    HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+
+
+@app.after_request
+def record_response_metrics(response):
+    g.metrics_status = response.status_code
+    if response.content_length is not None:
+        HTTP_RESPONSE_SIZE.observe(response.content_length, route=g.get("metrics_route", _metrics_route()))
+    return response
+
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    route = g.pop("metrics_route")
+    status = g.pop("metrics_status", 500 if exc is not None else 200)
+    HTTP_IN_FLIGHT.dec(route=route)
+    HTTP_LATENCY.observe(time.perf_counter() - started, method=request.method, route=route)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+    if exc is not None or status >= 500:
+        HTTP_ERRORS.inc(method=request.method, route=route)
 
 # 작업 상태 저장
 task_status = {}
 
-print("청구자동화 API 서버 시작")
-print("모드: 실제 크롤링")
-
 # Xvfb는 headless Chrome 모드에서는 필요 없음
 # Chrome이 --headless=new 모드로 실행되므로 가상 디스플레이 불필요
 
@@ -92,21 +148,87 @@ def get_host_ip():
     except:
         return "localhost"
 
-host = get_host_ip()
-print(f"Frontend: http://{host}:3000")
-print(f"Backend API: http://{host}:5001")
+
+def init_services():
+    """
+    크롤링 모듈/저장소/카탈로그 초기화 (서버 시작 시 main()에서 한 번).
+    import만으로는 아무것도 만들지 않으므로 일괄 전처리 워커(spawn)가 app.py를
+    __mp_main__으로 다시 읽어도 Firebase 연결이나 카탈로그 스캔이 반복되지 않는다.
+    """
+    global db_manager, login_manager, data_manager, new_admin_manager
+    global admin_storage, file_catalog, blob_store, retention_manager, bill_processor
+    db_manager = DatabaseManager()
+    login_manager = LoginManager()
+    data_manager = DataManager(login_manager)
+    new_admin_manager = NewAdminManager(data_manager)
+    admin_storage = create_admin_storage()
+    file_catalog = get_file_catalog()
+    blob_store = get_blob_store()
+    retention_manager = RetentionManager(admin_storage)
+    bill_processor = BillProcessor(admin_storage)
+    print("크롤링 시스템 초기화 완료")
+
+# 업로드 슬롯 정리(sanitize_uploaded_files_for_company)가 존재 여부를 확인하는 디렉토리
+UPLOAD_SEARCH_DIRS = (
+    "temp_processing",
+    os.path.join("temp_processing", "kolon_inputs"),
+    "/app/downloads",
+)
+
+def _tag_task_files(filenames, company_name, task_id):
+    """작업이 만든 파일에 고객사/작업 ID 기록 (파일 카탈로그 조회용)"""
+    for filename in filenames:
+        file_catalog.tag(filename, company=company_name, task_id=task_id)
+
+def _directory_state(directories):
+    """디렉토리 mtime 목록 (파일 추가/삭제/이름 변경 시 바뀜)"""
+    state = []
+    for directory in directories:
+        try:
+            state.append(str(os.stat(directory).st_mtime_ns))
+        except OSError:
+            state.append("-")
+    return state
+
+def _make_etag(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def _conditional_json(etag_parts, build_payload, cache_control="no-cache"):
+    """
+    If-None-Match가 현재 ETag와 같으면 본문 생성 없이 304 반환.
+    etag_parts는 호출할 때마다 다시 계산(본문 생성 중 저장소가 바뀌면 새 버전의 ETag를 내려준다).
+    """
+    etag = _make_etag(*etag_parts())
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_payload())
+        etag = _make_etag(*etag_parts())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+COMPANIES_ETAG = _make_etag(json.dumps(AccountConfig.COMPANIES, ensure_ascii=False, sort_keys=True))
 
 @app.route('/api/companies', methods=['GET'])
 def get_companies():
     """고객사 목록 조회"""
     try:
-        return jsonify({
-            "companies": AccountConfig.COMPANIES
-        })
+        # 고객사 목록은 배포 시에만 바뀌므로 짧게 캐시
+        return _conditional_json(
+            lambda: [COMPANIES_ETAG],
+            lambda: {"companies": AccountConfig.COMPANIES},
+            cache_control="public, max-age=300"
+        )
     except Exception as e:
         print(f"고객사 목록 조회 오류: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """요청 지연/처리량, 전처리·크롤링 소요 시간 메트릭 (Prometheus 텍스트 포맷)"""
+    return Response(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """서버 상태 확인"""
@@ -118,7 +240,9 @@ def health_check():
             "database": 'db_manager' in globals(),
             "login_manager": 'login_manager' in globals(),
             "data_manager": 'data_manager' in globals()
-        }
+        },
+        # Firestore/Storage 연결 상태 (결과는 5분간 재사용)
+        "firebase": get_firebase_registry().health_check()
     })
 
 @app.route('/api/auth/login', methods=['POST'])
@@ -500,6 +624,7 @@ def collect_data():
                 
                 # 완료 처리
                 if task_status[task_id]["files"]:
+                    _tag_task_files(task_status[task_id]["files"], company_name, task_id)
                     task_status[task_id]["status"] = "completed"
                     task_status[task_id]["progress"] = 100
                     task_status[task_id]["log"].append("✅ 데이터 수집 완료!")
@@ -521,8 +646,19 @@ def collect_data():
                 task_status[task_id]["error"] = str(e)
                 task_status[task_id]["log"].append(f"심각한 오류 발생: {str(e)}")
         
+        def run_crawling_with_metrics():
+            started = time.perf_counter()
+            try:
+                run_real_crawling()
+            finally:
+                CRAWL_DURATION.observe(
+                    time.perf_counter() - started,
+                    company=company_name,
+                    result=task_status[task_id]["status"]
+                )
+        
         # 백그라운드에서 실행
-        thread = threading.Thread(target=run_real_crawling)
+        thread = threading.Thread(target=run_crawling_with_metrics)
         thread.daemon = True
         thread.start()
         
@@ -542,6 +678,28 @@ def get_task_status(task_id):
     print(f"Task {task_id[:8]}... 상태: {status['status']} ({status['progress']}%)")
     return jsonify(status)
 
+# 고객사별 업로드 슬롯 수 상한 (프론트엔드 fileLabels 최대 5개)
+MAX_UPLOAD_SLOTS = 10
+
+def _upload_target(company_name, file_label, original_filename):
+    """업로드 파일 저장 경로 (코오롱은 kolon_inputs, 나머지는 temp_processing)"""
+    temp_dir = os.path.join("temp_processing", "kolon_inputs") if company_name == "코오롱Fnc" else "temp_processing"
+    os.makedirs(temp_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_company_name = company_name.replace('/', '')  # 슬래시 제거해서 이어붙이기
+    filename = f"{safe_company_name}_{file_label}_{timestamp}_{original_filename}"
+    return filename, os.path.join(temp_dir, filename)
+
+def _store_collected_input(source_path, target_path):
+    """수집 파일을 blob 저장소에 넣고(같은 내용은 한 번만) 작업 디렉토리에 링크"""
+    digest, method = blob_store.store_file(source_path, target_path)
+    print(f"입력 파일 연결({method}): {os.path.basename(target_path)} ← {digest[:12]}")
+
+def _store_uploaded_input(file, target_path):
+    """업로드 스트림을 해싱하며 blob 저장소에 넣고 작업 디렉토리에 링크"""
+    digest, method = blob_store.store_stream(file.stream, target_path)
+    print(f"업로드 파일 연결({method}): {os.path.basename(target_path)} ← {digest[:12]}")
+
 @app.route('/api/upload-file', methods=['POST'])
 def upload_file():
     """파일 업로드 (다중 파일 지원)"""
@@ -550,8 +708,6 @@ def upload_file():
         file_index = request.form.get('file_index', '0')
         file_label = request.form.get('file_label', '')
         
-        kolon_input_dir = os.path.join("temp_processing", "kolon_inputs")
-
         # 자동업로드 모드 (파일이 없는 경우)
         if 'file' not in request.files:
             collected_filename = request.form.get('collected_filename')
@@ -571,15 +727,8 @@ def upload_file():
                 if not os.access(source_path, os.R_OK):
                     return jsonify({"error": f"파일 읽기 권한이 없습니다: {collected_filename}"}), 403
                 
-                # 임시 폴더 생성 (전처리 후 자동 삭제)
-                temp_dir = kolon_input_dir if company_name == "코오롱Fnc" else "temp_processing"
-                os.makedirs(temp_dir, exist_ok=True)
-                
-                # 파일명 생성 (슬래시 제거)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                safe_company_name = company_name.replace('/', '')  # 슬래시 제거해서 이어붙이기
-                filename = f"{safe_company_name}_{file_label}_{timestamp}_{collected_filename}"
-                filepath = os.path.join(temp_dir, filename)
+                # 임시 폴더에 파일명 생성 (전처리 후 자동 삭제, 슬래시 제거)
+                filename, filepath = _upload_target(company_name, file_label, collected_filename)
                 
                 # 중복 처리 방지: 이미 같은 파일이 있으면 건너뛰기
                 if os.path.exists(filepath):
@@ -591,10 +740,9 @@ def upload_file():
                         "message": "이미 업로드된 파일입니다"
                     })
                 
-                # 파일 복사
-                import shutil
+                # 파일 연결 (blob 저장소 경유 하드링크/reflink, 불가하면 복사)
                 try:
-                    shutil.copy2(source_path, filepath)
+                    _store_collected_input(source_path, filepath)
                 except FileNotFoundError:
                     return jsonify({"error": f"원본 파일을 찾을 수 없습니다: {collected_filename}"}), 404
                 except Exception as e:
@@ -614,16 +762,9 @@ def upload_file():
         if file.filename == '':
             return jsonify({"error": "파일명이 없습니다"}), 400
         
-        # 임시 폴더 생성 (전처리 후 자동 삭제)
-        temp_dir = kolon_input_dir if company_name == "코오롱Fnc" else "temp_processing"
-        os.makedirs(temp_dir, exist_ok=True)
-        
         # 파일 저장 (파일 인덱스와 라벨 포함, 슬래시 제거)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_company_name = company_name.replace('/', '')  # 슬래시 제거해서 이어붙이기
-        filename = f"{safe_company_name}_{file_label}_{timestamp}_{file.filename}"
-        filepath = os.path.join(temp_dir, filename)
-        file.save(filepath)
+        filename, filepath = _upload_target(company_name, file_label, file.filename)
+        _store_uploaded_input(file, filepath)
         
 
         
@@ -638,6 +779,94 @@ def upload_file():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/upload-files', methods=['POST'])
+def upload_files():
+    """
+    여러 입력 파일을 한 번의 multipart 요청으로 업로드하고 슬롯을 일괄 등록.
+    form: company_name, replace("true"면 기존 슬롯 초기화),
+          entries(JSON 목록: file_index, file_label, upload_field 또는 collected_filename)
+    업로드 파일은 entries의 upload_field 이름의 파트로 전송한다.
+    """
+    try:
+        company_name = request.form.get('company_name')
+        if not company_name:
+            return jsonify({"error": "회사명이 필요합니다"}), 400
+        try:
+            entries = json.loads(request.form.get('entries') or '[]')
+        except ValueError:
+            return jsonify({"error": "entries 형식이 올바르지 않습니다"}), 400
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            return jsonify({"error": "entries는 객체 목록이어야 합니다"}), 400
+        if not entries:
+            return jsonify({"error": "파일이 없습니다"}), 400
+        # 슬롯 인덱스는 파일을 저장하기 전에 모두 검사 (음수면 마지막 슬롯을 덮어쓰고, 큰 값은 슬롯 목록을 늘림)
+        for entry in entries:
+            try:
+                file_index = int(entry.get('file_index', 0))
+            except (TypeError, ValueError):
+                file_index = -1
+            if not 0 <= file_index < MAX_UPLOAD_SLOTS:
+                return jsonify({"error": f"잘못된 file_index: {entry.get('file_index')} (0~{MAX_UPLOAD_SLOTS - 1})"}), 400
+        replace = request.form.get('replace') == 'true'
+        
+        download_dir = "/app/downloads"
+        slot_files = {}
+        results = []
+        errors = []
+        
+        for entry in entries:
+            file_index = int(entry.get('file_index', 0))
+            file_label = entry.get('file_label', '')
+            collected_filename = entry.get('collected_filename')
+            
+            if collected_filename:
+                source_path = os.path.join(download_dir, os.path.basename(collected_filename))
+                if not os.path.isfile(source_path) or not os.access(source_path, os.R_OK):
+                    errors.append({"file_index": file_index, "error": f"파일을 찾을 수 없습니다: {collected_filename}"})
+                    continue
+                filename, filepath = _upload_target(company_name, file_label, collected_filename)
+                if os.path.exists(filepath):
+                    message = "이미 업로드된 파일입니다"
+                else:
+                    try:
+                        _store_collected_input(source_path, filepath)
+                    except Exception as e:
+                        errors.append({"file_index": file_index, "error": f"파일 복사 중 오류: {str(e)}"})
+                        continue
+                    message = "자동 업로드 완료"
+            else:
+                file = request.files.get(entry.get('upload_field') or '')
+                if file is None or file.filename == '':
+                    errors.append({"file_index": file_index, "error": "파일이 없습니다"})
+                    continue
+                filename, filepath = _upload_target(company_name, file_label, file.filename)
+                _store_uploaded_input(file, filepath)  # 청크 단위로 해싱하며 기록
+                message = "업로드 완료"
+            
+            slot_files[file_index] = filename
+            results.append({
+                "filename": filename,
+                "file_index": file_index,
+                "file_label": file_label,
+                "message": message
+            })
+        
+        # 모든 슬롯을 저장소에 한 번에 기록
+        if slot_files or replace:
+            uploaded_files = admin_storage.update_uploaded_slots(company_name, slot_files, replace=replace)
+        else:
+            uploaded_files = admin_storage.get_uploaded_files().get(company_name, [])
+        
+        return jsonify({
+            "company_name": company_name,
+            "uploaded_files": uploaded_files,
+            "results": results,
+            "errors": errors
+        }), (200 if results else 400)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/auto-upload', methods=['POST'])
 def auto_upload():
     """자동 업로드"""
@@ -669,6 +898,33 @@ def auto_upload():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# /api/download 검색 디렉토리 (앞쪽 우선)
+DOWNLOAD_SEARCH_DIRS = (
+    "/app/downloads",  # 크롤링으로 다운로드된 파일
+    "temp_processing",  # 전처리된 파일
+    os.path.join("temp_processing", "kolon_inputs"),  # 코오롱 업로드 원본
+)
+
+def _send_catalog_file(entry, download_name=None, mimetype=None):
+    """
+    카탈로그 항목을 ETag/Last-Modified, Range, 조건부 요청(304/206/412)을 지원하도록 전송.
+    본문은 wsgi.file_wrapper로 넘기므로 이를 지원하는 WSGI 서버에서는 sendfile로 전송되고,
+    USE_X_SENDFILE=1이면 앞단 프록시가 직접 전송한다.
+    """
+    response = send_file(
+        os.path.abspath(entry["path"]),
+        mimetype=mimetype,
+        as_attachment=download_name is not None,
+        download_name=download_name,
+        conditional=True,
+        etag=True,
+        last_modified=entry["mtime"],
+        max_age=0,
+    )
+    # 대시보드가 반복 요청하므로 매번 재검증(304)하도록 한다.
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
     """파일 다운로드 (다양한 디렉토리에서 검색)"""
@@ -678,43 +934,27 @@ def download_file(filename):
         # URL 디코딩 (공백 등이 %20으로 인코딩되어 있을 수 있음)
         decoded_filename = unquote(filename)
         
-        # 검색할 디렉토리 목록
-        search_dirs = [
-            "/app/downloads",  # 크롤링으로 다운로드된 파일
-            "temp_processing",  # 전처리된 파일
-            os.path.join("temp_processing", "kolon_inputs"),  # 코오롱 업로드 원본
-        ]
-        
-        # 각 디렉토리에서 파일 찾기
-        for search_dir in search_dirs:
-            os.makedirs(search_dir, exist_ok=True)
-            file_path = os.path.join(search_dir, decoded_filename)
+        entry = file_catalog.lookup(decoded_filename, DOWNLOAD_SEARCH_DIRS)
+        if entry is None:
+            # 정확히 일치하는 파일이 없으면 핵심 부분(날짜_회사명_...)이 겹치는 최신 파일 사용
+            decoded_base = decoded_filename.replace(" 청구내역서.xlsx", "").replace(".xlsx", "")
             
-            if os.path.exists(file_path):
-                return send_file(file_path, as_attachment=True, download_name=decoded_filename)
-        
-        # 파일을 찾지 못한 경우 더 유연하게 검색 (부분 일치)
-        print(f"❌ 파일을 찾을 수 없습니다: {decoded_filename}")
-        print(f"   검색한 디렉토리: {search_dirs}")
-        
-        # 부분 일치로 파일 검색
-        for search_dir in search_dirs:
-            if os.path.exists(search_dir):
-                files = os.listdir(search_dir)
-                print(f"   {search_dir}에 있는 파일 수: {len(files)}")
-                
-                # 파일명에서 핵심 부분 추출 (날짜_회사명_...)
-                decoded_base = decoded_filename.replace(" 청구내역서.xlsx", "").replace(".xlsx", "")
-                for f in files:
-                    file_base = f.replace(" 청구내역서.xlsx", "").replace(".xlsx", "")
-                    # 핵심 부분이 일치하면 찾은 것으로 간주
-                    if decoded_base in file_base or file_base in decoded_base:
-                        file_path = os.path.join(search_dir, f)
-                        if os.path.exists(file_path):
-                            print(f"   ✅ 부분 일치 파일 발견: {f}")
-                            return send_file(file_path, as_attachment=True, download_name=decoded_filename)
-        
-        return jsonify({"error": f"파일을 찾을 수 없습니다: {decoded_filename}"}), 404
+            def partial_match(f):
+                file_base = f.replace(" 청구내역서.xlsx", "").replace(".xlsx", "")
+                return decoded_base in file_base or file_base in decoded_base
+            
+            for search_dir in DOWNLOAD_SEARCH_DIRS:
+                candidates = file_catalog.find(directories=[search_dir], match=partial_match)
+                if candidates:
+                    entry = candidates[0]
+                    print(f"   ✅ 부분 일치 파일 발견: {entry['name']}")
+                    break
+        
+        if entry is None:
+            print(f"❌ 파일을 찾을 수 없습니다: {decoded_filename}")
+            return jsonify({"error": f"파일을 찾을 수 없습니다: {decoded_filename}"}), 404
+        
+        return _send_catalog_file(entry, download_name=decoded_filename)
         
     except Exception as e:
         print(f"❌ 다운로드 오류: {e}")
@@ -726,13 +966,11 @@ def download_file(filename):
 def get_bill_image(filename):
     """통신비 PDF 파일 서빙"""
     try:
-        bill_images_dir = "bill_images"
-        file_path = os.path.join(bill_images_dir, filename)
-        
-        if not os.path.exists(file_path):
+        entry = file_catalog.lookup(filename, ["bill_images"])
+        if entry is None:
             return jsonify({"error": f"파일을 찾을 수 없습니다: {filename}"}), 404
         
-        return send_file(file_path, mimetype='application/pdf')
+        return _send_catalog_file(entry, mimetype='application/pdf')
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -741,249 +979,272 @@ def get_bill_image(filename):
 def get_bill_pdf(filename):
     """고지서 PDF 파일 서빙"""
     try:
-        pdf_files_dir = "bill_pdfs"
-        file_path = os.path.join(pdf_files_dir, filename)
-        
-        if not os.path.exists(file_path):
+        entry = file_catalog.lookup(filename, ["bill_pdfs"])
+        if entry is None:
             return jsonify({"error": f"파일을 찾을 수 없습니다: {filename}"}), 404
         
-        return send_file(file_path, mimetype='application/pdf')
+        return _send_catalog_file(entry, mimetype='application/pdf')
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 
+def _apply_preprocess_result(company_name, processed_files, options):
+    """전처리 결과를 저장소에 등록하고 다음 실행용 팝업 기본값을 저장"""
+    if company_name == "SK일렉링크":
+        admin_storage.save_sk_settings(license_cost=int(options.get('license_cost', 80000)))
+    elif company_name == "W컨셉":
+        admin_storage.save_wconcept_settings(
+            license_count=int(options.get('license_count', 40)),
+            license_cost=int(options.get('license_cost', 80000))
+        )
+    # 코오롱은 결과 파일이 없으면 기존 결과를 유지한다.
+    if processed_files or company_name != "코오롱Fnc":
+        save_processed_files(company_name, processed_files)
+
+def _find_running_preprocess_task(company_name):
+    """진행 중인 고객사 전처리 → (task_id, 수집 날짜, 옵션), 없으면 None"""
+    for existing_id, existing in list(task_status.items()):
+        if existing.get("status") not in ("starting", "running"):
+            continue
+        if existing.get("kind") == "preprocess" and existing.get("company") == company_name:
+            return existing_id, existing.get("collection_date"), existing.get("options", {})
+        if existing.get("kind") == "preprocess_batch" and company_name in existing.get("companies", {}):
+            return existing_id, existing.get("collection_date"), existing.get("options", {}).get(company_name, {})
+    return None
+
 @app.route('/api/process-file', methods=['POST'])
 def process_file():
-    """파일 전처리"""
+    """파일 전처리 (백그라운드 작업으로 실행, 진행 상황은 /api/task-status/<task_id>로 조회)"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         company_name = data.get('company_name')
         collection_date = data.get('collection_date')  # YYYY-MM-DD 형식
         
-        print(f"전처리 시작: {company_name}, {collection_date}")
+        print(f"전처리 요청: {company_name}, {collection_date}")
         
         if not all([company_name, collection_date]):
             return jsonify({"error": "필수 파라미터 누락"}), 400
+        if company_name not in SUPPORTED_COMPANIES:
+            return jsonify({"error": f"{company_name}은 전처리를 지원하지 않습니다"}), 400
         
-        # 회사별 전처리 실행
-        if company_name == "앤하우스":
-            preprocessor = AnhousPreprocessor()
-            success = preprocessor.process_anhous_data(collection_date)
-            
-            if success:
-                # 다운로드 폴더에서 생성된 파일명 찾기
-                download_dir = "/app/downloads"
-                os.makedirs(download_dir, exist_ok=True)
-                processed_files = []
-                
-                if os.path.exists(download_dir):
-                    import time
-                    current_time = time.time()
-                    all_files = os.listdir(download_dir)
-                    
-                    for filename in all_files:
-                        # 앤하우스 수수료 청구내역서 파일 찾기
-                        if "앤하우스 수수료 청구내역서_" in filename and filename.endswith(".xlsx"):
-                            file_path = os.path.join(download_dir, filename)
-                            # 최근 5분 이내에 생성된 파일만 포함
-                            if os.path.exists(file_path) and (current_time - os.path.getctime(file_path)) < 300:
-                                processed_files.append(filename)
-                
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": processed_files
-                })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
-                
-        elif company_name == "코오롱Fnc":
-            preprocessor = KolonPreprocessor()
-            uploaded_map = admin_storage.get_uploaded_files()
-            selected_filenames = uploaded_map.get(company_name, [])
-            success = preprocessor.process_kolon_data(
-                collection_date,
-                input_dir=os.path.join("temp_processing", "kolon_inputs"),
-                selected_filenames=selected_filenames
-            )
-            
-            if success:
-                # 코오롱 전처리 결과는 temp_processing에 생성되므로 두 경로를 모두 스캔한다.
-                search_dirs = ["/app/downloads", "temp_processing"]
-                processed_files = []
-
-                import time
-                current_time = time.time()
-
-                for search_dir in search_dirs:
-                    if not os.path.exists(search_dir):
-                        continue
-                    all_files = os.listdir(search_dir)
-                    for filename in all_files:
-                        if (("코오롱_청구내역서_" in filename and filename.endswith(".xlsx")) or
-                            ("OpenAI_정확매칭결과_" in filename and filename.endswith(".csv")) or
-                            ("코오롱FnC_상담솔루션 청구내역서" in filename and filename.endswith(".xlsx"))):
-                            file_path = os.path.join(search_dir, filename)
-                            if os.path.exists(file_path) and (current_time - os.path.getctime(file_path)) < 300:
-                                processed_files.append((filename, os.path.getctime(file_path)))
-                    
-                # 가장 최근 파일들 선택
-                if processed_files:
-                    # 동일 파일명 중복 제거 후 최신순 정렬
-                    latest_by_name = {}
-                    for fname, ctime in processed_files:
-                        if fname not in latest_by_name or ctime > latest_by_name[fname]:
-                            latest_by_name[fname] = ctime
-                    latest_files = sorted(latest_by_name.items(), key=lambda x: x[1], reverse=True)
-                    processed_file_names = [f[0] for f in latest_files]
-                    
-                    # 결과 저장
-                    save_processed_files(company_name, processed_file_names)
-                    
-                    return jsonify({
-                        "message": "전처리 완료",
-                        "company": company_name,
-                        "processed_files": processed_file_names
-                    })
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": []
-                })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
+        options = {
+            key: data[key] for key in ('license_count', 'license_cost') if key in data
+        }
+        if company_name == "코오롱Fnc":
+            options["selected_filenames"] = admin_storage.get_uploaded_files().get(company_name, [])
         
-        elif company_name == "SK일렉링크":
-            preprocessor = SKPreprocessor()
-            license_cost = int(data.get('license_cost', 80000))
-            print(f"SK일렉링크 라이선스 비용: {license_cost:,}원")
-            success = preprocessor.process_sk_data(collection_date, license_cost=license_cost)
-            
-            if success:
-                # 다음 실행 시 기본값으로 보이도록 마지막 사용값 저장
-                admin_storage.save_sk_settings(license_cost=license_cost)
-
-                # SK 전처리 출력은 temp_processing에 생성됨(sk_preprocessing.py).
-                # 앤하우스 등은 /app/downloads만 쓰지만, 코오롱과 동일하게 두 경로를 스캔한다.
-                search_dirs = ["/app/downloads", "temp_processing"]
-                processed_files = []
-
-                import time
-                current_time = time.time()
-
-                for search_dir in search_dirs:
-                    if not os.path.exists(search_dir):
-                        continue
-                    for filename in os.listdir(search_dir):
-                        if ("SK일렉링크" in filename and "청구내역서" in filename and filename.endswith(".xlsx")):
-                            file_path = os.path.join(search_dir, filename)
-                            if os.path.exists(file_path) and (current_time - os.path.getctime(file_path)) < 300:
-                                processed_files.append((filename, os.path.getctime(file_path)))
-
-                if processed_files:
-                    latest_by_name = {}
-                    for fname, ctime in processed_files:
-                        if fname not in latest_by_name or ctime > latest_by_name[fname]:
-                            latest_by_name[fname] = ctime
-                    processed_files = sorted(latest_by_name.keys(), key=lambda f: latest_by_name[f], reverse=True)
-                else:
-                    processed_files = []
-
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": processed_files
-                })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
-
-        elif company_name == "W컨셉":
-            # W컨셉은 라이선스 수량이 필요
-            license_count = int(data.get('license_count', 40))
-            license_cost = int(data.get('license_cost', 80000))
-            print(f"W컨셉 라이선스 수량: {license_count}개")
-            print(f"W컨셉 라이선스 비용: {license_cost:,}원")
-            
-            processed_files = bill_processor.process_wconcept(collection_date, license_count, license_cost)
-            
-            if processed_files:
-                # 다음 실행 시 기본값으로 보이도록 마지막 사용값 저장
-                admin_storage.save_wconcept_settings(
-                    license_count=license_count,
-                    license_cost=license_cost
+        # 같은 고객사 전처리가 진행 중이면: 같은 날짜/옵션이면 기존 작업 ID 반환, 다르면 409
+        running = _find_running_preprocess_task(company_name)
+        if running:
+            running_task_id, running_date, running_options = running
+            if running_date == collection_date and running_options == options:
+                return jsonify({"task_id": running_task_id, "status": "running"}), 202
+            return jsonify({
+                "error": "다른 조건으로 전처리가 진행 중입니다",
+                "task_id": running_task_id,
+                "running": {"collection_date": running_date, "options": running_options}
+            }), 409
+        
+        task_id = str(uuid.uuid4())
+        task_status[task_id] = {
+            "kind": "preprocess",
+            "status": "starting",
+            "company": company_name,
+            "collection_date": collection_date,
+            "options": options,
+            "stage": None,
+            "files": [],
+            "processed_files": [],
+            "progress": 0,
+            "log": [f" {company_name} 전처리 시작"]
+        }
+        
+        def on_progress(stage):
+            progress, message = PREPROCESS_STAGES.get(stage, (None, stage))
+            status = task_status[task_id]
+            if status["stage"] == stage:
+                return
+            status["stage"] = stage
+            if progress is not None:
+                status["progress"] = max(status["progress"], progress)
+            status["log"].append(f"{message}...")
+        
+        def run_preprocessing():
+            started = time.perf_counter()
+            result = "failure"
+            try:
+                task_status[task_id]["status"] = "running"
+                processed_files = run_company_preprocessing(
+                    company_name, collection_date, options, progress_callback=on_progress,
+                    context=BillingContext(admin_storage)
                 )
-
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
+                _apply_preprocess_result(company_name, processed_files, options)
+                _tag_task_files(processed_files, company_name, task_id)
+                task_status[task_id].update({
+                    "status": "completed",
+                    "progress": 100,
+                    "files": processed_files,
                     "processed_files": processed_files
                 })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
-
-        elif company_name == "매스프레소(콴다)":
-            processed_files = bill_processor.process_mathpresso(collection_date)
-            
-            if processed_files:
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": processed_files
-                })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
+                task_status[task_id]["log"].append(f"✅ 전처리 완료: {len(processed_files)}개 파일")
+                result = "success"
+            except Exception as e:
+                if not isinstance(e, PreprocessError):
+                    traceback.print_exc()
+                print(f" 전처리 오류: {e}")
+                task_status[task_id].update({"status": "failed", "progress": 100, "error": str(e)})
+                task_status[task_id]["log"].append(f"❌ 전처리 실패: {str(e)}")
+            finally:
+                PREPROCESS_DURATION.observe(time.perf_counter() - started, company=company_name, result=result)
+        
+        thread = threading.Thread(target=run_preprocessing)
+        thread.daemon = True
+        thread.start()
+        
+        return jsonify({"task_id": task_id, "status": "started"}), 202
+        
+    except Exception as e:
+        print(f" 전처리 요청 오류: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        elif company_name == "디싸이더스/애드프로젝트":
-            # 디싸이더스/애드프로젝트 전용 전처리
-            preprocessor = DecidersPreprocessor()
-            processed_files = preprocessor.process_deciders_data(collection_date)
-            
-            if processed_files:
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": processed_files
-                })
+def _default_batch_options(company_name):
+    """일괄 전처리에서 옵션이 없으면 마지막 실행 팝업 기본값 사용"""
+    if company_name == "W컨셉":
+        settings = admin_storage.get_wconcept_settings()
+        return {"license_count": settings["license_count"], "license_cost": settings["license_cost"]}
+    if company_name == "SK일렉링크":
+        return {"license_cost": admin_storage.get_sk_settings()["license_cost"]}
+    if company_name == "코오롱Fnc":
+        return {"selected_filenames": admin_storage.get_uploaded_files().get(company_name, [])}
+    return {}
+
+@app.route('/api/process-batch', methods=['POST'])
+def process_batch():
+    """
+    월마감 일괄 전처리 (고지서 → 고객사별 전처리 → 결과 등록).
+    JSON 또는 multipart(files[]에 고지서 HTML/PDF) 요청, 진행 상황은 /api/task-status/<task_id>로 조회
+    """
+    try:
+        if request.files:
+            data = request.form.to_dict()
+            for key in ('companies', 'options'):
+                if data.get(key):
+                    data[key] = json.loads(data[key])
+        else:
+            data = request.get_json() or {}
+        
+        collection_date = data.get('collection_date')
+        companies = data.get('companies') or list(SUPPORTED_COMPANIES)
+        if not collection_date:
+            return jsonify({"error": "필수 파라미터 누락"}), 400
+        unsupported = [name for name in companies if name not in SUPPORTED_COMPANIES]
+        if unsupported:
+            return jsonify({"error": f"전처리를 지원하지 않는 고객사: {', '.join(unsupported)}"}), 400
+        
+        running = {name: _find_running_preprocess_task(name) for name in companies}
+        running = {name: found[0] for name, found in running.items() if found}
+        if running:
+            return jsonify({"error": "전처리가 진행 중인 고객사가 있습니다", "running_tasks": running}), 409
+        
+        # 업로드 스트림은 요청이 끝나면 닫히므로 백그라운드 작업용으로 메모리에 복사
+        bill_files = [
+            FileStorage(stream=io.BytesIO(f.read()), filename=f.filename)
+            for f in request.files.getlist('files[]')
+            if f.filename.endswith(('.html', '.pdf'))
+        ]
+        
+        options_by_company = {}
+        request_options = data.get('options') or {}
+        for name in companies:
+            options = _default_batch_options(name)
+            options.update(request_options.get(name) or {})
+            options_by_company[name] = options
+        
+        task_id = str(uuid.uuid4())
+        task_status[task_id] = {
+            "kind": "preprocess_batch",
+            "status": "starting",
+            "collection_date": collection_date,
+            "bills": "pending" if bill_files else "skipped",
+            "options": options_by_company,
+            "companies": {name: {"status": "pending", "processed_files": [], "error": None} for name in companies},
+            "files": [],
+            "progress": 0,
+            "log": [f" 일괄 전처리 시작: {len(companies)}개 고객사"]
+        }
+        
+        started_at = {}
+        
+        def on_update(name, status, detail):
+            batch = task_status[task_id]
+            if name == "bills":
+                batch["bills"] = status
+                batch["log"].append(f"고지서 처리 {status}")
+                return
+            batch["companies"][name]["status"] = status
+            if status == "running":
+                started_at[name] = time.perf_counter()
+                batch["log"].append(f"{name} 전처리 실행")
+                return
+            if status == "completed":
+                # 결과 등록은 완료되는 즉시 부모 프로세스에서 수행
+                _apply_preprocess_result(name, detail["processed_files"], options_by_company[name])
+                _tag_task_files(detail["processed_files"], name, task_id)
+                batch["companies"][name]["processed_files"] = detail["processed_files"]
+                batch["files"].extend(detail["processed_files"])
+                batch["log"].append(f"✅ {name} 전처리 완료: {len(detail['processed_files'])}개 파일")
             else:
-                return jsonify({"error": "전처리 실패"}), 500
-
-        elif company_name == "구쁘":
-            processed_files = bill_processor.process_guppu(collection_date)
-            
-            if processed_files:
-                # 결과 저장
-                save_processed_files(company_name, processed_files)
-                
-                return jsonify({
-                    "message": "전처리 완료",
-                    "company": company_name,
-                    "processed_files": processed_files
+                batch["companies"][name]["error"] = detail.get("error")
+                batch["log"].append(f"❌ {name} 전처리 실패: {detail.get('error')}")
+            if name in started_at:
+                PREPROCESS_DURATION.observe(
+                    time.perf_counter() - started_at.pop(name), company=name,
+                    result="success" if status == "completed" else "failure"
+                )
+            finished = sum(1 for c in batch["companies"].values() if c["status"] in ("completed", "failed"))
+            batch["progress"] = int(finished * 100 / len(companies))
+        
+        def process_batch_bills():
+            results = bill_processor.process_mixed_files(bill_files)
+            # 워커에는 스냅샷을 넘기지만 스냅샷 밖의 값을 읽는 경우에 대비해 지연 쓰기 버퍼도 반영
+            admin_storage.flush()
+            return results
+        
+        def run_batch():
+            try:
+                task_status[task_id]["status"] = "running"
+                admin_storage.flush()
+                results = run_preprocess_batch(
+                    collection_date, companies, options_by_company,
+                    process_bills=process_batch_bills if bill_files else None,
+                    on_update=on_update, storage=admin_storage
+                )
+                failed = [name for name, result in results.items() if result["status"] != "completed"]
+                task_status[task_id].update({
+                    "status": "failed" if len(failed) == len(companies) else "completed",
+                    "progress": 100,
+                    "failed_companies": failed
                 })
-            else:
-                return jsonify({"error": "전처리 실패"}), 500
-        else:
-            return jsonify({"error": f"{company_name}은 전처리를 지원하지 않습니다"}), 400
+                if failed:
+                    task_status[task_id]["error"] = f"전처리 실패: {', '.join(failed)}"
+                task_status[task_id]["log"].append(
+                    f"일괄 전처리 종료: 성공 {len(companies) - len(failed)}개, 실패 {len(failed)}개"
+                )
+            except Exception as e:
+                traceback.print_exc()
+                task_status[task_id].update({"status": "failed", "progress": 100, "error": str(e)})
+                task_status[task_id]["log"].append(f"❌ 일괄 전처리 오류: {str(e)}")
+        
+        thread = threading.Thread(target=run_batch)
+        thread.daemon = True
+        thread.start()
+        
+        return jsonify({"task_id": task_id, "status": "started"}), 202
         
     except Exception as e:
-        print(f" 전처리 오류: {e}")
+        print(f" 일괄 전처리 요청 오류: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/upload-bills', methods=['POST'])
@@ -1019,8 +1280,10 @@ def upload_bills():
 def get_bill_amounts():
     """각 고객사별 통신비 조회"""
     try:
-        amounts = bill_processor.get_bill_amounts()
-        return jsonify(amounts)
+        return _conditional_json(
+            lambda: ["bill_amounts", admin_storage.get_generation()],
+            bill_processor.get_bill_amounts
+        )
     except Exception as e:
         print(f"통신비 조회 오류: {e}")
         return jsonify({"error": str(e)}), 500
@@ -1041,11 +1304,7 @@ def sanitize_uploaded_files_for_company(company_name):
     if not isinstance(company_files, list):
         company_files = []
 
-    search_dirs = [
-        "temp_processing",
-        os.path.join("temp_processing", "kolon_inputs"),
-        "/app/downloads",
-    ]
+    search_dirs = UPLOAD_SEARCH_DIRS
 
     changed = False
     sanitized_files = []
@@ -1055,14 +1314,7 @@ def sanitize_uploaded_files_for_company(company_name):
             sanitized_files.append(None)
             continue
 
-        file_exists = False
-        for search_dir in search_dirs:
-            file_path = os.path.join(search_dir, filename)
-            if os.path.exists(file_path):
-                file_exists = True
-                break
-
-        if file_exists:
+        if file_catalog.exists(filename, search_dirs):
             sanitized_files.append(filename)
         else:
             sanitized_files.append(None)
@@ -1076,7 +1328,7 @@ def sanitize_uploaded_files_for_company(company_name):
 @app.route('/api/get-processed-files', methods=['GET'])
 def get_processed_files():
     """저장된 청구서 결과 및 파일 목록 조회"""
-    try:
+    def build_payload():
         processed_files = admin_storage.get_processed_files()
         uploaded_files = admin_storage.get_uploaded_files()
         for company_name in list(uploaded_files.keys()):
@@ -1084,11 +1336,18 @@ def get_processed_files():
             if changed:
                 uploaded_files[company_name] = sanitized_files
         collected_files = admin_storage.get_collected_files()
-        return jsonify({
+        return {
             "processed_files": processed_files,
             "uploaded_files": uploaded_files,
             "collected_files": collected_files
-        })
+        }
+
+    try:
+        # 저장소가 그대로이고 업로드 디렉토리에 파일 추가/삭제가 없으면 슬롯 정리 결과도 같다.
+        return _conditional_json(
+            lambda: ["processed_files", admin_storage.get_generation(), *_directory_state(UPLOAD_SEARCH_DIRS)],
+            build_payload
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1183,34 +1442,30 @@ def remove_uploaded_file():
         except Exception:
             return jsonify({"error": "파일 인덱스가 올바르지 않습니다"}), 400
 
-        uploaded_map = admin_storage.get_uploaded_files()
-        company_files = uploaded_map.get(company_name, [])
-        if not isinstance(company_files, list):
-            company_files = []
+        # 슬롯 조회와 비우기를 한 트랜잭션으로 처리 (동시 업로드와 섞여도 유실 없음)
+        with admin_storage.transaction() as storage_data:
+            uploaded_map = storage_data.setdefault("uploaded_files", {})
+            company_files = uploaded_map.get(company_name, [])
+            if not isinstance(company_files, list):
+                company_files = []
 
-        if file_index < 0 or file_index >= len(company_files):
-            return jsonify({"error": "파일 인덱스 범위를 벗어났습니다"}), 400
+            if file_index < 0 or file_index >= len(company_files):
+                return jsonify({"error": "파일 인덱스 범위를 벗어났습니다"}), 400
 
-        target_filename = filename or company_files[file_index]
-        company_files[file_index] = None
-        admin_storage.save_uploaded_files(company_name, company_files)
+            target_filename = filename or company_files[file_index]
+            company_files[file_index] = None
+            uploaded_map[company_name] = company_files
 
         deleted = False
         if target_filename:
-            search_dirs = [
-                "temp_processing",
-                os.path.join("temp_processing", "kolon_inputs"),
-                "/app/downloads",
-            ]
-            for search_dir in search_dirs:
-                file_path = os.path.join(search_dir, target_filename)
-                if os.path.exists(file_path) and os.path.isfile(file_path):
-                    try:
-                        os.remove(file_path)
-                        deleted = True
-                        break
-                    except Exception:
-                        pass
+            entry = file_catalog.lookup(target_filename, UPLOAD_SEARCH_DIRS)
+            if entry:
+                try:
+                    os.remove(entry["path"])
+                    file_catalog.invalidate(entry["path"])
+                    deleted = True
+                except Exception:
+                    pass
 
         return jsonify({
             "success": True,
@@ -1510,6 +1765,76 @@ def expense_automation():
             "traceback": error_traceback[:500] if len(error_traceback) > 500 else error_traceback
         }), 500
 
+@app.route('/api/templates', methods=['GET'])
+def get_templates():
+    """청구서 템플릿 캐시 상태 (generation/md5, 마지막 확인 시각)"""
+    template_cache = get_template_cache()
+    return jsonify({"ttl_sec": template_cache.ttl, "templates": template_cache.status()})
+
+@app.route('/api/templates/refresh', methods=['POST'])
+def refresh_templates():
+    """템플릿 캐시 강제 갱신 (body: {"names": [...]} 생략 시 캐시된 전체)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        results = get_template_cache().refresh(data.get("names"))
+        return jsonify({"results": results})
+    except Exception as e:
+        print(f"템플릿 캐시 갱신 오류: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/reference-cache', methods=['GET'])
+def get_reference_cache_status():
+    """Firestore 참조 데이터 캐시 상태 (키별 경과 시간, 감시 중인 컬렉션)"""
+    return jsonify(get_reference_cache().status())
+
+@app.route('/api/reference-cache/invalidate', methods=['POST'])
+def invalidate_reference_cache():
+    """참조 데이터 캐시 무효화 (body: {"prefix": "dept_codes"} 생략 시 전체)"""
+    data = request.get_json(silent=True) or {}
+    return jsonify({"invalidated": get_reference_cache().invalidate(data.get("prefix") or None)})
+
+@app.route('/api/retention', methods=['GET'])
+def get_retention_report():
+    """보관 정책 리포트: 마지막 실행 결과와 현재 기준 삭제 예정 목록(dry run)"""
+    try:
+        return jsonify({
+            "budgets": retention_manager.budgets,
+            "last_run": retention_manager.last_report,
+            "pending": retention_manager.run_once(dry_run=True)
+        })
+    except Exception as e:
+        print(f"보관 정책 리포트 오류: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/retention/run', methods=['POST'])
+def run_retention():
+    """보관 정책 즉시 실행 (body: {"dry_run": true}이면 삭제하지 않고 대상만 반환)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        return jsonify(retention_manager.run_once(dry_run=bool(data.get("dry_run"))))
+    except Exception as e:
+        print(f"보관 정책 실행 오류: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admin-storage/export', methods=['GET'])
+def export_admin_storage():
+    """어드민 데이터를 admin_storage.json 형식으로 내려받기 (SQLite 저장소는 내보내기 후 전송)"""
+    try:
+        if hasattr(admin_storage, "export_json"):
+            export_path = admin_storage.export_json()
+        else:
+            admin_storage.flush()  # 지연 쓰기 중인 변경 반영 후 파일 그대로 전송
+            export_path = admin_storage.storage_file
+        return send_file(
+            os.path.abspath(export_path),
+            mimetype="application/json",
+            as_attachment=True,
+            download_name=os.path.basename(export_path)
+        )
+    except Exception as e:
+        print(f"어드민 데이터 내보내기 오류: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/reset', methods=['POST'])
 def reset_data():
     """초기화: temp_processing·bill_images 임시 파일 삭제, admin_storage는 금액·처리 결과 등만 비움(대표이사명 유지)."""
@@ -1531,11 +1856,25 @@ def reset_data():
                         print(f"파일 삭제 실패: {file_path}, 오류: {e}")
         
         # 1. 디렉토리들 비우기 (어드민 JSON은 남기고 clear_all로 내용만 정리)
-        clear_directory("temp_processing", exclude_filenames={"admin_storage.json"})
+        storage_name = os.path.basename(admin_storage.storage_file)
+        clear_directory("temp_processing", exclude_filenames={
+            "admin_storage.json", storage_name,
+            f"{storage_name}.lock", f"{storage_name}-wal", f"{storage_name}-shm"
+        })
         clear_directory("bill_images")
         
         # 2. admin_storage.json 초기화 (청구서 공통/대표이사명은 유지, Firestore 백업과도 일치)
+        #    SQLite 저장소는 비우기 전에 JSON으로 백업 (temp_processing/backups)
+        if hasattr(admin_storage, "export_json"):
+            try:
+                admin_storage.export_json()
+            except Exception as e:
+                print(f"초기화 전 어드민 데이터 백업 실패: {e}")
         admin_storage.clear_all()
+        admin_storage.flush()
+        
+        # 3. 작업 디렉토리 링크가 모두 지워진 입력 blob 정리
+        blob_store.collect_garbage()
         
         return jsonify({
             "success": True,
@@ -1550,5 +1889,28 @@ def reset_data():
             "error": "초기화 중 오류가 발생했습니다."
         }), 500
 
+def main():
+    init_services()
+    print("청구자동화 API 서버 시작")
+    print("모드: 실제 크롤링")
+    host = get_host_ip()
+    print(f"Frontend: http://{host}:3000")
+    print(f"Backend API: http://{host}:5001")
+    # docker stop(SIGTERM)에도 atexit이 실행되도록 정상 종료로 전환 (지연 쓰기 버퍼 반영)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # 작업 디렉토리 보관 정책 (RETENTION_INTERVAL_SEC, 0이면 끔)
+    retention_manager.start(int(os.environ.get("RETENTION_INTERVAL_SEC", "3600") or 0))
+    # 청구서 템플릿을 미리 받아 첫 전처리의 다운로드 대기를 없앤다
+    threading.Thread(target=get_template_cache().warm_up, name="template-warm-up", daemon=True).start()
+    # 참조 데이터(부서 코드/계정) 변경을 스냅샷 리스너로 감시해 즉시 무효화 (REFERENCE_CACHE_WATCH=0이면 TTL만 사용)
+    if os.environ.get("REFERENCE_CACHE_WATCH", "1") != "0":
+        try:
+            firestore_client = get_firebase_registry().firestore()
+            get_reference_cache().watch(firestore_client.collection("dept_codes"), "dept_codes")
+            get_reference_cache().watch(firestore_client.collection("accounts"), "accounts:")
+        except Exception as e:
+            print(f"참조 데이터 변경 감시 시작 실패 (TTL만 사용): {e}")
+    app.run(host='0.0.0.0', port=5001, debug=False)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=False)
\ No newline at end of file
+    main()
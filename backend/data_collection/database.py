@@ -1,19 +1,30 @@
 import hashlib
-import firebase_admin
-from firebase_admin import credentials, firestore
-from backend.utils.secrets_manager import get_firebase_secret
+from firebase_admin import firestore
+from backend.utils.firebase_registry import get_firebase_registry
+from backend.utils.reference_cache import get_reference_cache
 
 class DatabaseManager:
     """Firebase 데이터베이스 관리"""
     
     def __init__(self):
-        self.db = None
+        self.firebase_available = False
         try:
-            self.db = self._initialize_firebase()
+            self._initialize_firebase()
+            self.firebase_available = True
         except Exception as e:
             print(f"⚠️ Firebase 초기화 실패 (로컬 개발 환경일 수 있음): {e}")
             print("   Firebase 기능은 사용할 수 없지만, 다른 기능은 정상 작동합니다.")
-            self.db = None
+
+    @property
+    def db(self):
+        """공용 Firestore 클라이언트 (상태 확인 실패로 재연결되면 새 클라이언트를 반환)"""
+        if not self.firebase_available:
+            return None
+        try:
+            return get_firebase_registry().firestore()
+        except Exception as e:
+            print(f"⚠️ Firestore 연결 실패: {e}")
+            return None
 
     @staticmethod
     def _hash_password(password):
@@ -21,17 +32,11 @@ class DatabaseManager:
         return hashlib.sha256(password.encode('utf-8')).hexdigest()
     
     def _initialize_firebase(self):
-        """Firebase 초기화"""
-        if not firebase_admin._apps:
-            # AWS Secrets Manager에서 Firebase 키 가져오기
-            cred_dict = get_firebase_secret()
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-        
-        return firestore.client()
+        """Firebase 초기화 (전처리기와 같은 프로세스 공용 연결 사용)"""
+        return get_firebase_registry().firestore()
     
     def get_accounts_by_type(self, account_type):
-        """타입별 계정 조회"""
+        """타입별 계정 조회 (참조 데이터 캐시 사용, 계정 추가/수정/삭제 시 무효화)"""
         if self.db is None:
             print("⚠️ Firebase가 초기화되지 않아 빈 리스트를 반환합니다.")
             return []
@@ -39,29 +44,34 @@ class DatabaseManager:
         from backend.data_collection.config import AccountConfig
         
         if account_type == "sms":
-            companies = list(AccountConfig.SMS_CONFIG.keys())
             config_map = AccountConfig.SMS_CONFIG
         else:  # call
-            companies = list(AccountConfig.CALL_CONFIG.keys())
             config_map = AccountConfig.CALL_CONFIG
         
+        accounts_by_company = get_reference_cache().get(
+            f"accounts:{account_type}", lambda: self._load_accounts_by_company(account_type)
+        )
         accounts = []
-        for company in companies:
-            docs = self.db.collection("accounts") \
-                .where("company_name", "==", company) \
-                .where("account_type", "==", account_type) \
-                .get()
-            if docs:
-                account = docs[0].to_dict()
-                if account is not None:
-                    account['config'] = config_map.get(company)
-                    accounts.append(account)
-                    print(f"  {company} {account_type.upper()} 계정 로드")
-                else:
-                    print(f"  {company} {account_type.upper()} 계정 데이터가 없습니다.")
+        for company, config in config_map.items():
+            account = accounts_by_company.get(company)
+            if account is not None:
+                account['config'] = config
+                accounts.append(account)
+                print(f"  {company} {account_type.upper()} 계정 로드")
         
         return accounts
     
+    def _load_accounts_by_company(self, account_type):
+        """account_type 계정을 한 번의 쿼리로 조회 → {회사명: 계정} (회사별 첫 문서)"""
+        accounts_by_company = {}
+        docs = self.db.collection("accounts").where("account_type", "==", account_type).get()
+        for doc in docs:
+            account = doc.to_dict()
+            if account is None:
+                continue
+            accounts_by_company.setdefault(account.get("company_name"), account)
+        return accounts_by_company
+    
     def get_all_accounts(self):
         """모든 계정 정보 조회"""
         if self.db is None:
@@ -84,6 +94,7 @@ class DatabaseManager:
             return accounts
         except Exception as e:
             print(f"❌ 모든 계정 조회 오류: {e}")
+            get_firebase_registry().report_error(e)
             import traceback
             traceback.print_exc()
             return []
@@ -105,10 +116,12 @@ class DatabaseManager:
             }
             
             doc_ref = self.db.collection("accounts").add(account_data)
+            get_reference_cache().invalidate("accounts:")
             print(f"✅ 계정 추가 완료: {company_name} ({account_type})")
             return doc_ref[1].id
         except Exception as e:
             print(f"❌ 계정 추가 오류: {e}")
+            get_firebase_registry().report_error(e)
             raise e
     
     def update_account_legacy(self, account_id, company_name, account_type, url, username, password, notes="", status="active"):
@@ -128,9 +141,11 @@ class DatabaseManager:
             }
             
             self.db.collection("accounts").document(account_id).update(account_data)
+            get_reference_cache().invalidate("accounts:")
             print(f"✅ 계정 수정 완료: {company_name} ({account_type})")
         except Exception as e:
             print(f"❌ 계정 수정 오류: {e}")
+            get_firebase_registry().report_error(e)
             raise e
     
     def delete_account(self, account_id):
@@ -139,9 +154,11 @@ class DatabaseManager:
             raise Exception("Firebase가 초기화되지 않았습니다.")
         try:
             self.db.collection("accounts").document(account_id).delete()
+            get_reference_cache().invalidate("accounts:")
             print(f"✅ 계정 삭제 완료: {account_id}")
         except Exception as e:
             print(f"❌ 계정 삭제 오류: {e}")
+            get_firebase_registry().report_error(e)
             raise e
     
     def get_account_by_id(self, account_id):
@@ -158,6 +175,7 @@ class DatabaseManager:
                 return None
         except Exception as e:
             print(f"❌ 계정 조회 오류: {e}")
+            get_firebase_registry().report_error(e)
             return None
     
     def add_account(self, account_data):
@@ -177,10 +195,12 @@ class DatabaseManager:
             doc_ref = self.db.collection("accounts").document(custom_id)
             doc_ref.set(account_data)
             
+            get_reference_cache().invalidate("accounts:")
             print(f"✅ 계정 추가 완료: {company_name} ({account_type}) - ID: {custom_id}")
             return custom_id
         except Exception as e:
             print(f"❌ 계정 추가 오류: {e}")
+            get_firebase_registry().report_error(e)
             raise e
     
     def update_account(self, account_id, account_data):
@@ -190,9 +210,11 @@ class DatabaseManager:
         try:
             account_data['updated_at'] = firestore.SERVER_TIMESTAMP
             self.db.collection("accounts").document(account_id).update(account_data)
+            get_reference_cache().invalidate("accounts:")
             print(f"✅ 계정 수정 완료: {account_data.get('company_name')} ({account_data.get('account_type')})")
         except Exception as e:
             print(f"❌ 계정 수정 오류: {e}")
+            get_firebase_registry().report_error(e)
             raise e
 
     def authenticate_admin_user(self, employee_id, password):
@@ -258,6 +280,7 @@ class DatabaseManager:
             }
         except Exception as e:
             print(f"⚠️ Firestore 청구서 공통 설정 조회 실패: {e}")
+            get_firebase_registry().report_error(e)
             return None
 
     def save_invoice_common_settings_firestore(self, ceo_name):
@@ -278,4 +301,5 @@ class DatabaseManager:
             return True
         except Exception as e:
             print(f"⚠️ Firestore 청구서 공통 설정 저장 실패: {e}")
+            get_firebase_registry().report_error(e)
             return False
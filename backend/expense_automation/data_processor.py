@@ -1,6 +1,7 @@
 import pandas as pd
 from datetime import datetime
 from .config import ExpenseConfig
+from ..preprocessing.excel_reader import read_excel
 
 class ExpenseDataProcessor:
     """지출결의서 데이터 처리 클래스"""
@@ -32,7 +33,7 @@ class ExpenseDataProcessor:
                 
                 raise Exception("지원되는 인코딩으로 파일을 읽을 수 없습니다")
             else:
-                return pd.read_excel(file_path)
+                return read_excel(file_path)
         except Exception as e:
             raise Exception(f"파일을 읽을 수 없습니다: {e}")
     
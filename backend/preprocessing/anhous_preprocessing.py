@@ -1,141 +1,78 @@
 import os
 import re
-import shutil
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from io import StringIO
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
+from backend.preprocessing.ingestion import load_table
+from backend.storage.file_catalog import get_file_catalog
 import calendar
 
 class AnhousPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print(" Firebase Storage 연결 완료")
         except Exception as e:
             print(f" Firebase 연결 실패: {e}")
             self.bucket = None
     
-    def convert_xls_to_csv(self, xls_file_path):
-        """XLS/XLSX 파일을 CSV로 변환"""
-        try:
-            print(f"🔍 변환 시작: {os.path.basename(xls_file_path)}")
-            print(f"   원본 파일: {xls_file_path}")
-            
-            # 파일 확장자 확인
-            if xls_file_path.endswith('.xlsx'):
-                # Excel 파일 처리
-                print(f"   Excel 파일로 읽기 시도...")
-                df = pd.read_excel(xls_file_path)
-                print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                print(f"   컬럼: {list(df.columns)}")
-                csv_path = xls_file_path.replace('.xlsx', '.csv')
-                df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                print(f" Excel → .csv 변환 완료: {csv_path}")
-                return csv_path
-            else:
-                # XLS 파일 처리 (HTML 내용인지 확인)
-                try:
-                    with open(xls_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # HTML 내용인지 확인
-                    if '<html' in content.lower() or '<table' in content.lower():
-                        # HTML 테이블 파싱
-                        df = pd.read_html(StringIO(content))[0]
-                        
-                        # 첫 번째 행이 제목인 경우 제거
-                        if df.shape[0] > 0 and '통화내역' in str(df.iloc[0, 0]):
-                            df = df.iloc[1:]
-                        
-                        # 헤더 설정
-                        if df.shape[0] > 0:
-                            df.columns = df.iloc[0]
-                            df = df.iloc[1:]
-                        
-                        # CSV로 저장
-                        csv_path = xls_file_path.replace('.xls', '.csv')
-                        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                        print(f" HTML → .csv 변환 완료: {csv_path}")
-                        return csv_path
-                    else:
-                        # 일반 Excel 파일 처리
-                        df = pd.read_excel(xls_file_path)
-                        csv_path = xls_file_path.replace('.xls', '.csv')
-                        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                        print(f" Excel → .csv 변환 완료: {csv_path}")
-                        return csv_path
-                except UnicodeDecodeError:
-                    # 인코딩 오류 시 Excel로 읽기 시도
-                    df = pd.read_excel(xls_file_path)
-                    csv_path = xls_file_path.replace('.xls', '.csv')
-                    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                    print(f" Excel → .csv 변환 완료: {csv_path}")
-                    return csv_path
-                
-        except Exception as e:
-            print(f" 변환 실패: {xls_file_path}, 오류: {e}")
-            return None
+    @staticmethod
+    def _prepare_export(df, fmt):
+        """HTML 표 내보내기(.xls): 제목 행(통화내역) 제거 후 첫 행을 헤더로 사용"""
+        if fmt != "html":
+            return df
+        if df.shape[0] > 0 and '통화내역' in str(df.iloc[0, 0]):
+            df = df.iloc[1:]
+        if df.shape[0] > 0:
+            df.columns = df.iloc[0]
+            df = df.iloc[1:]
+        return df
     
-    def convert_all_collected_files(self):
-        """업로드된 파일들만 CSV로 변환"""
-        csv_files = []
+    def load_export(self, file_path, dtype=None, schema=None):
+        """수집 파일을 DataFrame으로 로드 (형식 판별 + 표 캐시)"""
+        return load_table(file_path, dtype=dtype, prepare=self._prepare_export, schema=schema)
+    
+    def collect_input_files(self):
+        """업로드된 앤하우스 수집 파일 (최신 SMS, CALL 2개)"""
+        input_files = []
         
         temp_dir = "temp_processing"
         if os.path.exists(temp_dir):
-            anhous_files = []
-            for filename in os.listdir(temp_dir):
-                if "앤하우스" in filename and filename.endswith((".xls", ".xlsx")):
-                    file_path = os.path.join(temp_dir, filename)
-                    anhous_files.append((file_path, os.path.getmtime(file_path)))
+            anhous_files = get_file_catalog().find(
+                directories=[temp_dir], time_key="mtime",
+                match=lambda f: "앤하우스" in f and f.endswith((".xls", ".xlsx"))
+            )
             
             # 최신 파일 2개만 선택 (SMS, CALL)
-            anhous_files.sort(key=lambda x: x[1], reverse=True)
-            latest_files = anhous_files[:2]
-            
-            for file_path, _ in latest_files:
-                csv_path = self.convert_xls_to_csv(file_path)
-                if csv_path:
-                    csv_files.append(csv_path)
+            for entry in anhous_files[:2]:
+                input_files.append(entry["path"])
         
-        return csv_files
+        return input_files
     
     def find_anhous_templates(self):
         """Firebase Storage에서 앤하우스 템플릿 파일들 찾기"""
         if not self.bucket:
             return []
         
-        templates = []
-        blobs = self.bucket.list_blobs()
+        try:
+            # 버킷 전체 대신 annhouse 접두어 목록만 조회 (TTL 동안 캐시)
+            templates = get_template_cache().list_templates("annhouse", self.bucket)
+        except Exception as e:
+            print(f" 템플릿 목록 조회 실패: {e}")
+            return []
         
-        for blob in blobs:
-            if 'annhouse' in blob.name.lower():
-                templates.append(blob.name)
-                print(f" 템플릿 발견: {blob.name}")
+        for template_name in templates:
+            print(f" 템플릿 발견: {template_name}")
         
         return templates
     
@@ -145,30 +82,25 @@ class AnhousPreprocessor:
             return None
         
         try:
-            blob = self.bucket.blob(template_name)
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, template_name)
-            blob.download_to_filename(local_path)
-            print(f" {template_name} 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get(template_name, self.bucket)
+            print(f" {template_name} 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f" 템플릿 다운로드 실패: {e}")
             return None
     
-    def get_call_data_by_team(self, csv_files, collection_date):
-        """CSV 파일들에서 팀별 CALL 데이터 분류"""
+    def get_call_data_by_team(self, input_files, collection_date):
+        """수집 파일들에서 팀별 CALL 데이터 분류"""
         team_data = {}
         
-        for csv_file in csv_files:
+        for input_file in input_files:
             try:
-                # 고객번호 컬럼을 문자열로 읽어서 앞의 0이 사라지지 않도록 함
-                df = pd.read_csv(csv_file, dtype={'고객번호': str})
+                # 고객번호 컬럼을 문자열로 읽어서 앞의 0이 사라지지 않도록 함 (스키마의 phones)
+                df = self.load_export(input_file, schema="anhous_call")
                 
                 if '팀' in list(df.columns):
                     teams = df['팀'].unique()
-                    print(f" CSV 파일 분석: {csv_file}")
+                    print(f" 수집 파일 분석: {input_file}")
                     print(f"   팀 종류: {teams}")
                     
                     for team in teams:
@@ -179,15 +111,13 @@ class AnhousPreprocessor:
                         print(f"    {team} 데이터: {len(team_df)}행")
                         
             except Exception as e:
-                print(f" CSV 파일 읽기 실패: {csv_file}, 오류: {e}")
+                print(f" 수집 파일 읽기 실패: {input_file}, 오류: {e}")
         
         return team_data
     
-    def update_template_with_team_data(self, template_path, team_data, collection_date, template_team, csv_files):
+    def update_template_with_team_data(self, template_path, team_data, collection_date, template_team, input_files):
         """템플릿 파일에 팀별 데이터 업데이트 (원본 템플릿 유지)"""
         try:
-            import shutil
-            from openpyxl import load_workbook
             from openpyxl.drawing.image import Image
             
             print(f"{template_team} 데이터 처리 중...")
@@ -213,10 +143,8 @@ class AnhousPreprocessor:
             os.makedirs(download_dir, exist_ok=True)
             output_path = os.path.join(download_dir, new_filename)
             
-            # 원본 템플릿 복사
-            shutil.copy2(template_path, output_path)
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # 통화료 시트 가져오기
             if '통화료' in workbook.sheetnames:
@@ -264,7 +192,7 @@ class AnhousPreprocessor:
             
             # SMS 데이터 처리 및 세부내역 시트 업데이트
             print(f"SMS 데이터 처리 시작")
-            self.process_sms_data(workbook, template_team, csv_files)
+            self.process_sms_data(workbook, template_team, input_files)
             print(f"SMS 데이터 처리 완료")
             
             # 기존 데이터 지우기 (8행부터)
@@ -495,25 +423,25 @@ class AnhousPreprocessor:
         except Exception as e:
             print(f" 수식 참조 업데이트 오류: {e}")
     
-    def process_sms_data(self, workbook, template_team, csv_files):
+    def process_sms_data(self, workbook, template_team, input_files):
         """SMS 데이터 처리 및 세부내역 시트 업데이트"""
         try:
-            # SMS CSV 파일 찾기 (변환된 CSV 파일들 중에서)
+            # SMS 수집 파일 찾기
             sms_file = None
-            for csv_file in csv_files:
-                if 'SMS' in csv_file and csv_file.endswith('.csv'):
-                    sms_file = csv_file
+            for input_file in input_files:
+                if 'SMS' in os.path.basename(input_file):
+                    sms_file = input_file
                     break
             
             if not sms_file:
-                print("    SMS CSV 파일을 찾을 수 없습니다")
-                print(f"   사용 가능한 파일: {csv_files}")
+                print("    SMS 수집 파일을 찾을 수 없습니다")
+                print(f"   사용 가능한 파일: {input_files}")
                 return
             
             print(f"    SMS 파일 발견: {sms_file}")
             
-            # SMS 데이터 읽기 (CSV 파일)
-            sms_df = pd.read_csv(sms_file)
+            # SMS 데이터 읽기
+            sms_df = self.load_export(sms_file, schema="anhous_sms")
             print(f"    SMS 데이터 로드: {len(sms_df)}행")
             print(f"    컬럼: {list(sms_df.columns)}")
             
@@ -589,19 +517,21 @@ class AnhousPreprocessor:
             else:
                 print("    세부내역 시트를 찾을 수 없습니다")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
                 
         except Exception as e:
             print(f" 세부내역 시트 업데이트 오류: {e}")
     
-    def process_anhous_data(self, collection_date):
+    def process_anhous_data(self, collection_date, progress_callback=None):
         """앤하우스 데이터 전처리 메인 함수"""
         try:
             print(" 앤하우스 데이터 전처리 시작")
             
-            # 1. CSV 변환
-            csv_files = self.convert_all_collected_files()
-            print(f" 변환 완료: {len(csv_files)}개 파일")
+            if progress_callback:
+                progress_callback("load_inputs")
+            # 1. 수집 파일 확인 (읽기는 표 캐시 사용)
+            input_files = self.collect_input_files()
+            print(f" 수집 파일: {len(input_files)}개")
             
             # 2. 템플릿 찾기
             templates = self.find_anhous_templates()
@@ -609,12 +539,16 @@ class AnhousPreprocessor:
                 print(" 앤하우스 템플릿 파일을 찾을 수 없습니다")
                 return False
             
+            if progress_callback:
+                progress_callback("compute")
             # 3. 팀별 데이터 분류
-            team_data = self.get_call_data_by_team(csv_files, collection_date)
+            team_data = self.get_call_data_by_team(input_files, collection_date)
             if not team_data:
                 print(" 팀별 데이터를 찾을 수 없습니다")
                 return False
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 4. 템플릿 업데이트
             print("  템플릿 파일 업데이트 중...")
             print(f"   발견된 템플릿: {templates}")
@@ -646,7 +580,7 @@ class AnhousPreprocessor:
                             {template_team: team_data[template_team]}, 
                             collection_date,
                             template_team,
-                            csv_files
+                            input_files
                         )
                         if updated_path:
                             updated_files.append(updated_path)
@@ -0,0 +1,119 @@
+"""월마감 일괄 전처리 파이프라인
+
+의존 관계: 고지서 처리(통신비) → 고객사별 전처리 → 결과 목록 등록
+- 고지서 금액을 쓰지 않는 고객사는 고지서 처리와 동시에 바로 시작한다.
+- 고객사 전처리는 프로세스 풀(코어 수 기준)에서 병렬 실행한다.
+  (pandas/openpyxl 계산이 GIL에 묶이므로 스레드가 아닌 프로세스 사용, Firebase 연결은 워커별 공용 연결)
+- 저장소 기록은 부모 프로세스의 on_update 콜백에서만 수행한다.
+- 고지서 금액/공통 설정은 제출 시점의 BillingContext 스냅샷으로 워커에 전달한다.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from .billing_context import BillingContext
+from .preprocess_jobs import run_company_preprocessing, PreprocessError, SUPPORTED_COMPANIES
+
+# 고지서 통신비를 청구서에 반영하는 고객사 (고지서 처리 이후에 실행)
+BILL_DEPENDENT_COMPANIES = ("SK일렉링크", "W컨셉", "매스프레소(콴다)", "구쁘")
+
+
+def _run_company_job(company_name, collection_date, options, context=None):
+    """워커 프로세스 진입점: (생성 파일 목록, 소요 시간) 반환"""
+    started = time.perf_counter()
+    processed_files = run_company_preprocessing(company_name, collection_date, options, context=context)
+    return processed_files, time.perf_counter() - started
+
+
+def default_worker_count(company_count):
+    return max(1, min(os.cpu_count() or 1, company_count))
+
+
+def run_preprocess_batch(collection_date, companies, options_by_company=None,
+                         process_bills=None, on_update=None, max_workers=None, storage=None):
+    """
+    고객사 목록을 일괄 전처리하고 {고객사: {"status", "processed_files", "error", "elapsed"}} 반환.
+    process_bills: 고지서 처리 함수(없으면 저장된 통신비 사용). 실패 시 예외 또는 falsy 반환.
+    on_update(name, status, detail): 단계/고객사 상태 변경 알림 (name은 "bills" 또는 고객사명)
+    storage: 고지서 금액/공통 설정을 읽을 저장소 (없으면 워커가 각자 생성)
+    """
+    options_by_company = options_by_company or {}
+    unsupported = [name for name in companies if name not in SUPPORTED_COMPANIES]
+    if unsupported:
+        raise PreprocessError(f"전처리를 지원하지 않는 고객사: {', '.join(unsupported)}")
+
+    def notify(name, status, detail=None):
+        if on_update:
+            on_update(name, status, detail or {})
+
+    results = {}
+    independent = [name for name in companies if name not in BILL_DEPENDENT_COMPANIES]
+    dependent = [name for name in companies if name in BILL_DEPENDENT_COMPANIES]
+
+    workers = max_workers or default_worker_count(len(companies))
+    print(f"일괄 전처리 시작: {len(companies)}개 고객사, 워커 {workers}개")
+
+    # spawn: Flask 서버의 스레드/소켓 상태를 자식 프로세스에 복제하지 않는다.
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    pending = {}
+
+    def submit(company_name, context=None):
+        notify(company_name, "running")
+        future = executor.submit(
+            _run_company_job, company_name, collection_date, options_by_company.get(company_name, {}), context
+        )
+        pending[future] = company_name
+
+    def collect(futures):
+        for future in futures:
+            company_name = pending.pop(future)
+            try:
+                processed_files, elapsed = future.result()
+                results[company_name] = {
+                    "status": "completed", "processed_files": processed_files, "error": None, "elapsed": elapsed
+                }
+            except Exception as e:
+                print(f"{company_name} 일괄 전처리 실패: {e}")
+                results[company_name] = {
+                    "status": "failed", "processed_files": [], "error": str(e), "elapsed": None
+                }
+            notify(company_name, results[company_name]["status"], results[company_name])
+
+    try:
+        context = BillingContext.snapshot(storage) if storage is not None else None
+        for company_name in independent:
+            submit(company_name, context)
+
+        # 고지서는 의존 고객사가 없어도 처리 (업로드된 고지서를 대기 상태로 남기지 않음)
+        bills_ok = True
+        if process_bills:
+            notify("bills", "running")
+            try:
+                bills_ok = bool(process_bills())
+            except Exception as e:
+                print(f"일괄 전처리 고지서 처리 오류: {e}")
+                bills_ok = False
+            notify("bills", "completed" if bills_ok else "failed")
+
+        if dependent:
+            # 고지서 처리로 바뀐 통신비를 반영한 스냅샷
+            context = BillingContext.snapshot(storage) if storage is not None else None
+            for company_name in dependent:
+                if bills_ok:
+                    submit(company_name, context)
+                else:
+                    results[company_name] = {
+                        "status": "failed", "processed_files": [],
+                        "error": "고지서 처리 실패로 건너뜀", "elapsed": None
+                    }
+                    notify(company_name, "failed", results[company_name])
+
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        executor.shutdown(wait=True)
+
+    return results
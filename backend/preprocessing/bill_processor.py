@@ -12,10 +12,8 @@ import time
 from bs4 import BeautifulSoup
 import glob
 from ..data_collection.config import AccountConfig
-from ..storage.admin_storage import AdminStorage
-from .wconcept_preprocessing import WconceptPreprocessor
-from .mathpresso_preprocessing import MathpressoPreprocessor
-from .guppu_preprocessing import GuppuPreprocessor
+from ..storage.admin_storage import create_admin_storage
+from . import preprocess_jobs
 
 class BillProcessor:
     def __init__(self, admin_storage=None):
@@ -27,7 +25,7 @@ class BillProcessor:
         if admin_storage:
             self.storage = admin_storage
         else:
-            self.storage = AdminStorage()
+            self.storage = create_admin_storage()
             # 기존 파일이 있다면 마이그레이션 실행 (새로 생성된 경우만)
             self.storage.migrate_from_separate_files()
   
@@ -390,87 +388,12 @@ class BillProcessor:
 
     def process_wconcept(self, collection_date, license_count=40, license_cost=80000):
         """W컨셉 전처리 처리"""
-        try:
-            preprocessor = WconceptPreprocessor()
-            success = preprocessor.process_wconcept_data(collection_date, license_count, license_cost)
-            
-            if success:
-                download_dir = os.path.join(os.getcwd(), "temp_processing")
-                os.makedirs(download_dir, exist_ok=True)
-                date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
-                
-                # W컨셉은 n-1월로 파일명 생성
-                if date_obj.month == 1:
-                    prev_year = date_obj.year - 1
-                    prev_month = 12
-                else:
-                    prev_year = date_obj.year
-                    prev_month = date_obj.month - 1
-                
-                date_prefix = f"{str(prev_year)[2:]}{prev_month:02d}"
-                expected_filename = f"{date_prefix}_W컨셉_청구내역서.xlsx"
-                expected_path = os.path.join(download_dir, expected_filename)
-                
-                if os.path.exists(expected_path):
-                    return [expected_filename]
-                else:
-                    print(f"생성된 파일을 찾을 수 없습니다: {expected_path}")
-                    return []
-            else:
-                return []
-                
-        except Exception as e:
-            print(f"W컨셉 전처리 실패: {e}")
-            return []
+        return preprocess_jobs.process_wconcept(collection_date, license_count, license_cost)
 
     def process_mathpresso(self, collection_date):
         """매스프레소(콴다) 전처리 처리"""
-        try:
-            preprocessor = MathpressoPreprocessor()
-            success = preprocessor.process_mathpresso_data(collection_date)
-            
-            if success:
-                download_dir = os.path.join(os.getcwd(), "temp_processing")
-                os.makedirs(download_dir, exist_ok=True)
-                date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
-                date_prefix = f"{str(date_obj.year)[2:]}{date_obj.month:02d}"
-                expected_filename = f"{date_prefix}_매스프레소(콴다)_청구내역서.xlsx"
-                expected_path = os.path.join(download_dir, expected_filename)
-                
-                if os.path.exists(expected_path):
-                    return [expected_filename]
-                else:
-                    print(f"생성된 파일을 찾을 수 없습니다: {expected_path}")
-                    return []
-            else:
-                return []
-                
-        except Exception as e:
-            print(f"매스프레소(콴다) 전처리 실패: {e}")
-            return []
+        return preprocess_jobs.process_mathpresso(collection_date)
 
     def process_guppu(self, collection_date):
         """구쁘 전처리 처리"""
-        try:
-            preprocessor = GuppuPreprocessor()
-            success = preprocessor.process_guppu_data(collection_date)
-            
-            if success:
-                download_dir = os.path.join(os.getcwd(), "temp_processing")
-                os.makedirs(download_dir, exist_ok=True)
-                date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
-                date_prefix = f"{str(date_obj.year)[2:]}{date_obj.month:02d}"
-                expected_filename = f"{date_prefix}_구쁘_상담솔루션 청구내역서.xlsx"
-                expected_path = os.path.join(download_dir, expected_filename)
-                
-                if os.path.exists(expected_path):
-                    return [expected_filename]
-                else:
-                    print(f"생성된 파일을 찾을 수 없습니다: {expected_path}")
-                    return []
-            else:
-                return []
-                
-        except Exception as e:
-            print(f"구쁘 전처리 실패: {e}")
-            return []
+        return preprocess_jobs.process_guppu(collection_date)
@@ -0,0 +1,108 @@
+"""
+전처리 실행 컨텍스트 (저장소 / 고지서 금액 / 청구서 공통 설정 / 템플릿 캐시 / Firebase)
+
+전처리기가 자기 서버의 /api/bill-amounts를 HTTP로 다시 호출하거나
+대표이사명을 읽으려고 저장소를 새로 만들던 것을 메모리 조회로 바꾼다.
+- 고지서 금액과 공통 설정은 처음 읽을 때 한 번만 저장소에서 가져온다 (실행 단위 스냅샷).
+- pickle 시에는 저장소/Firebase 핸들을 빼고 스냅샷만 넘기므로
+  일괄 전처리의 워커 프로세스에도 그대로 전달할 수 있다.
+"""
+
+from backend.preprocessing.template_cache import get_template_cache
+from backend.utils.firebase_registry import get_firebase_registry
+from backend.utils.reference_cache import get_reference_cache
+
+
+def parse_amount(amount_str):
+    """'123,456원' 형태의 금액 문자열 → float (형식이 다르면 None)"""
+    if isinstance(amount_str, (int, float)):
+        return float(amount_str)
+    amount_clean = str(amount_str or "").replace(',', '').replace('원', '').strip()
+    if amount_clean.isdigit():
+        return float(amount_clean)
+    return None
+
+
+class BillingContext:
+    def __init__(self, storage=None, bill_amounts=None, invoice_settings=None):
+        self._storage = storage
+        self._bill_amounts = bill_amounts
+        self._invoice_settings = invoice_settings
+
+    @classmethod
+    def snapshot(cls, storage):
+        """저장소의 현재 고지서 금액/공통 설정을 미리 읽어 둔 컨텍스트 (워커 프로세스 전달용)"""
+        context = cls(storage)
+        context.bill_amounts()
+        context.invoice_settings()
+        return context
+
+    def __getstate__(self):
+        # 저장소(락/파일 핸들)는 넘기지 않고 스냅샷만 전달
+        return {"bill_amounts": self.bill_amounts(), "invoice_settings": self.invoice_settings()}
+
+    def __setstate__(self, state):
+        self._storage = None
+        self._bill_amounts = state["bill_amounts"]
+        self._invoice_settings = state["invoice_settings"]
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            from backend.storage.admin_storage import create_admin_storage
+            self._storage = create_admin_storage()
+        return self._storage
+
+    # === 저장소 스냅샷 ===
+
+    def bill_amounts(self):
+        """{고객사: {"amount": "123,456원", ...}}"""
+        if self._bill_amounts is None:
+            self._bill_amounts = self.storage.get_bill_amounts()
+        return self._bill_amounts
+
+    def bill_amount(self, company_name):
+        """고객사 고지서 금액(float). 없거나 형식이 다르면 None"""
+        bill_data = self.bill_amounts().get(company_name)
+        if not bill_data:
+            print(f"{company_name} 고지서 정보를 찾을 수 없습니다")
+            return None
+        amount_str = bill_data.get('amount', '')
+        if not amount_str:
+            return None
+        amount = parse_amount(amount_str)
+        if amount is None:
+            print(f"금액 형식 오류: {amount_str}")
+            return None
+        print(f"{company_name} 고지서 금액 조회: {amount:,.0f}원")
+        return amount
+
+    def invoice_settings(self):
+        """청구서 공통 설정 {"ceo_name", "updated_at"}"""
+        if self._invoice_settings is None:
+            self._invoice_settings = self.storage.get_invoice_common_settings()
+        return self._invoice_settings
+
+    @property
+    def ceo_name(self):
+        return self.invoice_settings().get("ceo_name")
+
+    # === 프로세스 공용 자원 ===
+
+    @property
+    def template_cache(self):
+        return get_template_cache()
+
+    @property
+    def reference_cache(self):
+        return get_reference_cache()
+
+    def bucket(self):
+        return get_firebase_registry().bucket()
+
+    def firestore(self):
+        return get_firebase_registry().firestore()
+
+    def template(self, blob_name):
+        """템플릿 로컬 경로 (템플릿 캐시 사용)"""
+        return self.template_cache.get(blob_name, self.bucket())
@@ -0,0 +1,46 @@
+"""
+고객사별 발송이력/통화내역 열 스키마 (ingestion.load_table(schema=...)에서 사용)
+
+내보내기 파일은 20~30개 열이지만 전처리에서 쓰는 열은 3~8개뿐이므로
+- columns / positions: 읽을 열 (이름 또는 0부터 시작하는 열 위치, 나머지 열은 파싱하지 않음)
+- categories: 값 종류가 몇 개뿐인 상태/유형 열 → category dtype (위치 스키마는 열 위치로 지정)
+- phones: 전화번호 열 → 숫자로 바뀌지 않도록 문자열로 읽고 끝의 ".0"(float 흔적) 제거
+이름으로 지정한 열이 파일에 없으면 그 열만 빠진다 (기존처럼 호출자가 열 존재 여부를 확인).
+"""
+
+COLUMN_SCHEMAS = {
+    # 디싸이더스/애드프로젝트 브랜드별 SMS 발송이력
+    "deciders_sms": {
+        "columns": ("발신번호", "발송상태", "문자유형"),
+        "categories": ("발송상태", "문자유형"),
+        "phones": ("발신번호",),
+    },
+    # 매스프레소(콴다) SMS 발송이력
+    "mathpresso_sms": {
+        "columns": ("발송상태", "문자유형"),
+        "categories": ("발송상태", "문자유형"),
+    },
+    # 구쁘 SMS 발송이력: F열(제목), H열(상태), I열(문자유형)
+    "guppu_sms": {
+        "positions": (5, 7, 8),
+        "categories": (7, 8),
+    },
+    # 앤하우스 통화내역 (팀별 통화료 시트)
+    "anhous_call": {
+        "columns": ("팀", "고객번호", "통화시간", "콜시작시간", "대기시작시간", "링시작시간", "통화시작시간", "콜종료시간"),
+        "categories": ("팀",),
+        "phones": ("고객번호",),
+    },
+    # 앤하우스 SMS 발송이력 (세부내역 시트)
+    "anhous_sms": {
+        "columns": ("발신번호", "발송상태", "문자유형"),
+        "categories": ("발송상태", "문자유형"),
+        "phones": ("발신번호",),
+    },
+}
+
+
+def get_schema(name):
+    if name not in COLUMN_SCHEMAS:
+        raise KeyError(f"열 스키마가 없습니다: {name}")
+    return COLUMN_SCHEMAS[name]
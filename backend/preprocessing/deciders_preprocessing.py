@@ -1,18 +1,19 @@
 import os
 import re
-import shutil
 import pandas as pd
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
+from backend.preprocessing.ingestion import iter_table_chunks, load_table
+from backend.storage.file_catalog import get_file_catalog
 
 class DecidersPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
@@ -32,63 +33,38 @@ class DecidersPreprocessor:
         }
         
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print("Firebase Storage 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
             self.bucket = None
     
-    def convert_all_to_csv(self):
-        """temp_processing 폴더의 모든 디싸이더스애드프로젝트 파일을 CSV로 변환"""
+    def collect_input_files(self):
+        """temp_processing 폴더의 디싸이더스애드프로젝트 수집 파일 (xlsx/xls/csv)"""
         temp_dir = "temp_processing"
-        csv_files = []
+        input_files = []
         
         if os.path.exists(temp_dir):
-            for filename in os.listdir(temp_dir):
-                if "디싸이더스애드프로젝트" in filename:
-                    file_path = os.path.join(temp_dir, filename)
-                    
-                    if filename.endswith((".xlsx", ".xls")):
-                        try:
-                            df = pd.read_excel(file_path)
-                            csv_filename = filename.replace('.xlsx', '.csv').replace('.xls', '.csv')
-                            csv_path = os.path.join(temp_dir, csv_filename)
-                            
-                            df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                            csv_files.append(csv_path)
-                            print(f"CSV 변환 완료: {csv_filename}")
-                            
-                        except Exception as e:
-                            print(f"CSV 변환 실패: {filename}, 오류: {e}")
-                    
-                    elif filename.endswith(".csv"):
-                        csv_files.append(file_path)
-                        print(f"CSV 파일 확인: {filename}")
-        
-        return csv_files
+            entries = get_file_catalog().find(
+                directories=[temp_dir],
+                match=lambda f: "디싸이더스애드프로젝트" in f and f.endswith((".xlsx", ".xls", ".csv"))
+            )
+            for entry in entries:
+                input_files.append(os.path.join(temp_dir, entry["name"]))
+                print(f"수집 파일 확인: {entry['name']}")
+    
+        return input_files
     
-    def merge_sms_files(self, csv_files):
-        """발송이력 키워드가 포함된 파일들을 병합"""
+    def split_input_files(self, input_files):
+        """발송이력 키워드가 포함된 파일과 나머지 파일 분리 → (발송이력 파일, 나머지 파일)"""
         import unicodedata
         sms_files = []
         other_files = []
         
-        for csv_file in csv_files:
-            filename = os.path.basename(csv_file)
+        for input_file in input_files:
+            filename = os.path.basename(input_file)
             normalized_filename = unicodedata.normalize('NFC', filename)
             
             # 발송이력 관련 파일이면서 채팅진행건리스트가 아닌 경우
@@ -96,79 +72,74 @@ class DecidersPreprocessor:
             is_chat_list = "채팅진행건리스트" in normalized_filename
             
             if contains_sms and not is_chat_list:
-                sms_files.append(csv_file)
+                sms_files.append(input_file)
             else:
-                other_files.append(csv_file)
+                other_files.append(input_file)
         
-        if not sms_files:
-            print("발송이력 파일을 찾을 수 없습니다")
-            return None, other_files
-        
-        # 발송이력 파일들 병합
-        merged_df = pd.DataFrame()
+        return sms_files, other_files
+    
+    def aggregate_sms_files(self, sms_files):
+        """
+        발송이력 파일들을 행 묶음 단위로 읽어 (발신번호, 문자유형)별 성공(전달) 건수를 누적.
+        병합 표나 중간 CSV 없이 묶음별 카운터만 유지 → (카운터, 전체 발신번호 집합) 또는 None
+        """
+        pair_counts = Counter()
+        senders = set()
+        total_rows = 0
+        aggregated_files = 0
         
         for sms_file in sms_files:
+            # 파일 단위로 모았다가 끝까지 읽은 파일만 합산 (중간 묶음에서 실패하면 파일 전체 제외)
+            file_counts = Counter()
+            file_senders = set()
+            file_rows = 0
             try:
-                df = pd.read_csv(sms_file, encoding='utf-8-sig')
-                merged_df = pd.concat([merged_df, df], ignore_index=True)
-                print(f"병합: {os.path.basename(sms_file)} ({len(df)}행)")
+                for chunk in iter_table_chunks(sms_file, schema="deciders_sms"):
+                    if '발신번호' not in chunk.columns or '발송상태' not in chunk.columns:
+                        print(f"발신번호/발송상태 컬럼을 찾을 수 없습니다: {os.path.basename(sms_file)}")
+                        break
+                    file_rows += len(chunk)
+                    sender_numbers = chunk['발신번호'].astype(object).fillna('')
+                    file_senders.update(sender_numbers.unique())
+                    
+                    # 성공(전달)인 경우만 카운트
+                    success = chunk['발송상태'] == '성공(전달)'
+                    msg_types = chunk['문자유형'] if '문자유형' in chunk.columns else pd.Series('', index=chunk.index)
+                    file_counts.update(zip(sender_numbers[success], msg_types[success].astype(object).fillna('')))
+                else:
+                    pair_counts.update(file_counts)
+                    senders.update(file_senders)
+                    aggregated_files += 1
+                    total_rows += file_rows
+                    print(f"집계: {os.path.basename(sms_file)} ({file_rows}행)")
             except Exception as e:
-                print(f"병합 실패: {sms_file}, 오류: {e}")
-        
-        if not merged_df.empty:
-            # 병합된 파일 저장
-            merged_path = os.path.join("temp_processing", "merged_sms_data.csv")
-            merged_df.to_csv(merged_path, index=False, encoding='utf-8-sig')
-            print(f"발송이력 병합 완료: {len(merged_df)}행")
-            return merged_path, other_files
+                print(f"집계 실패: {sms_file}, 오류: {e}")
         
-        return None, other_files
-    
-    def analyze_sender_numbers(self, merged_sms_path):
-        """발신번호 분석 및 미지의 번호 감지"""
-        try:
-            df = pd.read_csv(merged_sms_path, encoding='utf-8-sig')
-            
-            if '발신번호' not in df.columns:
-                print("발신번호 컬럼을 찾을 수 없습니다")
-                return None
-            
-            # 발신번호를 문자열로 변환하고 정리
-            df['발신번호_정리'] = df['발신번호'].astype(str).str.replace('.0', '')
-            
-            # 고유 발신번호 확인
-            unique_senders = df['발신번호_정리'].unique()
-            unknown_senders = []
-            
-            for sender in unique_senders:
-                if sender not in self.sender_mapping and sender != 'nan':
-                    unknown_senders.append(sender)
-            
-            # 미지의 번호가 있으면 알림
-            if unknown_senders:
-                print(f"다른번호 감지: {', '.join(unknown_senders)} - 스마트웰 or 유리제로")
-                # 실제 환경에서는 팝업으로 표시해야 함
-            
-            return df
-            
-        except Exception as e:
-            print(f"발신번호 분석 실패: {e}")
+        if not aggregated_files:
             return None
+        
+        print(f"발송이력 집계 완료: {aggregated_files}개 파일, {total_rows}행")
+        return pair_counts, senders
     
-    def count_message_types_by_sender(self, df):
-        """발신번호별로 문자유형 카운트 (성공 전달만)"""
-        # 성공(전달)인 경우만 필터링
-        success_df = df[df['발송상태'] == '성공(전달)']
+    def report_unknown_senders(self, senders):
+        """매핑에 없는 발신번호 감지"""
+        unknown_senders = [sender for sender in sorted(senders) if sender and sender not in self.sender_mapping]
         
+        # 미지의 번호가 있으면 알림
+        if unknown_senders:
+            print(f"다른번호 감지: {', '.join(unknown_senders)} - 스마트웰 or 유리제로")
+            # 실제 환경에서는 팝업으로 표시해야 함
+        
+        return unknown_senders
+    
+    def count_message_types_by_sender(self, pair_counts):
+        """(발신번호, 문자유형)별 성공 전달 건수 → 청구서별 문자유형 카운트"""
         results = {
             "디싸이더스": {"SMS": 0, "LMS": 0, "MMS": 0, "TALK": 0},
             "애드프로젝트": {"SMS": 0, "LMS": 0, "MMS": 0, "TALK": 0}
         }
         
-        for _, row in success_df.iterrows():
-            sender = str(row['발신번호_정리'])
-            msg_type = row.get('문자유형', '')
-            
+        for (sender, msg_type), count in pair_counts.items():
             # 발신번호로 브랜드 확인
             brand = self.sender_mapping.get(sender, "기타")
             
@@ -183,13 +154,13 @@ class DecidersPreprocessor:
             
             # 문자유형별 카운트
             if msg_type == "SMS":
-                results[invoice_type]["SMS"] += 1
+                results[invoice_type]["SMS"] += count
             elif msg_type in ["LMS", "LMS/MMS"]:
-                results[invoice_type]["LMS"] += 1
+                results[invoice_type]["LMS"] += count
             elif msg_type in ["MMS"]:
-                results[invoice_type]["MMS"] += 1
+                results[invoice_type]["MMS"] += count
             elif msg_type in ["TALK", "TALK(알림톡)"]:
-                results[invoice_type]["TALK"] += 1
+                results[invoice_type]["TALK"] += count
         
         return results
     
@@ -199,32 +170,27 @@ class DecidersPreprocessor:
             return None
         
         try:
-            blob = self.bucket.blob(template_name)
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, template_name)
-            blob.download_to_filename(local_path)
+            local_path = get_template_cache().get(template_name, self.bucket)
             
             return local_path
         except Exception as e:
             print(f"템플릿 다운로드 실패: {e}")
             return None
     
-    def process_chat_list_file(self, csv_files):
+    def process_chat_list_file(self, input_files):
         """채팅진행건리스트 파일 처리 - 디싸이더스/애드프로젝트 카카오 채팅 카운트"""
         import unicodedata
         try:
             deciders_chat_count = 0
             adproject_chat_count = 0
             
-            for csv_file in csv_files:
-                normalized_filename = unicodedata.normalize('NFC', os.path.basename(csv_file))
+            for input_file in input_files:
+                normalized_filename = unicodedata.normalize('NFC', os.path.basename(input_file))
                 
                 if "채팅진행건리스트" in normalized_filename:
-                    print(f"채팅진행건리스트 파일 처리: {os.path.basename(csv_file)}")
+                    print(f"채팅진행건리스트 파일 처리: {os.path.basename(input_file)}")
                     
-                    df = pd.read_csv(csv_file, encoding='utf-8-sig')
+                    df = load_table(input_file)
                     
                     # 채널명, 채팅유형 컬럼 찾기
                     channel_col = None
@@ -277,10 +243,8 @@ class DecidersPreprocessor:
             os.makedirs(download_dir, exist_ok=True)
             output_path = os.path.join(download_dir, output_filename)
             
-            # 템플릿 복사
-            shutil.copy2(template_path, output_path)
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # 수집 날짜로부터 년월 정보 생성
             year_month = f"{date_obj.year}년 {date_obj.month:02d}월"
@@ -317,7 +281,7 @@ class DecidersPreprocessor:
                 
                 print(f"{invoice_type} 카운트 입력 - SMS:{counts['SMS']}, LMS:{counts['LMS']}, MMS:{counts['MMS']}, TALK:{counts['TALK']}")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 로고 이미지 삽입 (B2 셀)
             try:
@@ -360,35 +324,43 @@ class DecidersPreprocessor:
         except Exception as e:
             print(f"폴더 정리 실패: {e}")
     
-    def process_deciders_data(self, collection_date):
+    def process_deciders_data(self, collection_date, progress_callback=None):
         """디싸이더스/애드프로젝트 데이터 전처리 메인 함수"""
         try:
             print("디싸이더스/애드프로젝트 데이터 전처리 시작")
+            if progress_callback:
+                progress_callback("load_inputs")
             
-            # 1. 모든 파일을 CSV로 변환
-            csv_files = self.convert_all_to_csv()
-            if not csv_files:
-                print("변환할 파일이 없습니다")
+            # 1. 수집 파일 확인 (읽기는 표 캐시 사용)
+            input_files = self.collect_input_files()
+            if not input_files:
+                print("처리할 파일이 없습니다")
                 return False
             
-            # 2. 발송이력 파일들 병합
-            merged_sms_path, other_files = self.merge_sms_files(csv_files)
-            if not merged_sms_path:
-                print("발송이력 파일 병합 실패")
+            # 2. 발송이력 파일 분리
+            sms_files, other_files = self.split_input_files(input_files)
+            if not sms_files:
+                print("발송이력 파일을 찾을 수 없습니다")
                 return False
             
-            # 3. 발신번호 분석
-            df = self.analyze_sender_numbers(merged_sms_path)
-            if df is None:
-                print("발신번호 분석 실패")
+            if progress_callback:
+                progress_callback("compute")
+            # 3. 발송이력 스트리밍 집계 (발신번호별 문자유형 카운터)
+            aggregated = self.aggregate_sms_files(sms_files)
+            if aggregated is None:
+                print("발송이력 집계 실패")
                 return False
+            pair_counts, senders = aggregated
+            self.report_unknown_senders(senders)
             
             # 4. 문자유형별 카운트
-            counts = self.count_message_types_by_sender(df)
+            counts = self.count_message_types_by_sender(pair_counts)
             
             # 5. 채팅진행건리스트 파일 처리 (디싸이더스/애드프로젝트 카카오 채팅 카운트)
-            deciders_chat_count, adproject_chat_count = self.process_chat_list_file(csv_files)
+            deciders_chat_count, adproject_chat_count = self.process_chat_list_file(input_files)
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 6. 템플릿 다운로드 및 처리
             templates = ["deciders.xlsx", "Adproject.xlsx"]
             processed_files = []
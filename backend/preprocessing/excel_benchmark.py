@@ -0,0 +1,199 @@
+"""
+Excel 읽기 엔진 벤치마크
+
+ICS SMS 발송이력과 같은 형태의 합성 .xlsx(기본 1만/10만/50만 행)를 임시 디렉토리에 만들고
+excel_reader의 엔진별 읽기 시간과 결과가 pd.read_excel(openpyxl)과 같은지 비교한다.
+<dimension ref="A1"/>로 남은 파일(스트리밍 작성기 산출물)도 같은 결과인지 함께 확인한다.
+
+    python -m backend.preprocessing.excel_benchmark
+    python -m backend.preprocessing.excel_benchmark --rows 10000 100000 --repeat 3
+    python -m backend.preprocessing.excel_benchmark --engines calamine openpyxl --json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+from openpyxl import Workbook
+
+from .excel_reader import ENGINES, available_engines, iter_rows, read_excel
+from .ingestion import iter_table_chunks
+
+DEFAULT_ROWS = (10000, 100000, 500000)
+COLUMNS = ("발송일시", "요청일시", "수신번호", "발신번호", "브랜드", "제목", "내용", "발송상태", "문자유형", "건수")
+STATUSES = ("성공(전달)", "성공(전달)", "성공(전달)", "실패(번호오류)", "실패(수신거부)")
+MESSAGE_TYPES = ("SMS", "LMS/MMS", "TALK(알림톡)", "MMS")
+SENDERS = ("18005073", "16610581", "16881635", "15888298", None)
+
+
+def make_sms_export(path, rows, seed=0):
+    """합성 SMS 발송이력 .xlsx 생성 (write_only 모드)"""
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("발송이력")
+    worksheet.append(COLUMNS)
+    started = datetime(2025, 7, 1)
+    for index in range(rows):
+        sent_at = started + timedelta(seconds=index * 5)
+        worksheet.append((
+            sent_at,
+            sent_at - timedelta(seconds=rng.randint(0, 60)),
+            f"010{rng.randint(0, 99999999):08d}",
+            rng.choice(SENDERS),
+            rng.choice(("엑스퍼", "스마트웰컴", "바이오숨")),
+            f"[안내] 주문 {index} 배송 알림",
+            "고객님의 주문이 출고되었습니다. " * rng.randint(1, 4),
+            rng.choice(STATUSES),
+            rng.choice(MESSAGE_TYPES),
+            1,
+        ))
+    workbook.save(path)
+
+
+def make_stale_dimension_copy(source_path, path):
+    """시트의 <dimension> 태그를 ref="A1"로 바꾼 사본 생성 (읽기 전용 모드 잘림 재현용)"""
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet"):
+                text = data.decode("utf-8")
+                if "<dimension" in text:
+                    text = re.sub(r"<dimension ref=\"[^\"]*\"\s*/>", '<dimension ref="A1"/>', text)
+                else:
+                    text = text.replace("<sheetData", '<dimension ref="A1"/><sheetData', 1)
+                data = text.encode("utf-8")
+            target.writestr(item, data)
+
+
+def check_stale_dimension(work_dir, engines, rows=200):
+    """<dimension ref="A1"/> 파일을 엔진별 read_excel / iter_rows / iter_table_chunks로 읽어 원본 pd.read_excel과 비교"""
+    source_path = os.path.join(work_dir, "stale_source.xlsx")
+    path = os.path.join(work_dir, "stale_dimension.xlsx")
+    make_sms_export(source_path, rows)
+    make_stale_dimension_copy(source_path, path)
+    reference = pd.read_excel(source_path)
+    result = {"rows": rows}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for engine in engines:
+            try:
+                result[engine] = bool(read_excel(path, engine=engine).equals(reference))
+            except Exception as e:
+                result[engine] = f"error: {e}"
+        # iter_rows(집계용 스트리밍)는 헤더 포함 행 수로 비교
+        result["iter_rows"] = sum(1 for row in iter_rows(path) if row) == len(reference) + 1
+        # iter_table_chunks(디싸이더스 발송이력 집계)는 스키마 열만 비교
+        columns = ["발신번호", "발송상태", "문자유형"]
+        chunks = list(iter_table_chunks(path, schema="deciders_sms", chunk_rows=rows // 3))
+        streamed = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+        expected = reference[columns].astype(str).replace(r"\.0$", "", regex=True)
+        result["iter_table_chunks"] = bool(
+            len(streamed) == len(reference)
+            and streamed[columns].astype(str).reset_index(drop=True).equals(expected.reset_index(drop=True))
+        )
+    return result
+
+
+def _measure(engine, path, repeat, track_memory):
+    timings = []
+    peak = None
+    df = None
+    for attempt in range(repeat):
+        if track_memory and attempt == 0:
+            tracemalloc.start()
+        started = time.perf_counter()
+        df = read_excel(path, engine=engine)
+        timings.append(time.perf_counter() - started)
+        if track_memory and attempt == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return df, {
+        "best_sec": round(min(timings), 3),
+        "mean_sec": round(sum(timings) / len(timings), 3),
+        "peak_mb": round(peak / 1024 / 1024, 1) if peak is not None else None,
+    }
+
+
+def run_benchmark(rows_list=DEFAULT_ROWS, engines=None, repeat=1, track_memory=False):
+    """벤치마크 실행 후 결과 dict 반환"""
+    work_dir = tempfile.mkdtemp(prefix="excel_reader_bench_")
+    engines = list(engines or available_engines())
+    report = {"engines": engines, "repeat": repeat, "results": []}
+    try:
+        report["stale_dimension"] = check_stale_dimension(work_dir, engines)
+        for rows in rows_list:
+            path = os.path.join(work_dir, f"sms_{rows}.xlsx")
+            started = time.perf_counter()
+            make_sms_export(path, rows)
+            entry = {
+                "rows": rows,
+                "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+                "generate_sec": round(time.perf_counter() - started, 2),
+                "engines": {},
+            }
+            reference = None
+            # 결과 비교 기준: pd.read_excel 기본(openpyxl) - 목록에 없으면 첫 엔진
+            ordered = sorted(engines, key=lambda name: name != "openpyxl")
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for engine in ordered:
+                    try:
+                        df, stats = _measure(engine, path, repeat, track_memory)
+                    except Exception as e:
+                        entry["engines"][engine] = {"error": str(e)}
+                        continue
+                    if reference is None:
+                        reference = df
+                    stats["matches_reference"] = bool(df.equals(reference))
+                    entry["engines"][engine] = stats
+            report["results"].append(entry)
+            os.remove(path)
+        return report
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _print_report(report):
+    print(f"\n=== Excel 읽기 엔진 벤치마크 (반복 {report['repeat']}회) ===")
+    stale = report["stale_dimension"]
+    checks = ", ".join(f"{name} {'일치' if ok is True else ok}" for name, ok in stale.items() if name != "rows")
+    print(f"\n<dimension ref=\"A1\"/> 파일 {stale['rows']}행: {checks}")
+    for entry in report["results"]:
+        print(f"\n{entry['rows']:,}행 ({entry['file_mb']}MB, 생성 {entry['generate_sec']}초)")
+        baseline = entry["engines"].get("openpyxl", {}).get("best_sec")
+        for engine, stats in entry["engines"].items():
+            if "error" in stats:
+                print(f"  {engine:<18} 실패: {stats['error']}")
+                continue
+            speedup = f"  x{baseline / stats['best_sec']:.1f}" if baseline and stats["best_sec"] else ""
+            memory = f"  최대 {stats['peak_mb']}MB" if stats["peak_mb"] is not None else ""
+            match = "" if stats["matches_reference"] else "  (결과 불일치)"
+            print(f"  {engine:<18} 최고 {stats['best_sec']}초  평균 {stats['mean_sec']}초{speedup}{memory}{match}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel 읽기 엔진 벤치마크")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, help=f"기본: 사용 가능한 엔진 전체 ({', '.join(available_engines())})")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--memory", action="store_true", help="첫 회 tracemalloc 최대 메모리 측정 (느려짐)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.rows, args.engines, args.repeat, args.memory)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Excel 읽기 엔진 선택 (calamine → pd.read_excel 기본 openpyxl) + .xlsx 행 스트리밍
+
+pd.read_excel 기본 경로도 이미 load_workbook(read_only=True, data_only=True)로 값만 읽으므로
+openpyxl을 다시 구현해 얻는 이득은 1.0~1.3배 정도라 별도 엔진으로 두지 않는다.
+속도 차이가 큰 것은 Rust 파서인 calamine뿐이다.
+- calamine: python-calamine이 설치된 경우 (.xls/.xlsx 모두)
+- openpyxl: pd.read_excel 기본 (.xls는 xlrd)
+EXCEL_READER_ENGINE 환경변수로 특정 엔진을 강제할 수 있다. 엔진 비교는 excel_benchmark.py 참고.
+iter_rows는 표 전체를 만들지 않고 행 단위로 집계할 때(ingestion.iter_table_chunks) 쓴다.
+"""
+
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+ENGINES = ("calamine", "openpyxl")
+
+
+def available_engines():
+    """사용 가능한 엔진 (빠른 순)"""
+    if CALAMINE_AVAILABLE:
+        return ["calamine", "openpyxl"]
+    return ["openpyxl"]
+
+
+def _convert_cell(value):
+    """pandas openpyxl 리더와 같은 셀 변환 (빈 칸 → "", 정수값 float → int)"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_rows(path, sheet_name=0):
+    """
+    .xlsx 행을 값 목록으로 하나씩 반환 (읽기 전용 스트리밍, 셀 변환은 _convert_cell).
+    끝의 빈 칸은 잘라내므로 행 길이는 서로 다를 수 있다.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        # 읽기 전용 모드는 <dimension> 태그를 그대로 믿는데, 스트리밍으로 쓴 파일은 ref="A1"로 남아
+        # 첫 칸만 읽히는 경우가 있다 (pd.read_excel과 같이 초기화)
+        worksheet.reset_dimensions()
+        for row in worksheet.iter_rows(values_only=True):
+            converted = [_convert_cell(value) for value in row]
+            while converted and converted[-1] == "":
+                converted.pop()
+            yield converted
+    finally:
+        workbook.close()
+
+
+def _read_with(engine, path, sheet_name=0, usecols=None, dtype=None):
+    if engine == "calamine":
+        return pd.read_excel(path, sheet_name=sheet_name, usecols=usecols, dtype=dtype, engine="calamine")
+    return pd.read_excel(path, sheet_name=sheet_name, usecols=usecols, dtype=dtype)
+
+
+def read_excel(path, sheet_name=0, usecols=None, dtype=None, engine=None):
+    """
+    Excel 파일을 DataFrame으로 읽는다 (첫 행 헤더).
+    engine 생략 시 EXCEL_READER_ENGINE 또는 available_engines() 순서로 시도한다.
+    """
+    engine = engine or os.environ.get("EXCEL_READER_ENGINE", "").strip() or None
+    if engine and engine not in ENGINES:
+        raise ValueError(f"지원하지 않는 Excel 읽기 엔진: {engine} ({', '.join(ENGINES)})")
+    engines = [engine] if engine else available_engines()
+    for candidate in engines[:-1]:
+        try:
+            return _read_with(candidate, path, sheet_name, usecols, dtype)
+        except Exception as e:
+            print(f"Excel 읽기 엔진 {candidate} 실패, 다음 엔진 사용: {e}")
+    return _read_with(engines[-1], path, sheet_name, usecols, dtype)
@@ -1,87 +1,50 @@
 import os
-import shutil
 import pandas as pd
 import calendar
 import re
 from datetime import datetime
 from pathlib import Path
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
+from backend.preprocessing.ingestion import load_table
+from backend.storage.file_catalog import get_file_catalog
 
 class GuppuPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print("Firebase Storage 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
             self.bucket = None
     
     def download_guppu_template(self):
-        """Firebase에서 guppeu.xlsx 템플릿 다운로드"""
+        """Firebase의 guppeu.xlsx 템플릿 (로컬 캐시 사용)"""
         if not self.bucket:
             print("Firebase 연결이 없습니다")
             return None
         
         try:
-            blob = self.bucket.blob("guppeu.xlsx")
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, "guppeu.xlsx")
-            blob.download_to_filename(local_path)
-            print(f"guppeu.xlsx 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get("guppeu.xlsx", self.bucket)
+            print(f"guppeu.xlsx 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f"guppeu.xlsx 다운로드 실패: {e}")
             return None
     
     def get_bill_amount(self, company_name="구쁘"):
-        """고지서에서 업데이트된 금액 조회"""
+        """고지서에서 업데이트된 금액 조회 (실행 컨텍스트의 저장소 스냅샷)"""
         try:
-            import requests
-            response = requests.get('http://localhost:5001/api/bill-amounts')
-            if response.ok:
-                bill_data = response.json()
-                if company_name in bill_data:
-                    amount_str = bill_data[company_name].get('amount', '')
-                    if amount_str:
-                        amount_clean = amount_str.replace(',', '').replace('원', '').strip()
-                        if amount_clean.isdigit():
-                            amount = float(amount_clean)
-                            print(f"{company_name} 고지서 금액 조회: {amount:,.0f}원")
-                            return amount
-                        else:
-                            print(f"금액 형식 오류: {amount_str}")
-                            return None
-                else:
-                    print(f"{company_name} 고지서 정보를 찾을 수 없습니다")
-                    return None
-            else:
-                print("고지서 정보 조회 실패")
-                return None
+            return self.context.bill_amount(company_name)
         except Exception as e:
             print(f"고지서 금액 조회 실패: {e}")
             return None
@@ -94,12 +57,14 @@ class GuppuPreprocessor:
                 print("temp_processing 폴더가 없습니다")
                 return None
             
-            files = os.listdir(temp_dir)
-            for filename in files:
-                if company_name in filename and ("SMS" in filename or "발송이력" in filename) and filename.endswith(('.xlsx', '.xls')):
-                    file_path = os.path.join(temp_dir, filename)
-                    print(f"구쁘 SMS 발송이력 파일 발견: {filename}")
-                    return file_path
+            entries = get_file_catalog().find(
+                kind="sms", directories=["temp_processing"],
+                match=lambda f: company_name in f and f.endswith(('.xlsx', '.xls'))
+            )
+            if entries:
+                filename = entries[0]["name"]
+                print(f"구쁘 SMS 발송이력 파일 발견: {filename}")
+                return os.path.join(temp_dir, filename)
             
             print("구쁘 SMS 발송이력 파일을 찾을 수 없습니다")
             return None
@@ -112,8 +77,9 @@ class GuppuPreprocessor:
         try:
             print(f"SMS 발송이력 분석 시작: {sms_file_path}")
             
-            # Excel 파일 읽기
-            df = pd.read_excel(sms_file_path)
+            # 발송이력 파일 읽기 (형식 판별 + 표 캐시)
+            # F열(제목), H열(상태), I열(문자유형)만 읽음 (열이 모자라면 읽기 실패 → 0건)
+            df = load_table(sms_file_path, as_csv=False, schema="guppu_sms")
             
             if df.empty:
                 print("SMS 데이터가 비어있습니다")
@@ -122,28 +88,16 @@ class GuppuPreprocessor:
             print(f"총 {len(df)}개의 SMS 발송 기록 발견")
             print(f"컬럼 정보: {list(df.columns)}")
             
-            # F열(제목), H열(상태), I열(문자유형) 확인
-            title_col = None
-            status_col = None
-            msg_type_col = None
-            
-            # 컬럼 인덱스로 접근 (F열=5, H열=7, I열=8)
-            if len(df.columns) > 5:
-                title_col = df.columns[5]  # F열
-                print(f"제목 컬럼 (F열): {title_col}")
-            
-            if len(df.columns) > 7:
-                status_col = df.columns[7]  # H열
-                print(f"상태 컬럼 (H열): {status_col}")
-            
-            if len(df.columns) > 8:
-                msg_type_col = df.columns[8]  # I열
-                print(f"문자유형 컬럼 (I열): {msg_type_col}")
-            
-            if title_col is None or status_col is None or msg_type_col is None:
+            # 스키마 순서대로 F열(제목), H열(상태), I열(문자유형)
+            if len(df.columns) < 3:
                 print("필요한 컬럼을 찾을 수 없습니다")
                 return {"SMS": 0, "LMS": 0, "MMS": 0, "TALK": 0}
             
+            title_col, status_col, msg_type_col = df.columns[:3]
+            print(f"제목 컬럼 (F열): {title_col}")
+            print(f"상태 컬럼 (H열): {status_col}")
+            print(f"문자유형 컬럼 (I열): {msg_type_col}")
+            
             # 카운트 초기화
             counts = {"SMS": 0, "LMS": 0, "MMS": 0, "TALK": 0}
             
@@ -254,10 +208,8 @@ class GuppuPreprocessor:
             final_filename = f"{date_prefix}_구쁘_상담솔루션 청구내역서.xlsx"
             final_path = os.path.join(self.download_dir, final_filename)
             
-            shutil.copy2(template_path, final_path)
-            print(f"템플릿 파일 복사 완료: {final_filename}")
-            
-            workbook = load_workbook(final_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 final_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # 1. 시트명 변경 (예: "2025년 08월" → 수집한 달로 변경)
             for sheet in workbook.worksheets:
@@ -370,7 +322,7 @@ class GuppuPreprocessor:
                 # 하단 테이블 수식 업데이트 (B24, D24, D25)
                 self.update_formula_references(doc_sheet, year_month)
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 로고 이미지 삽입 (B2 셀)
             try:
@@ -420,10 +372,12 @@ class GuppuPreprocessor:
         except Exception as e:
             print(f"수식 참조 업데이트 오류: {e}")
     
-    def process_guppu_data(self, collection_date):
+    def process_guppu_data(self, collection_date, progress_callback=None):
         """구쁘 데이터 전처리 메인 함수"""
         try:
             print("=== 구쁘 데이터 전처리 시작 ===")
+            if progress_callback:
+                progress_callback("load_inputs")
             
             # 1. Firebase에서 템플릿 다운로드
             template_path = self.download_guppu_template()
@@ -437,6 +391,8 @@ class GuppuPreprocessor:
                 print("고지서 금액 조회 실패")
                 return False
             
+            if progress_callback:
+                progress_callback("compute")
             # 3. 부가세 제외 금액 계산
             amount_without_vat = self.calculate_amount_without_vat(total_amount)
             if amount_without_vat is None:
@@ -455,6 +411,8 @@ class GuppuPreprocessor:
             # 5. ICS 사용 계정 현황 데이터 계산
             ics_data = self.calculate_ics_usage_data(collection_date)
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 6. 템플릿 업데이트 (SMS 카운트 + ICS 데이터 포함)
             final_invoice_path = self.update_guppu_template(template_path, amount_without_vat, collection_date, total_amount, sms_counts, ics_data)
             if not final_invoice_path:
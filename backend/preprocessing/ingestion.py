@@ -0,0 +1,332 @@
+"""
+ICS 내보내기 파일 공용 읽기 (형식 판별 + 내용 해시 기준 표 캐시)
+
+고객사별 convert_xls_to_csv가 파일 전체를 UTF-8 텍스트로 읽어 <html을 찾고,
+CSV로 저장한 뒤 다음 단계에서 다시 읽던 것을 한 곳으로 모은다.
+- 형식은 앞부분 바이트로 판별: OLE2(.xls) / zip(.xlsx) / HTML 표(.xls로 내려받는 ICS 내보내기) / CSV(인코딩 포함)
+- 파싱은 한 번만 하고, 정규화된 표를 내용 SHA-256 기준으로
+  temp_processing/.table_cache에 Parquet(pyarrow 없거나 저장 불가한 표는 pickle)로 보관
+  (캐시 키에 CACHE_VERSION 포함 - 읽기 코드가 바뀌면 올려서 이전 표를 쓰지 않게 함)
+- as_csv=True(기본)면 CSV로 저장 후 다시 읽은 것과 같은 타입으로 맞춘다 (기존 전처리 결과와 동일)
+- schema(column_schemas.py)를 주면 필요한 열만 파싱하고 상태/유형 열은 category, 전화번호 열은 문자열로 읽는다
+- 집계만 필요한 대용량 발송이력은 iter_table_chunks로 표 전체를 만들지 않고 행 묶음 단위로 읽는다
+"""
+
+import codecs
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from backend.preprocessing.column_schemas import get_schema
+from backend.preprocessing.excel_reader import iter_rows, read_excel
+from backend.utils.metrics import registry as metrics_registry
+
+try:
+    import pyarrow  # noqa: F401  (Parquet 엔진)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_DIR = os.path.join("temp_processing", ".table_cache")
+CACHE_MAX_AGE_DAYS = 30
+# 파싱/정규화 코드나 고객사 prepare 함수(예: AnhousPreprocessor._prepare_export)를 바꾸면 올린다
+CACHE_VERSION = 2
+SNIFF_BYTES = 8192
+CHUNK_SIZE = 1024 * 1024
+CHUNK_ROWS = 50000
+
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGIC = b"PK\x03\x04"
+HTML_MARKERS = (b"<html", b"<table", b"<!doctype html", b"<meta")
+
+TABLE_CACHE_REQUESTS = metrics_registry.counter(
+    "table_cache_requests_total", "입력 표 캐시 조회 결과", ("format", "result")
+)
+
+
+def _stat_key(stat_result):
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def sniff_format(path):
+    """앞부분 바이트로 형식 판별: "xls" / "xlsx" / "html" / "csv" """
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(OLE2_MAGIC):
+        return "xls"
+    if head.startswith(ZIP_MAGIC):
+        return "xlsx"
+    lowered = head.lstrip(codecs.BOM_UTF8).lstrip().lower()
+    if lowered.startswith(b"<") or any(marker in lowered for marker in HTML_MARKERS):
+        return "html"
+    return "csv"
+
+
+def _text_encoding(path):
+    """BOM이 있으면 utf-8-sig, UTF-8로 읽히면 utf-8, 아니면 cp949 (국내 ICS 기본 인코딩)"""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+        if head.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            decoder.decode(head)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+            return "utf-8"
+        except UnicodeDecodeError:
+            return "cp949"
+
+
+def _parse(path, fmt, dtype=None, usecols=None):
+    """usecols는 CSV/Excel에서만 파싱 단계에 적용 (HTML은 전체를 읽은 뒤 _select_columns)"""
+    if fmt == "csv":
+        return pd.read_csv(path, encoding=_text_encoding(path), dtype=dtype, usecols=usecols)
+    if fmt == "html":
+        with open(path, "r", encoding=_text_encoding(path)) as f:
+            return pd.read_html(io.StringIO(f.read()))[0]
+    # xls/xlsx: 설치된 가장 빠른 엔진 (excel_reader)
+    return read_excel(path, usecols=usecols, dtype=dtype)
+
+
+def _schema_usecols(schema):
+    if "positions" in schema:
+        return list(schema["positions"])
+    if "columns" in schema:
+        wanted = set(schema["columns"])
+        return lambda column: column in wanted
+    return None
+
+
+def _select_columns(df, schema):
+    """파싱 단계에서 열을 고르지 못한 경우(HTML) 스키마 열만 남긴다"""
+    if "positions" in schema:
+        return df.iloc[:, list(schema["positions"])]
+    if "columns" in schema:
+        return df[[column for column in df.columns if column in schema["columns"]]]
+    return df
+
+
+def _apply_schema_types(df, schema):
+    """전화번호 열은 문자열(끝의 .0 제거), 상태/유형 열은 category"""
+    def column_name(key):
+        if isinstance(key, int):
+            return df.columns[list(schema["positions"]).index(key)]
+        return key
+
+    for key in schema.get("phones", ()):
+        column = column_name(key)
+        if column in df.columns:
+            df[column] = df[column].astype("str").str.strip().str.replace(r"\.0$", "", regex=True)
+            df.loc[df[column].isin(("", "nan")), column] = pd.NA
+    for key in schema.get("categories", ()):
+        column = column_name(key)
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def _as_csv_types(df, dtype=None):
+    """CSV로 저장 후 다시 읽은 것과 같은 타입으로 정규화 (디스크 없이 메모리에서)"""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), dtype=dtype)
+
+
+class TableCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._digests = {}  # 입력 파일 stat → sha256 (같은 파일 재해싱 생략)
+
+    def _digest(self, path):
+        key = _stat_key(os.stat(path))
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def _entry_base(self, digest, options):
+        options_key = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{options_key}")
+
+    def _read(self, base):
+        for suffix, reader in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+            if suffix == ".parquet" and not PARQUET_AVAILABLE:
+                continue
+            try:
+                df = reader(base + suffix)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"표 캐시 읽기 실패, 다시 파싱: {os.path.basename(base)} ({e})")
+                continue
+            os.utime(base + suffix)  # 오래된 항목 정리 기준 (마지막 사용 시각)
+            return df
+        return None
+
+    def _write(self, base, df):
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        writers = [(".pkl", lambda path: df.to_pickle(path))]
+        if PARQUET_AVAILABLE:
+            writers.insert(0, (".parquet", lambda path: df.to_parquet(path, index=False)))
+        for suffix, writer in writers:
+            temp_path = f"{base}{suffix}.{os.getpid()}.tmp"
+            try:
+                writer(temp_path)
+                os.replace(temp_path, base + suffix)
+                return suffix
+            except Exception:
+                # 열 이름이 문자열이 아니거나 한 열에 타입이 섞인 표는 Parquet 저장 불가 → pickle
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        return None
+
+    def load(self, path, dtype=None, prepare=None, as_csv=True, schema=None):
+        """
+        입력 파일을 DataFrame으로 반환 (같은 내용/옵션이면 캐시 사용).
+        prepare(df, fmt): 정규화 전에 적용할 고객사별 보정 (예: HTML 제목 행 제거)
+        schema: column_schemas.COLUMN_SCHEMAS 키 (읽을 열/category/전화번호 열)
+        """
+        fmt = sniff_format(path)
+        schema_spec = get_schema(schema) if schema else {}
+        dtype = dict(dtype or {})
+        for key in schema_spec.get("phones", ()):
+            dtype.setdefault(key, str)
+        options = {
+            "version": CACHE_VERSION,
+            "format": fmt,
+            "dtype": {str(column): str(value) for column, value in dtype.items()},
+            "prepare": getattr(prepare, "__qualname__", None),
+            "as_csv": as_csv,
+            "schema": {key: list(value) for key, value in schema_spec.items()},
+            "pandas": pd.__version__,
+        }
+        base = self._entry_base(self._digest(path), options)
+        df = self._read(base)
+        if df is not None:
+            TABLE_CACHE_REQUESTS.inc(format=fmt, result="hit")
+            return df
+
+        started = time.perf_counter()
+        usecols = _schema_usecols(schema_spec) if fmt != "html" else None
+        # 위치로 지정한 전화번호 열은 열 이름을 모르므로 dtype 대신 _apply_schema_types에서 변환
+        name_dtype = {column: value for column, value in dtype.items() if not isinstance(column, int)} or None
+        df = _parse(path, fmt, name_dtype if fmt != "html" else None, usecols)
+        if prepare is not None:
+            df = prepare(df, fmt)
+        if schema_spec and fmt == "html":
+            df = _select_columns(df, schema_spec)
+        if as_csv and fmt != "csv":
+            df = _as_csv_types(df, name_dtype)
+        if schema_spec:
+            df = _apply_schema_types(df, schema_spec)
+        # Parquet은 인덱스를 저장하지 않으므로 캐시 적중 때와 같도록 항상 0부터 다시 매김
+        df = df.reset_index(drop=True)
+        suffix = self._write(base, df)
+        TABLE_CACHE_REQUESTS.inc(format=fmt, result="parsed" if suffix else "uncached")
+        print(f"입력 파일 파싱({fmt}): {os.path.basename(path)} {df.shape[0]}행 x {df.shape[1]}열, "
+              f"{time.perf_counter() - started:.2f}초")
+        return df
+
+    def prune(self):
+        """max_age_days 동안 쓰지 않은 캐시 항목 삭제. (삭제 수, 회수 바이트) 반환"""
+        removed = 0
+        reclaimed = 0
+        cutoff = time.time() - self.max_age_days * 86400
+        for dirpath, _dirnames, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat_result = os.stat(path)
+                    if stat_result.st_mtime >= cutoff:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                reclaimed += stat_result.st_size
+        if removed:
+            print(f"표 캐시 정리: {removed}개, {reclaimed:,} bytes 회수")
+        return removed, reclaimed
+
+
+_table_cache = TableCache()
+
+
+def get_table_cache():
+    return _table_cache
+
+
+def load_table(path, dtype=None, prepare=None, as_csv=True, schema=None):
+    """get_table_cache().load() 단축 함수"""
+    return _table_cache.load(path, dtype=dtype, prepare=prepare, as_csv=as_csv, schema=schema)
+
+
+def _schema_dtype(schema):
+    return {key: str for key in schema.get("phones", ()) if not isinstance(key, int)} or None
+
+
+def _iter_excel_chunks(path, schema, chunk_rows):
+    """.xlsx를 행 스트리밍으로 읽어 chunk_rows행씩 DataFrame 생성 (스키마 열만 보관)"""
+    rows = iter_rows(path)
+    header = next(rows, None)
+    if not header:
+        return
+    if "positions" in schema:
+        keep = [index for index in schema["positions"] if index < len(header)]
+        if len(keep) < len(schema["positions"]):
+            raise ValueError(f"열 위치가 범위를 벗어남: {schema['positions']} (열 {len(header)}개)")
+    elif "columns" in schema:
+        keep = [index for index, column in enumerate(header) if column in schema["columns"]]
+    else:
+        keep = list(range(len(header)))
+    names = [header[index] for index in keep]
+    dtype = _schema_dtype(schema)
+
+    def build(batch):
+        # 타입 추론은 read_excel과 같은 TextParser 사용 (묶음마다 독립)
+        return _apply_schema_types(TextParser([names] + batch, header=0, dtype=dtype).read(), schema)
+
+    batch = []
+    for row in rows:
+        if not row:
+            continue  # 빈 행 (read_excel은 끝의 빈 행만 버리지만 집계 결과에는 영향 없음)
+        batch.append([row[index] if index < len(row) else "" for index in keep])
+        if len(batch) >= chunk_rows:
+            yield build(batch)
+            batch = []
+    if batch:
+        yield build(batch)
+
+
+def iter_table_chunks(path, schema=None, chunk_rows=CHUNK_ROWS):
+    """
+    입력 파일을 chunk_rows행 단위 DataFrame으로 차례로 반환 (표 캐시 사용 안 함).
+    CSV는 read_csv(chunksize), .xlsx는 읽기 전용 행 스트리밍.
+    .xls/HTML 내보내기는 스트리밍 파서가 없으므로 load_table 결과를 한 묶음으로 반환한다.
+    """
+    schema_spec = get_schema(schema) if schema else {}
+    fmt = sniff_format(path)
+    if fmt == "csv":
+        with pd.read_csv(path, encoding=_text_encoding(path), usecols=_schema_usecols(schema_spec),
+                         dtype=_schema_dtype(schema_spec), chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield _apply_schema_types(chunk, schema_spec)
+    elif fmt == "xlsx":
+        yield from _iter_excel_chunks(path, schema_spec, chunk_rows)
+    else:
+        yield load_table(path, schema=schema)
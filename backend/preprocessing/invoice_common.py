@@ -52,9 +52,9 @@ def apply_ceo_line_to_doc_sheet_d35(
         return False
 
     if ceo_name is None:
-        from backend.storage.admin_storage import AdminStorage
+        from backend.storage.admin_storage import create_admin_storage
 
-        data = AdminStorage().get_invoice_common_settings()
+        data = create_admin_storage().get_invoice_common_settings()
         ceo_name = data.get("ceo_name")
 
     val = format_ceo_line_value(ceo_name)
@@ -6,17 +6,18 @@ from openpyxl.styles import PatternFill, Border, Side
 from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 import re
-import shutil
-import firebase_admin
-from firebase_admin import credentials, storage, firestore
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.utils.reference_cache import get_reference_cache
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
+from backend.preprocessing.ingestion import load_table
 import json
 import calendar
 
 
 class KolonPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.bucket = None
@@ -24,22 +25,10 @@ class KolonPreprocessor:
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
-            self.db = firestore.client()
+            self.bucket = self.context.bucket()
+            self.db = self.context.firestore()
             print("Firebase Storage 및 Firestore 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
@@ -47,123 +36,44 @@ class KolonPreprocessor:
             self.db = None
     
     def download_kolon_template(self):
-        """Firebase에서 kolon.xlsx 템플릿 다운로드"""
+        """Firebase의 kolon.xlsx 템플릿 (로컬 캐시 사용)"""
         if not self.bucket:
             print("Firebase 연결이 없습니다")
             return None
         
         try:
-            blob = self.bucket.blob("kolon.xlsx")
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, "kolon.xlsx")
-            blob.download_to_filename(local_path)
-            print(f"kolon.xlsx 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get("kolon.xlsx", self.bucket)
+            print(f"kolon.xlsx 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f"kolon.xlsx 템플릿 다운로드 실패: {e}")
             return None
     
     def get_dept_mapping(self):
-        """Firebase에서 부서 매핑 데이터 가져오기"""
+        """Firebase 부서 매핑 데이터 (참조 데이터 캐시 사용)"""
         try:
             if self.db is None:
                 print("Firebase Firestore 연결이 초기화되지 않았습니다.")
                 return {}
             
-            # Firestore에서 부서 정보 조회
-            docs = self.db.collection('dept_codes').stream()
-            
-            dept_mapping = {}
-            for doc in docs:
-                data = doc.to_dict()
-                if 'DEPT_NM' in data and 'DEPT_CD' in data:
-                    dept_mapping[data['DEPT_NM']] = data['DEPT_CD']
-            
-            print(f"Firebase에서 {len(dept_mapping)}개의 부서 매핑 정보를 가져왔습니다.")
+            dept_mapping = get_reference_cache().get("dept_codes", self._load_dept_mapping)
+            print(f"부서 매핑 정보 {len(dept_mapping)}개 사용")
             return dept_mapping
             
         except Exception as e:
             print(f"Firebase에서 부서 매핑 데이터 조회 실패: {str(e)}")
             return {}
+    
+    def _load_dept_mapping(self):
+        """Firestore dept_codes 컬렉션 전체 조회 → {부서명: 부서코드}"""
+        dept_mapping = {}
+        for doc in self.db.collection('dept_codes').stream():
+            data = doc.to_dict()
+            if 'DEPT_NM' in data and 'DEPT_CD' in data:
+                dept_mapping[data['DEPT_NM']] = data['DEPT_CD']
+        print(f"Firebase에서 {len(dept_mapping)}개의 부서 매핑 정보를 가져왔습니다.")
+        return dept_mapping
         
-    def convert_xls_to_csv(self, xls_file_path):
-        """XLS/XLSX/CSV 파일을 CSV로 변환 또는 확인"""
-        try:
-            print(f"🔍 변환 시작: {os.path.basename(xls_file_path)}")
-            print(f"   원본 파일: {xls_file_path}")
-            
-            # 파일 확장자 확인
-            if xls_file_path.endswith('.csv'):
-                # 이미 CSV 파일인 경우 변환 필요 없음
-                print(f"   이미 CSV 파일입니다")
-                try:
-                    # CSV 파일 읽어서 데이터 확인만
-                    df = pd.read_csv(xls_file_path)
-                    print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                    print(f"   컬럼: {list(df.columns)}")
-                    print(f"CSV 파일 확인 완료")
-                    return xls_file_path
-                except Exception as e:
-                    print(f"CSV 파일 읽기 실패: {e}")
-                    return None
-            elif xls_file_path.endswith('.xlsx'):
-                # Excel 파일 처리
-                print(f"   Excel 파일로 읽기 시도...")
-                df = pd.read_excel(xls_file_path)
-                print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                print(f"   컬럼: {list(df.columns)}")
-                csv_path = xls_file_path.replace('.xlsx', '.csv')
-                df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                print(f"Excel → .csv 변환 완료: {csv_path}")
-                return csv_path
-            else:
-                # XLS 파일 처리 (HTML 내용인지 확인)
-                try:
-                    with open(xls_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # HTML 내용인지 확인
-                    if '<html' in content.lower() or '<table' in content.lower():
-                        # HTML 테이블 파싱
-                        print(f"   HTML 테이블 형태 감지")
-                        df = pd.read_html(xls_file_path)[0]
-                        print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                        print(f"   컬럼: {list(df.columns)}")
-                        
-                        # CSV로 저장
-                        # 원본 파일명에서 확장자만 변경하여 CSV 저장
-                        csv_path = os.path.splitext(xls_file_path)[0] + '.csv'
-                        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                        print(f"HTML → .csv 변환 완료: {csv_path}")
-                        return csv_path
-                    else:
-                        # 일반 Excel 파일 처리
-                        print(f"   일반 Excel 파일로 읽기 시도...")
-                        df = pd.read_excel(xls_file_path)
-                        print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                        print(f"   컬럼: {list(df.columns)}")
-                        # 원본 파일명에서 확장자만 변경하여 CSV 저장
-                        csv_path = os.path.splitext(xls_file_path)[0] + '.csv'
-                        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                        print(f"Excel → .csv 변환 완료: {csv_path}")
-                        return csv_path
-                except UnicodeDecodeError:
-                    # 인코딩 오류 시 Excel로 읽기 시도
-                    print(f"   인코딩 오류, Excel로 읽기 시도...")
-                    df = pd.read_excel(xls_file_path)
-                    print(f"   데이터 형태: {df.shape[0]}행 x {df.shape[1]}열")
-                    print(f"   컬럼: {list(df.columns)}")
-                    csv_path = xls_file_path.replace('.xls', '.csv')
-                    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-                    print(f"Excel → .csv 변환 완료: {csv_path}")
-                    return csv_path
-                
-        except Exception as e:
-            print(f"변환 실패: {xls_file_path}, 오류: {e}")
-            return None
-
     def parse_korean_datetime(self, date_str):
         """한글 날짜를 datetime으로 변환"""
         try:
@@ -527,11 +437,8 @@ class KolonPreprocessor:
             output_filename = f"{date_prefix}_코오롱FnC_상담솔루션 청구내역서.xlsx"
             output_path = os.path.join(self.download_dir, output_filename)
             
-            # 템플릿 파일 복사
-            shutil.copy2(template_path, output_path)
-            print(f"템플릿 파일 복사 완료: {output_filename}")
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # B9 셀에 문서번호 설정 (MMP-{년월} 형식) — 대외공문만. 세부내역 B9는 비워 둠(요청사항).
             document_number = f"MMP-{date_prefix}"
@@ -617,7 +524,7 @@ class KolonPreprocessor:
                     
                     print(f"Meta ICS 계산 완료: {ics_data['days_in_month']}일 기준")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 파일 저장
             workbook.save(output_path)
@@ -652,10 +559,12 @@ class KolonPreprocessor:
         except Exception as e:
             print(f"수식 참조 업데이트 오류: {e}")
 
-    def process_kolon_data(self, collection_date, input_dir="temp_processing", selected_filenames=None):
+    def process_kolon_data(self, collection_date, input_dir="temp_processing", selected_filenames=None, progress_callback=None):
         """코오롱 데이터 전처리 메인 함수"""
         try:
             print("코오롱 데이터 전처리 시작")
+            if progress_callback:
+                progress_callback("load_inputs")
             
             temp_dir = input_dir
             if not os.path.exists(temp_dir):
@@ -681,56 +590,42 @@ class KolonPreprocessor:
                 print(f"코오롱 파일이 2개 필요합니다. 현재: {len(kolon_files)}개")
                 return False
             
-            # 2. CSV 변환
-            csv_files = []
+            # 2. 입력 파일 로드 (형식 판별 + 표 캐시, CSV 중간 파일 없음)
+            tables = []
             for file_path in kolon_files:
-                csv_path = self.convert_xls_to_csv(file_path)
-                if csv_path:
-                    csv_files.append(csv_path)
+                try:
+                    tables.append((file_path, load_table(file_path)))
+                except Exception as e:
+                    print(f"파일 읽기 실패: {file_path}, 오류: {e}")
             
-            if len(csv_files) != 2:
-                print("CSV 변환 실패")
+            if len(tables) != 2:
+                print("입력 파일 읽기 실패")
                 return False
             
-            print(f"변환 완료: {len(csv_files)}개 파일")
-            
-            # 3. 데이터 읽기
-            print("변환된 CSV 파일 목록:")
-            for f in csv_files:
-                print(f"   - {f}")
-                
-            # 파일 찾기 (파일 내용으로 구분)
-            jaegyeong_files = []
-            openai_files = []
-            
-            for f in csv_files:
-                try:
-                    df = pd.read_csv(f)
-                    if '매출일자' in df.columns:  # 재경팀 데이터
-                        jaegyeong_files.append(f)
-                    elif '날짜' in df.columns:  # OpenAI 데이터
-                        openai_files.append(f)
-                except Exception as e:
-                    print(f"파일 읽기 실패: {f}, 오류: {e}")
+            # 3. 파일 구분 (파일 내용으로)
+            df_jaegyeong = None
+            df_openai = None
+            for file_path, df in tables:
+                print(f"   - {os.path.basename(file_path)}: {df.shape[0]}행 x {df.shape[1]}열")
+                if '매출일자' in df.columns and df_jaegyeong is None:  # 재경팀 데이터
+                    df_jaegyeong = df
+                elif '날짜' in df.columns and df_openai is None:  # OpenAI 데이터
+                    df_openai = df
             
-            if not jaegyeong_files:
+            if df_jaegyeong is None:
                 print("재경팀 데이터 파일을 찾을 수 없습니다")
                 return False
-            if not openai_files:
+            if df_openai is None:
                 print("OpenAI 데이터 파일을 찾을 수 없습니다")
                 return False
-                
-            jaegyeong_file = jaegyeong_files[0]
-            openai_file = openai_files[0]
-            
-            # 재경팀 데이터 로드 (빈 행 제거)
-            df_jaegyeong = pd.read_csv(jaegyeong_file).dropna(how='all')
             
-            # OpenAI 데이터 로드
-            df_openai = pd.read_csv(openai_file)
+            # 재경팀 데이터 빈 행 제거
+            df_jaegyeong = df_jaegyeong.dropna(how='all')
             
             print(f"데이터 로드 완료 (재경팀: {len(df_jaegyeong)}행, OpenAI: {len(df_openai)}행)")
             
+            if progress_callback:
+                progress_callback("compute")
             # 4. 데이터 전처리
             df_jaegyeong = self.preprocess_jaegyeong_data(df_jaegyeong)
             if df_jaegyeong is None:
@@ -821,6 +716,8 @@ class KolonPreprocessor:
                         print("부가세 제외 계산 실패")
                         return False
                     
+                    if progress_callback:
+                        progress_callback("fill_template")
                     # 3.3. kolon.xlsx 템플릿 다운로드
                     template_path = self.download_kolon_template()
                     if template_path is None:
@@ -1,86 +1,48 @@
 import os
-import shutil
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 import re
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
+from backend.preprocessing.ingestion import load_table
+from backend.storage.file_catalog import get_file_catalog
 
 class MathpressoPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print("Firebase Storage 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
             self.bucket = None
     
     def download_mathpresso_template(self):
-        """Firebase에서 mathpresso.xlsx 템플릿 다운로드"""
+        """Firebase의 mathpresso.xlsx 템플릿 (로컬 캐시 사용)"""
         if not self.bucket:
             print("Firebase 연결이 없습니다")
             return None
         
         try:
-            blob = self.bucket.blob("mathpresso.xlsx")
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, "mathpresso.xlsx")
-            blob.download_to_filename(local_path)
-            print(f"mathpresso.xlsx 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get("mathpresso.xlsx", self.bucket)
+            print(f"mathpresso.xlsx 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f"mathpresso.xlsx 템플릿 다운로드 실패: {e}")
             return None
     
     def get_bill_amount(self, company_name="매스프레소(콴다)"):
-        """고지서에서 업데이트된 금액 조회"""
+        """고지서에서 업데이트된 금액 조회 (실행 컨텍스트의 저장소 스냅샷)"""
         try:
-            import requests
-            response = requests.get('http://localhost:5001/api/bill-amounts')
-            if response.ok:
-                bill_data = response.json()
-                if company_name in bill_data:
-                    amount_str = bill_data[company_name].get('amount', '')
-                    if amount_str:
-                        amount_clean = amount_str.replace(',', '').replace('원', '').strip()
-                        if amount_clean.isdigit():
-                            amount = float(amount_clean)
-                            print(f"{company_name} 고지서 금액 조회: {amount:,.0f}원")
-                            return amount
-                        else:
-                            print(f"금액 형식 오류: {amount_str}")
-                            return None
-                else:
-                    print(f"{company_name} 고지서 정보를 찾을 수 없습니다")
-                    return None
-            else:
-                print("고지서 정보 조회 실패")
-                return None
+            return self.context.bill_amount(company_name)
         except Exception as e:
             print(f"고지서 금액 조회 실패: {e}")
             return None
@@ -117,20 +79,14 @@ class MathpressoPreprocessor:
         try:
             temp_dir = os.path.join(os.getcwd(), "temp_processing")
             if os.path.exists(temp_dir):
-                all_files = os.listdir(temp_dir)
-                mathpresso_files = []
-                
-                for filename in all_files:
-                    if ("매스프레소(콴다)" in filename and filename.endswith('.xlsx')):
-                        file_path = os.path.join(temp_dir, filename)
-                        import time
-                        current_time = time.time()
-                        if os.path.exists(file_path) and (current_time - os.path.getctime(file_path)) < 3600:
-                            mathpresso_files.append((filename, os.path.getctime(file_path)))
+                import time
+                mathpresso_files = get_file_catalog().find(
+                    directories=["temp_processing"], since=time.time() - 3600,
+                    match=lambda f: "매스프레소(콴다)" in f and f.endswith('.xlsx')
+                )
                 
                 if mathpresso_files:
-                    latest_file = sorted(mathpresso_files, key=lambda x: x[1], reverse=True)[0]
-                    filename = latest_file[0]
+                    filename = mathpresso_files[0]["name"]
                     file_path = os.path.join(temp_dir, filename)
                     print(f"매스프레소(콴다) 파일 발견: {filename}")
                     return file_path
@@ -148,7 +104,7 @@ class MathpressoPreprocessor:
         """XLSX 파일을 CSV로 변환하고 문자유형별 성공 건수 카운트"""
         try:
             # XLSX 파일 읽기
-            df = pd.read_excel(xlsx_file_path)
+            df = load_table(xlsx_file_path, as_csv=False, schema="mathpresso_sms")
             print(f" XLSX 파일 읽기 완료: {len(df)}행")
             
             # 필요한 컬럼 확인
@@ -198,11 +154,8 @@ class MathpressoPreprocessor:
             output_filename = f"{date_prefix}_매스프레소(콴다)_청구내역서.xlsx"
             output_path = os.path.join(self.download_dir, output_filename)
             
-            # 템플릿 파일 복사
-            shutil.copy2(template_path, output_path)
-            print(f"템플릿 파일 복사 완료: {output_filename}")
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # B9 셀에 문서번호 설정 (MMP-{년월} 형식)
             document_number = f"MMP-{date_prefix}"
@@ -281,7 +234,7 @@ class MathpressoPreprocessor:
                 detail_sheet.cell(row=4, column=6).value = amount_without_vat
                 print(f"세부내역 시트 F4 셀 업데이트: {amount_without_vat}원 (쉼표 없이)")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 로고 이미지 삽입 (B2 셀)
             try:
@@ -331,10 +284,12 @@ class MathpressoPreprocessor:
         except Exception as e:
             print(f"수식 참조 업데이트 오류: {e}")
     
-    def process_mathpresso_data(self, collection_date):
+    def process_mathpresso_data(self, collection_date, progress_callback=None):
         """매스프레소(콴다) 데이터 전처리 메인 함수"""
         try:
             print("매스프레소(콴다) 데이터 전처리 시작")
+            if progress_callback:
+                progress_callback("load_inputs")
             
             # 1. 고지서 금액 조회
             total_amount = self.get_bill_amount("매스프레소(콴다)")
@@ -354,6 +309,8 @@ class MathpressoPreprocessor:
                 print(" 업로드된 파일을 찾을 수 없습니다")
                 return False
             
+            if progress_callback:
+                progress_callback("compute")
             # 4. XLSX 파일을 CSV로 변환하고 문자유형별 성공 건수 카운트
             message_counts = self.convert_xlsx_to_csv_and_count_success(uploaded_file_path)
             if not message_counts:
@@ -367,6 +324,8 @@ class MathpressoPreprocessor:
                 print("mathpresso.xlsx 템플릿 다운로드 실패")
                 return False
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 6. 템플릿 업데이트 및 청구서 생성
             final_invoice_path = self.update_mathpresso_template(template_path, message_counts, amount_without_vat, collection_date)
             if final_invoice_path is None:
@@ -0,0 +1,190 @@
+"""고객사별 전처리 실행기 (HTTP 요청 스레드와 분리된 백그라운드 작업에서 호출)"""
+
+import os
+import time
+from datetime import datetime
+
+from .anhous_preprocessing import AnhousPreprocessor
+from .kolon_preprocessing import KolonPreprocessor
+from .sk_preprocessing import SKPreprocessor
+from .deciders_preprocessing import DecidersPreprocessor
+from .wconcept_preprocessing import WconceptPreprocessor
+from .mathpresso_preprocessing import MathpressoPreprocessor
+from .guppu_preprocessing import GuppuPreprocessor
+from .billing_context import BillingContext
+from ..storage.file_catalog import get_file_catalog
+
+# 단계 키 → (진행률, 로그 문구). 전처리기는 progress_callback(단계 키)로 보고한다.
+PREPROCESS_STAGES = {
+    "load_inputs": (20, "입력 파일 및 템플릿 로드"),
+    "compute": (45, "청구 데이터 계산"),
+    "fill_template": (70, "청구서 템플릿 작성 및 저장"),
+    "save": (90, "생성 파일 확인 및 결과 등록"),
+}
+
+SUPPORTED_COMPANIES = (
+    "앤하우스",
+    "코오롱Fnc",
+    "SK일렉링크",
+    "W컨셉",
+    "매스프레소(콴다)",
+    "디싸이더스/애드프로젝트",
+    "구쁘",
+)
+
+DOWNLOAD_DIR = "/app/downloads"
+TEMP_DIR = "temp_processing"
+KOLON_INPUT_DIR = os.path.join(TEMP_DIR, "kolon_inputs")
+
+
+class PreprocessError(Exception):
+    """전처리 실패 (메시지는 작업 상태의 error로 그대로 노출)"""
+
+
+def _report(progress_callback, stage):
+    if progress_callback:
+        progress_callback(stage)
+
+
+def _find_recent_outputs(search_dirs, matcher, max_age=300):
+    """최근 max_age초 이내 생성된 결과 파일을 최신순으로 반환 (동일 파일명은 한 번만)"""
+    entries = get_file_catalog().find(directories=search_dirs, since=time.time() - max_age, match=matcher)
+    filenames = []
+    for entry in entries:
+        if entry["name"] not in filenames:
+            filenames.append(entry["name"])
+    return filenames
+
+
+def _expected_output(filename):
+    """temp_processing에 예상 파일명이 생성됐으면 [파일명], 아니면 []"""
+    download_dir = os.path.join(os.getcwd(), TEMP_DIR)
+    os.makedirs(download_dir, exist_ok=True)
+    expected_path = os.path.join(download_dir, filename)
+    if os.path.exists(expected_path):
+        return [filename]
+    print(f"생성된 파일을 찾을 수 없습니다: {expected_path}")
+    return []
+
+
+def process_wconcept(collection_date, license_count=40, license_cost=80000, progress_callback=None, context=None):
+    """W컨셉 전처리 후 생성 파일 목록 반환 (W컨셉은 n-1월 파일명)"""
+    try:
+        preprocessor = WconceptPreprocessor(context)
+        if not preprocessor.process_wconcept_data(collection_date, license_count, license_cost, progress_callback=progress_callback):
+            return []
+        date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
+        if date_obj.month == 1:
+            prev_year, prev_month = date_obj.year - 1, 12
+        else:
+            prev_year, prev_month = date_obj.year, date_obj.month - 1
+        date_prefix = f"{str(prev_year)[2:]}{prev_month:02d}"
+        return _expected_output(f"{date_prefix}_W컨셉_청구내역서.xlsx")
+    except Exception as e:
+        print(f"W컨셉 전처리 실패: {e}")
+        return []
+
+
+def process_mathpresso(collection_date, progress_callback=None, context=None):
+    """매스프레소(콴다) 전처리 후 생성 파일 목록 반환"""
+    try:
+        preprocessor = MathpressoPreprocessor(context)
+        if not preprocessor.process_mathpresso_data(collection_date, progress_callback=progress_callback):
+            return []
+        date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
+        date_prefix = f"{str(date_obj.year)[2:]}{date_obj.month:02d}"
+        return _expected_output(f"{date_prefix}_매스프레소(콴다)_청구내역서.xlsx")
+    except Exception as e:
+        print(f"매스프레소(콴다) 전처리 실패: {e}")
+        return []
+
+
+def process_guppu(collection_date, progress_callback=None, context=None):
+    """구쁘 전처리 후 생성 파일 목록 반환"""
+    try:
+        preprocessor = GuppuPreprocessor(context)
+        if not preprocessor.process_guppu_data(collection_date, progress_callback=progress_callback):
+            return []
+        date_obj = datetime.strptime(collection_date, '%Y-%m-%d')
+        date_prefix = f"{str(date_obj.year)[2:]}{date_obj.month:02d}"
+        return _expected_output(f"{date_prefix}_구쁘_상담솔루션 청구내역서.xlsx")
+    except Exception as e:
+        print(f"구쁘 전처리 실패: {e}")
+        return []
+
+
+def run_company_preprocessing(company_name, collection_date, options=None, progress_callback=None, context=None):
+    """
+    고객사 전처리를 실행하고 생성된 파일명 목록을 반환.
+    options: license_count/license_cost(W컨셉, SK일렉링크), selected_filenames(코오롱Fnc 업로드 슬롯)
+    context: BillingContext (저장소/고지서 금액/공통 설정). 생략하면 새로 만든다.
+    저장소 기록(결과 목록/팝업 기본값)은 호출자가 담당한다. 실패 시 PreprocessError.
+    """
+    options = options or {}
+    if company_name not in SUPPORTED_COMPANIES:
+        raise PreprocessError(f"{company_name}은 전처리를 지원하지 않습니다")
+    context = context or BillingContext()
+
+    _report(progress_callback, "load_inputs")
+
+    if company_name == "앤하우스":
+        preprocessor = AnhousPreprocessor(context)
+        if not preprocessor.process_anhous_data(collection_date, progress_callback=progress_callback):
+            raise PreprocessError("전처리 실패")
+        _report(progress_callback, "save")
+        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+        return _find_recent_outputs(
+            [DOWNLOAD_DIR],
+            lambda f: "앤하우스 수수료 청구내역서_" in f and f.endswith(".xlsx")
+        )
+
+    if company_name == "코오롱Fnc":
+        preprocessor = KolonPreprocessor(context)
+        success = preprocessor.process_kolon_data(
+            collection_date,
+            input_dir=KOLON_INPUT_DIR,
+            selected_filenames=options.get("selected_filenames") or [],
+            progress_callback=progress_callback
+        )
+        if not success:
+            raise PreprocessError("전처리 실패")
+        _report(progress_callback, "save")
+        # 코오롱 전처리 결과는 temp_processing에 생성되므로 두 경로를 모두 스캔한다.
+        return _find_recent_outputs(
+            [DOWNLOAD_DIR, TEMP_DIR],
+            lambda f: (("코오롱_청구내역서_" in f and f.endswith(".xlsx")) or
+                       ("OpenAI_정확매칭결과_" in f and f.endswith(".csv")) or
+                       ("코오롱FnC_상담솔루션 청구내역서" in f and f.endswith(".xlsx")))
+        )
+
+    if company_name == "SK일렉링크":
+        license_cost = int(options.get("license_cost", 80000))
+        print(f"SK일렉링크 라이선스 비용: {license_cost:,}원")
+        preprocessor = SKPreprocessor(context)
+        if not preprocessor.process_sk_data(collection_date, license_cost=license_cost, progress_callback=progress_callback):
+            raise PreprocessError("전처리 실패")
+        _report(progress_callback, "save")
+        # SK 전처리 출력은 temp_processing에 생성됨(sk_preprocessing.py).
+        return _find_recent_outputs(
+            [DOWNLOAD_DIR, TEMP_DIR],
+            lambda f: "SK일렉링크" in f and "청구내역서" in f and f.endswith(".xlsx")
+        )
+
+    if company_name == "W컨셉":
+        license_count = int(options.get("license_count", 40))
+        license_cost = int(options.get("license_cost", 80000))
+        print(f"W컨셉 라이선스 수량: {license_count}개")
+        print(f"W컨셉 라이선스 비용: {license_cost:,}원")
+        processed_files = process_wconcept(collection_date, license_count, license_cost, progress_callback=progress_callback, context=context)
+    elif company_name == "매스프레소(콴다)":
+        processed_files = process_mathpresso(collection_date, progress_callback=progress_callback, context=context)
+    elif company_name == "디싸이더스/애드프로젝트":
+        preprocessor = DecidersPreprocessor(context)
+        processed_files = preprocessor.process_deciders_data(collection_date, progress_callback=progress_callback)
+    else:  # 구쁘
+        processed_files = process_guppu(collection_date, progress_callback=progress_callback, context=context)
+
+    if not processed_files:
+        raise PreprocessError("전처리 실패")
+    _report(progress_callback, "save")
+    return processed_files
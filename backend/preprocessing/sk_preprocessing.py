@@ -1,87 +1,47 @@
 import os
-import shutil
 from datetime import datetime
 from pathlib import Path
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
 import re
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
 import calendar
 
 class SKPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print("Firebase Storage 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
             self.bucket = None
     
     def download_sk_template(self):
-        """Firebase에서 skelectlink.xlsx 템플릿 다운로드"""
+        """Firebase의 skelectlink.xlsx 템플릿 (로컬 캐시 사용)"""
         if not self.bucket:
             print("Firebase 연결이 없습니다")
             return None
         
         try:
-            blob = self.bucket.blob("skelectlink.xlsx")
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, "skelectlink.xlsx")
-            blob.download_to_filename(local_path)
-            print(f"skelectlink.xlsx 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get("skelectlink.xlsx", self.bucket)
+            print(f"skelectlink.xlsx 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f"skelectlink.xlsx 템플릿 다운로드 실패: {e}")
             return None
     
     def get_bill_amount(self, company_name="SK일렉링크"):
-        """고지서에서 업데이트된 금액 조회"""
+        """고지서에서 업데이트된 금액 조회 (실행 컨텍스트의 저장소 스냅샷)"""
         try:
-            import requests
-            response = requests.get('http://localhost:5001/api/bill-amounts')
-            if response.ok:
-                bill_data = response.json()
-                if company_name in bill_data:
-                    amount_str = bill_data[company_name].get('amount', '')
-                    # "123,456원" 형태에서 숫자만 추출
-                    if amount_str:
-                        amount_clean = amount_str.replace(',', '').replace('원', '').strip()
-                        if amount_clean.isdigit():
-                            amount = float(amount_clean)
-                            print(f"{company_name} 고지서 금액 조회: {amount:,.0f}원")
-                            return amount
-                        else:
-                            print(f" 금액 형식 오류: {amount_str}")
-                            return None
-                else:
-                    print(f" {company_name} 고지서 정보를 찾을 수 없습니다")
-                    return None
-            else:
-                print(" 고지서 정보 조회 실패")
-                return None
+            return self.context.bill_amount(company_name)
         except Exception as e:
             print(f"고지서 금액 조회 실패: {e}")
             return None
@@ -160,11 +120,8 @@ class SKPreprocessor:
             output_filename = f"{date_prefix}_SK일렉링크_청구내역서.xlsx"
             output_path = os.path.join(self.download_dir, output_filename)
             
-            # 템플릿 파일 복사
-            shutil.copy2(template_path, output_path)
-            print(f" 템플릿 파일 복사 완료: {output_filename}")
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # B9 셀에 문서번호 설정 (MMP-{년월} 형식)
             document_number = f"MMP-{date_prefix}"
@@ -239,7 +196,7 @@ class SKPreprocessor:
                     
                     print(f"Meta ICS 계산 완료: {ics_data['days_in_month']}일 기준")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 로고 이미지 삽입 (B2 셀)
             try:
@@ -289,10 +246,12 @@ class SKPreprocessor:
         except Exception as e:
             print(f"수식 참조 업데이트 오류: {e}")
     
-    def process_sk_data(self, collection_date, license_cost=80000):
+    def process_sk_data(self, collection_date, license_cost=80000, progress_callback=None):
         """SK일렉링크 데이터 전처리 메인 함수"""
         try:
             print(" SK일렉링크 데이터 전처리 시작")
+            if progress_callback:
+                progress_callback("load_inputs")
             print(f" SK일렉링크 라이선스 비용: {license_cost}원")
             
             # 1. 고지서 금액 조회
@@ -301,6 +260,8 @@ class SKPreprocessor:
                 print(" SK일렉링크 고지서 금액을 찾을 수 없습니다")
                 return False
             
+            if progress_callback:
+                progress_callback("compute")
             # 2. 부가세 제외 금액 계산
             amount_without_vat = self.calculate_amount_without_vat(total_amount)
             if amount_without_vat is None:
@@ -313,6 +274,8 @@ class SKPreprocessor:
                 print(" skelectlink.xlsx 템플릿 다운로드 실패")
                 return False
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 4. 템플릿 업데이트 및 청구서 생성
             final_invoice_path = self.update_sk_template(
                 template_path,
@@ -0,0 +1,292 @@
+"""
+Firebase Storage 청구서 템플릿 로컬 캐시
+
+템플릿은 1년에 한두 번 바뀌므로 전처리마다 내려받지 않고
+temp_processing/.template_cache/<blob 이름>에 보관한다.
+- TTL 이내: 로컬 사본을 바로 사용 (네트워크 없음)
+- TTL 경과: 메타데이터만 조회해 generation/md5가 같으면 그대로 사용, 다르면 다시 다운로드
+- 버킷 조회 실패: 로컬 사본이 있으면 그대로 사용
+캐시 정보는 템플릿별 <이름>.meta.json에 저장해 재시작/워커 프로세스 간에도 유지된다.
+(temp_processing 정리/초기화는 최상위 파일만 지우므로 캐시 디렉토리는 남는다)
+
+load_template_workbook()은 파싱된 openpyxl 워크북 스냅샷(pickle)을 템플릿 파일 stat 기준으로
+메모리와 <템플릿>.snapshot에 보관해, 실행마다 스타일/병합/이미지 XML을 다시 파싱하지 않는다.
+"""
+
+import json
+import os
+import pickle
+import threading
+import time
+
+import openpyxl
+from openpyxl import load_workbook
+
+from backend.utils.firebase_registry import get_firebase_registry
+from backend.utils.metrics import registry as metrics_registry
+
+CACHE_DIR = os.path.join("temp_processing", ".template_cache")
+DEFAULT_TTL = 600  # 초
+MANIFEST_TTL = 3600  # 접두어별 템플릿 목록 재조회 간격(초)
+
+# 시작 시 미리 받아둘 템플릿 (앤하우스 annhouse*.xlsx는 버킷 목록에서 찾는다)
+KNOWN_TEMPLATES = (
+    "kolon.xlsx",
+    "skelectlink.xlsx",
+    "guppeu.xlsx",
+    "mathpresso.xlsx",
+    "wconcept.xlsx",
+    "deciders.xlsx",
+    "Adproject.xlsx",
+)
+WARM_UP_PREFIXES = ("annhouse",)
+
+TEMPLATE_CACHE_REQUESTS = metrics_registry.counter(
+    "template_cache_requests_total", "청구서 템플릿 캐시 조회 결과", ("result",)
+)
+TEMPLATE_SNAPSHOT_REQUESTS = metrics_registry.counter(
+    "template_snapshot_requests_total", "파싱된 템플릿 스냅샷 조회 결과", ("result",)
+)
+
+# 템플릿 경로 → (템플릿 stat 키, pickle 바이트)
+_SNAPSHOTS = {}
+_snapshot_lock = threading.Lock()
+
+
+class TemplateCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, manifest_ttl=MANIFEST_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.manifest_ttl = manifest_ttl
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, blob_name):
+        with self._locks_guard:
+            return self._locks.setdefault(blob_name, threading.Lock())
+
+    def local_path(self, blob_name):
+        return os.path.join(self.cache_dir, blob_name)
+
+    def _meta_path(self, blob_name):
+        return f"{self.local_path(blob_name)}.meta.json"
+
+    def _read_meta(self, blob_name):
+        try:
+            with open(self._meta_path(blob_name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, blob_name, meta):
+        temp_path = f"{self._meta_path(blob_name)}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, self._meta_path(blob_name))
+
+    def get(self, blob_name, bucket=None, force=False):
+        """템플릿 로컬 경로 반환 (필요할 때만 다운로드). 버킷에 없으면 FileNotFoundError"""
+        local_path = self.local_path(blob_name)
+        with self._lock_for(blob_name):
+            meta = self._read_meta(blob_name)
+            has_local = meta is not None and os.path.exists(local_path)
+            if has_local and not force and time.time() - meta["checked_at"] < self.ttl:
+                TEMPLATE_CACHE_REQUESTS.inc(result="hit")
+                return local_path
+
+            try:
+                bucket = bucket or get_firebase_registry().bucket()
+                blob = bucket.get_blob(blob_name)  # 메타데이터만 조회
+            except Exception as e:
+                get_firebase_registry().report_error(e)
+                if has_local:
+                    print(f"템플릿 메타데이터 조회 실패, 캐시 사용: {blob_name} ({e})")
+                    TEMPLATE_CACHE_REQUESTS.inc(result="stale")
+                    return local_path
+                raise
+            if blob is None:
+                raise FileNotFoundError(f"버킷에 템플릿이 없습니다: {blob_name}")
+
+            if (has_local and meta.get("generation") == blob.generation
+                    and meta.get("md5_hash") == blob.md5_hash):
+                meta["checked_at"] = time.time()
+                self._write_meta(blob_name, meta)
+                TEMPLATE_CACHE_REQUESTS.inc(result="revalidated")
+                return local_path
+
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            temp_path = f"{local_path}.{os.getpid()}.download"
+            try:
+                blob.download_to_filename(temp_path)
+                os.replace(temp_path, local_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            self._write_meta(blob_name, {
+                "blob_name": blob_name,
+                "generation": blob.generation,
+                "md5_hash": blob.md5_hash,
+                "size": blob.size,
+                "updated": blob.updated.isoformat() if blob.updated else None,
+                "downloaded_at": time.time(),
+                "checked_at": time.time(),
+            })
+            TEMPLATE_CACHE_REQUESTS.inc(result="downloaded")
+            print(f"템플릿 다운로드(캐시 갱신): {blob_name} (generation {blob.generation})")
+            return local_path
+
+    def list_templates(self, prefix, bucket=None, force=False):
+        """
+        접두어로 시작하는 템플릿 이름 목록 (버킷 전체가 아닌 접두어 목록 조회 1회).
+        결과는 manifest-<접두어>.json에 MANIFEST_TTL 동안 보관하고, 조회 실패 시 마지막 목록 사용.
+        """
+        manifest_path = os.path.join(self.cache_dir, f"manifest-{prefix}.json")
+        manifest = None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if manifest is not None and not force and time.time() - manifest["listed_at"] < self.manifest_ttl:
+            TEMPLATE_CACHE_REQUESTS.inc(result="manifest_hit")
+            return manifest["names"]
+
+        try:
+            bucket = bucket or get_firebase_registry().bucket()
+            names = sorted(blob.name for blob in bucket.list_blobs(prefix=prefix) if blob.name.endswith(".xlsx"))
+        except Exception as e:
+            get_firebase_registry().report_error(e)
+            if manifest is not None:
+                print(f"템플릿 목록 조회 실패, 마지막 목록 사용: {prefix} ({e})")
+                return manifest["names"]
+            raise
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"prefix": prefix, "names": names, "listed_at": time.time()}, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+        TEMPLATE_CACHE_REQUESTS.inc(result="manifest_listed")
+        return names
+
+    def cached_names(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return sorted(
+            filename[:-len(".meta.json")]
+            for filename in os.listdir(self.cache_dir) if filename.endswith(".meta.json")
+        )
+
+    def warm_up(self, names=KNOWN_TEMPLATES, prefixes=WARM_UP_PREFIXES):
+        """알려진 템플릿을 미리 받아둔다. {이름: 경로 또는 오류 문자열} 반환"""
+        results = {}
+        names = list(names)
+        try:
+            bucket = get_firebase_registry().bucket()
+            for prefix in prefixes:
+                names.extend(self.list_templates(prefix, bucket, force=True))
+        except Exception as e:
+            print(f"템플릿 캐시 준비 실패 (Firebase 연결 불가): {e}")
+            return {name: str(e) for name in names}
+        for name in dict.fromkeys(names):
+            try:
+                results[name] = self.get(name, bucket)
+            except Exception as e:
+                results[name] = str(e)
+        ready = sum(1 for name, value in results.items() if value == self.local_path(name))
+        print(f"템플릿 캐시 준비 완료: {ready}/{len(results)}개")
+        return results
+
+    def refresh(self, names=None):
+        """캐시된(또는 지정한) 템플릿과 접두어 목록을 TTL과 무관하게 다시 확인"""
+        results = {}
+        if not names:
+            for prefix in WARM_UP_PREFIXES:
+                try:
+                    self.list_templates(prefix, force=True)
+                except Exception as e:
+                    results[f"manifest-{prefix}"] = str(e)
+        for name in names or self.cached_names() or list(KNOWN_TEMPLATES):
+            try:
+                results[name] = self.get(name, force=True)
+            except Exception as e:
+                results[name] = str(e)
+        return results
+
+    def status(self):
+        return [self._read_meta(name) for name in self.cached_names()]
+
+
+def _snapshot_key(template_path):
+    stat_result = os.stat(template_path)
+    return [stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size, openpyxl.__version__]
+
+
+def _read_snapshot_file(template_path, key):
+    """디스크 스냅샷이 같은 템플릿(stat)/openpyxl 버전으로 만든 것이면 pickle 바이트 반환"""
+    try:
+        with open(f"{template_path}.snapshot", "rb") as f:
+            stored = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(stored, dict) or stored.get("key") != key:
+        return None
+    return stored.get("data")
+
+
+def _write_snapshot_file(template_path, key, data):
+    temp_path = f"{template_path}.snapshot.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            pickle.dump({"key": key, "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, f"{template_path}.snapshot")
+    except OSError as e:
+        print(f"템플릿 스냅샷 저장 실패: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_template_workbook(template_path):
+    """
+    템플릿 워크북을 새로 편집할 수 있는 사본으로 반환.
+    같은 템플릿(stat 동일)은 한 번만 load_workbook 하고 이후에는 스냅샷을 복원한다.
+    (스냅샷은 이 캐시 디렉토리에서 직접 만든 파일만 읽는다)
+    """
+    template_path = os.path.abspath(template_path)
+    key = _snapshot_key(template_path)
+    with _snapshot_lock:
+        cached = _SNAPSHOTS.get(template_path)
+    if cached is not None and cached[0] == key:
+        TEMPLATE_SNAPSHOT_REQUESTS.inc(result="memory")
+        return pickle.loads(cached[1])
+
+    data = _read_snapshot_file(template_path, key)
+    if data is not None:
+        TEMPLATE_SNAPSHOT_REQUESTS.inc(result="disk")
+        with _snapshot_lock:
+            _SNAPSHOTS[template_path] = (key, data)
+        return pickle.loads(data)
+
+    workbook = load_workbook(template_path)
+    try:
+        data = pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        # 스냅샷을 만들 수 없는 템플릿은 매번 파싱 (동작은 기존과 같음)
+        print(f"템플릿 스냅샷 생성 불가, 직접 로드: {os.path.basename(template_path)} ({e})")
+        TEMPLATE_SNAPSHOT_REQUESTS.inc(result="unpicklable")
+        return workbook
+    with _snapshot_lock:
+        _SNAPSHOTS[template_path] = (key, data)
+    _write_snapshot_file(template_path, key, data)
+    TEMPLATE_SNAPSHOT_REQUESTS.inc(result="parsed")
+    return workbook
+
+
+_template_cache = TemplateCache(
+    ttl=int(os.environ.get("TEMPLATE_CACHE_TTL_SEC", DEFAULT_TTL)),
+    manifest_ttl=int(os.environ.get("TEMPLATE_MANIFEST_TTL_SEC", MANIFEST_TTL))
+)
+
+
+def get_template_cache():
+    return _template_cache
@@ -1,56 +1,37 @@
 import os
 import re
-import shutil
 from datetime import datetime
 from pathlib import Path
-from openpyxl import load_workbook
 from openpyxl.drawing.image import Image
-import firebase_admin
-from firebase_admin import credentials, storage
-from backend.utils.secrets_manager import get_firebase_secret
+from backend.preprocessing.billing_context import BillingContext
+from backend.preprocessing.template_cache import get_template_cache, load_template_workbook
 from backend.preprocessing.invoice_common import apply_ceo_line_to_doc_sheet_d35
 
 class WconceptPreprocessor:
-    def __init__(self):
+    def __init__(self, context=None):
+        self.context = context or BillingContext()
         self.download_dir = os.path.join(os.getcwd(), "temp_processing")
         os.makedirs(self.download_dir, exist_ok=True)
         self.setup_firebase()
     
     def setup_firebase(self):
-        """Firebase Storage 연결 설정"""
+        """Firebase Storage 연결 (프로세스 공용 연결 재사용)"""
         try:
-            cred_dict = get_firebase_secret()
-            BUCKET_NAME = "services-e42af.firebasestorage.app"
-            
-            # 기존 앱이 있으면 삭제하고 새로 초기화
-            if firebase_admin._apps:
-                firebase_admin.delete_app(firebase_admin.get_app())
-            
-            firebase_admin.initialize_app(
-                credentials.Certificate(cred_dict),
-                {"storageBucket": BUCKET_NAME}
-            )
-            
-            self.bucket = storage.bucket()
+            self.bucket = self.context.bucket()
             print("Firebase Storage 연결 완료")
         except Exception as e:
             print(f"Firebase 연결 실패: {e}")
             self.bucket = None
     
     def download_wconcept_template(self):
-        """Firebase에서 wconcept.xlsx 템플릿 다운로드"""
+        """Firebase의 wconcept.xlsx 템플릿 (로컬 캐시 사용)"""
         if not self.bucket:
             print("Firebase 연결이 없습니다")
             return None
         
         try:
-            blob = self.bucket.blob("wconcept.xlsx")
-            temp_dir = os.path.join(os.getcwd(), "temp_processing")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            local_path = os.path.join(temp_dir, "wconcept.xlsx")
-            blob.download_to_filename(local_path)
-            print(f"wconcept.xlsx 템플릿 다운로드 완료: {local_path}")
+            local_path = get_template_cache().get("wconcept.xlsx", self.bucket)
+            print(f"wconcept.xlsx 템플릿 준비 완료: {local_path}")
             return local_path
         except Exception as e:
             print(f"wconcept.xlsx 템플릿 다운로드 실패: {e}")
@@ -76,11 +57,8 @@ class WconceptPreprocessor:
             output_filename = f"{date_prefix}_W컨셉_청구내역서.xlsx"
             output_path = os.path.join(self.download_dir, output_filename)
             
-            # 템플릿 파일 복사
-            shutil.copy2(template_path, output_path)
-            print(f"템플릿 파일 복사 완료: {output_filename}")
-            
-            workbook = load_workbook(output_path)
+            # 파싱된 템플릿 스냅샷에서 워크북 복원 (저장 시 output_path에 생성)
+            workbook = load_template_workbook(template_path)
             
             # B9 셀에 문서번호 설정 (MMP-{년월} 형식)
             document_number = f"MMP-{date_prefix}"
@@ -169,7 +147,7 @@ class WconceptPreprocessor:
                         detail_sheet.cell(row=21, column=5).value = total_amount
                         print(f"세부내역 시트 E21 셀 업데이트: {total_amount:,}원 (실제 고지서 청구비용)")
             
-            apply_ceo_line_to_doc_sheet_d35(workbook)
+            apply_ceo_line_to_doc_sheet_d35(workbook, ceo_name=self.context.ceo_name)
             
             # 로고 이미지 삽입 (B2 셀)
             try:
@@ -219,17 +197,17 @@ class WconceptPreprocessor:
         except Exception as e:
             print(f"수식 참조 업데이트 오류: {e}")
     
-    def process_wconcept_data(self, collection_date, license_count=40, license_cost=80000):
+    def process_wconcept_data(self, collection_date, license_count=40, license_cost=80000, progress_callback=None):
         """W컨셉 데이터 전처리 메인 함수"""
         try:
             print(" W컨셉 데이터 전처리 시작")
+            if progress_callback:
+                progress_callback("load_inputs")
             print(f" 청구 라이선스 수량: {license_count}개")
             print(f" 청구 라이선스 비용: {license_cost:,}원")
             
             # 고지서 금액 조회
-            from ..storage.admin_storage import AdminStorage
-            admin_storage = AdminStorage()
-            bill_amounts = admin_storage.get_bill_amounts()
+            bill_amounts = self.context.bill_amounts()
             bill_amount = bill_amounts.get("W컨셉", {}).get("amount")
             
             if bill_amount:
@@ -243,6 +221,8 @@ class WconceptPreprocessor:
                 print("wconcept.xlsx 템플릿 다운로드 실패")
                 return False
             
+            if progress_callback:
+                progress_callback("fill_template")
             # 2. 템플릿 업데이트 및 청구서 생성 (고지서 금액 포함)
             final_invoice_path = self.update_wconcept_template(
                 template_path,
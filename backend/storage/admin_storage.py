@@ -2,12 +2,99 @@ import os
 import json
 import time
 import fcntl
+import atexit
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+from ..utils.metrics import registry as metrics_registry
+
+# 락 대기 상한 (초과하면 StorageLockError / 읽기는 기본값)
+LOCK_TIMEOUT_SEC = float(os.environ.get("ADMIN_STORAGE_LOCK_TIMEOUT_SEC", "30") or 30)
+LOCK_RETRY_MAX_SEC = 0.05
+
+STORAGE_LOCK_WAIT = metrics_registry.histogram(
+    "admin_storage_lock_wait_seconds", "AdminStorage 락 대기 시간", ("mode",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+)
+
+
+class StorageLockError(RuntimeError):
+    """저장소 락을 얻지 못해 쓰기를 할 수 없음"""
+
+
+# 저장소 파일 경로 → ((inode, mtime_ns, size), 파싱된 데이터). 같은 프로세스의 인스턴스끼리 공유.
+_READ_CACHE = {}
+
+
+def _file_key(stat_result):
+    return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def _clone(value):
+    """JSON 데이터(dict/list/스칼라) 복제 - 호출자가 수정해도 캐시가 오염되지 않도록"""
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value
+
+
+_MISSING = object()
+
+
+def _merge_changes(base, pending, current):
+    """base → pending 변경분(섹션 안의 키 단위)을 current에 덮어쓴 결과 반환"""
+    merged = _clone(current)
+    for key in base.keys() | pending.keys():
+        old = base.get(key, _MISSING)
+        new = pending.get(key, _MISSING)
+        if old == new:
+            continue
+        target = merged.get(key)
+        if isinstance(old, dict) and isinstance(new, dict) and isinstance(target, dict):
+            for sub_key in old.keys() | new.keys():
+                old_value = old.get(sub_key, _MISSING)
+                new_value = new.get(sub_key, _MISSING)
+                if old_value == new_value:
+                    continue
+                if new_value is _MISSING:
+                    target.pop(sub_key, None)
+                else:
+                    target[sub_key] = _clone(new_value)
+        elif new is _MISSING:
+            merged.pop(key, None)
+        else:
+            merged[key] = _clone(new)
+    return merged
+
+
+class _WriteBehindBuffer:
+    """지연 쓰기 버퍼 (저장소 파일별 1개, 같은 프로세스의 인스턴스끼리 공유)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.RLock()
+        self.base = None   # 버퍼링을 시작할 때의 디스크 내용
+        self.data = None   # 아직 디스크에 쓰지 않은 최신 내용
+        self.version = 0
+        self.timer = None
+        self.failures = 0  # 연속 반영 실패 횟수 (재시도 간격 계산)
+
+
+# 저장소 파일 경로 → _WriteBehindBuffer
+_WRITE_BUFFERS = {}
+_WRITE_BUFFERS_LOCK = threading.Lock()
+FLUSH_RETRY_MAX_SEC = 30
+
+
 class AdminStorage:
-    """통합 어드민 데이터 저장소 (메모리 캐시 없음 - 항상 파일에서 읽기)"""
+    """통합 어드민 데이터 저장소 (stat 검증 읽기 캐시 - 다른 프로세스가 파일을 바꿨을 때만 다시 파싱)"""
     
-    def __init__(self, storage_file="admin_storage.json"):
+    # 지연 쓰기 모드일 때만 설정됨
+    _write_buffer = None
+    
+    def __init__(self, storage_file="admin_storage.json", write_behind_ms=0):
         # 기본 저장 위치를 temp_processing으로 고정해 Docker 볼륨에 영속 저장한다.
         if storage_file == "admin_storage.json":
             storage_dir = os.path.join(os.getcwd(), "temp_processing")
@@ -26,33 +113,66 @@ class AdminStorage:
         else:
             self.storage_file = storage_file
         self.lock_file = f"{self.storage_file}.lock"
-        # 메모리 캐시 제거 - 항상 파일에서 직접 읽어옴
+        # 지연 쓰기: write_behind_ms 안에 들어온 변경을 모아 한 번에 저장
+        if write_behind_ms:
+            with _WRITE_BUFFERS_LOCK:
+                buffer = _WRITE_BUFFERS.get(self.storage_file)
+                if buffer is None:
+                    buffer = _WriteBehindBuffer(write_behind_ms / 1000)
+                    _WRITE_BUFFERS[self.storage_file] = buffer
+                    # 종료 시 남은 변경 반영
+                    atexit.register(self.flush)
+            self._write_buffer = buffer
+        # 읽기 캐시는 파일 inode/mtime/size로 검증하므로 외부 수정도 바로 반영됨
         self.ensure_file_exists()
+        # 기본 구조 생성/보완은 지연 없이 바로 기록
+        self.flush()
+    
+    def _acquire_lock(self, exclusive=False):
+        """
+        저장소 락 획득 후 락 fd 반환 (실패 또는 LOCK_TIMEOUT_SEC 초과 시 None).
+        읽기는 공유 락(동시 읽기 허용), 쓰기는 배타 락. 프로세스가 죽으면 락도 자동으로 풀린다.
+        락을 잡은 채 멈춘 작업이 모든 요청 스레드를 막지 않도록 LOCK_NB로 재시도하며 기다린다.
+        """
+        mode = "exclusive" if exclusive else "shared"
+        try:
+            # 획득마다 새로 열어야 같은 프로세스의 다른 스레드와도 락이 충돌한다.
+            lock_fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        except Exception as e:
+            print(f"락 파일 열기 실패: {e}")
+            return None
+        try:
+            with STORAGE_LOCK_WAIT.time(mode=mode):
+                self._flock_with_timeout(lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            return lock_fd
+        except Exception as e:
+            print(f"락 획득 실패: {e}")
+            os.close(lock_fd)
+            return None
     
-    def _acquire_lock(self, timeout=5):
-        """파일 락 획득 (최대 timeout 초 대기)"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+    @staticmethod
+    def _flock_with_timeout(lock_fd, operation):
+        """LOCK_NB로 재시도 (대기 간격 1ms부터 LOCK_RETRY_MAX_SEC까지 증가), 시간 초과 시 TimeoutError"""
+        deadline = time.monotonic() + LOCK_TIMEOUT_SEC
+        delay = 0.001
+        while True:
             try:
-                # 락 파일 열기 (exclusive 모드)
-                lock_fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-                os.close(lock_fd)
-                return True
-            except FileExistsError:
-                # 락이 이미 있으면 잠시 대기
-                time.sleep(0.1)
-            except Exception as e:
-                print(f"락 획득 실패: {e}")
-                return False
-        return False
+                fcntl.flock(lock_fd, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"{LOCK_TIMEOUT_SEC:g}초 안에 락을 얻지 못함")
+                time.sleep(delay)
+                delay = min(delay * 2, LOCK_RETRY_MAX_SEC)
     
-    def _release_lock(self):
-        """파일 락 해제"""
+    def _release_lock(self, lock_fd):
+        """저장소 락 해제 (락 파일은 지우지 않고 계속 사용)"""
         try:
-            if os.path.exists(self.lock_file):
-                os.remove(self.lock_file)
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
         except Exception as e:
             print(f"락 해제 실패: {e}")
+        finally:
+            os.close(lock_fd)
     
     def ensure_file_exists(self):
         """저장소 파일이 존재하지 않으면 기본 구조로 생성, 존재하면 필수 섹션 추가"""
@@ -68,97 +188,90 @@ class AdminStorage:
                     "updated_at": None
                 }
             }
-            self.save_data_direct(default_data)
+            self._save_now(default_data)
             print(f"기본 저장소 파일 생성: {self.storage_file}")
         else:
-            # 기존 파일에 필수 섹션이 없으면 추가
+            # 기존 파일에 필수 섹션이 없으면 추가 (추가할 게 없으면 트랜잭션이 쓰지 않음)
             try:
-                data = self.load_data()
-                needs_update = False
-                
-                if "uploaded_files" not in data:
-                    data["uploaded_files"] = {}
-                    needs_update = True
-                if "collected_files" not in data:
-                    data["collected_files"] = {}
-                    needs_update = True
-                if "wconcept_settings" not in data:
-                    data["wconcept_settings"] = {
-                        "license_count": 40,
-                        "license_cost": 80000,
-                        "updated_at": None
-                    }
-                    needs_update = True
-                if "sk_settings" not in data:
-                    data["sk_settings"] = {
-                        "license_cost": 80000,
-                        "updated_at": None
-                    }
-                    needs_update = True
-                if "invoice_common_settings" not in data:
-                    data["invoice_common_settings"] = {
-                        "ceo_name": "",
-                        "updated_at": None
-                    }
-                    needs_update = True
+                with self.transaction() as data:
+                    needs_update = False
+                    
+                    if "uploaded_files" not in data:
+                        data["uploaded_files"] = {}
+                        needs_update = True
+                    if "collected_files" not in data:
+                        data["collected_files"] = {}
+                        needs_update = True
+                    if "wconcept_settings" not in data:
+                        data["wconcept_settings"] = {
+                            "license_count": 40,
+                            "license_cost": 80000,
+                            "updated_at": None
+                        }
+                        needs_update = True
+                    if "sk_settings" not in data:
+                        data["sk_settings"] = {
+                            "license_cost": 80000,
+                            "updated_at": None
+                        }
+                        needs_update = True
+                    if "invoice_common_settings" not in data:
+                        data["invoice_common_settings"] = {
+                            "ceo_name": "",
+                            "updated_at": None
+                        }
+                        needs_update = True
                 
                 if needs_update:
-                    self.save_data_direct(data)
                     print(f"저장소 파일 구조 업데이트: {self.storage_file}")
             except Exception as e:
                 print(f"저장소 파일 구조 확인 실패: {e}")
     
-    def load_data(self):
-        """저장된 데이터 로드 (메모리 캐시 없음, 락 사용)"""
-        if not self._acquire_lock():
-            print("락 획득 실패, 기본값 반환")
-            return {
-                "bill_amounts": {},
-                "processed_files": {},
-                "uploaded_files": {},
-                "collected_files": {},
-                "wconcept_settings": {
-                    "license_count": 40,
-                    "license_cost": 80000,
-                    "updated_at": None
-                }
+    def _empty_data(self):
+        """락 획득/파일 읽기에 실패했을 때 쓰는 기본 구조"""
+        return {
+            "bill_amounts": {},
+            "processed_files": {},
+            "uploaded_files": {},
+            "collected_files": {},
+            "wconcept_settings": {
+                "license_count": 40,
+                "license_cost": 80000,
+                "updated_at": None
             }
+        }
+    
+    def _cached_data(self):
+        """파일이 캐시 이후 바뀌지 않았으면 캐시된 파싱 결과(원본), 아니면 None"""
+        cached = _READ_CACHE.get(self.storage_file)
+        if cached is not None:
+            try:
+                if _file_key(os.stat(self.storage_file)) == cached[0]:
+                    return cached[1]
+            except OSError:
+                pass
+        return None
+    
+    def _read_unlocked(self):
+        """저장소 파일 읽기 (호출자가 락 보유). 반환값은 호출자 소유의 복제본"""
+        cached = self._cached_data()
+        if cached is not None:
+            return _clone(cached)
         
         try:
             # 파일이 비어있거나 손상된 경우 처리
             if not os.path.exists(self.storage_file) or os.path.getsize(self.storage_file) == 0:
-                return {
-                    "bill_amounts": {},
-                    "processed_files": {},
-                    "uploaded_files": {},
-                    "collected_files": {},
-                    "wconcept_settings": {
-                        "license_count": 40,
-                        "license_cost": 80000,
-                        "updated_at": None
-                    }
-                }
+                return self._empty_data()
             
+            # 락 보유 중에는 다른 쓰기(배타 락)가 끼어들 수 없다.
             with open(self.storage_file, 'r', encoding='utf-8') as f:
-                # 파일 락 적용 (읽기 중 다른 프로세스가 쓰지 못하도록)
-                try:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH)  # Shared lock (읽기)
-                    content = f.read()
-                    if not content.strip():
-                        return {
-                            "bill_amounts": {},
-                            "processed_files": {},
-                            "uploaded_files": {},
-                            "collected_files": {},
-                            "wconcept_settings": {
-                                "license_count": 40,
-                                "license_cost": 80000,
-                                "updated_at": None
-                            }
-                        }
-                    return json.loads(content)
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # Unlock
+                content = f.read()
+                if not content.strip():
+                    return self._empty_data()
+                data = json.loads(content)
+                # 읽은 파일 디스크립터 기준으로 키를 잡아 읽은 내용과 키가 어긋나지 않게 한다.
+                _READ_CACHE[self.storage_file] = (_file_key(os.fstat(f.fileno())), data)
+                return _clone(data)
         except json.JSONDecodeError as e:
             print(f"어드민 데이터 로드 실패 (JSON 파싱 오류): {e}")
             # 손상된 파일 백업
@@ -169,39 +282,13 @@ class AdminStorage:
                     print(f"손상된 파일 백업: {backup_file}")
             except:
                 pass
-            return {
-                "bill_amounts": {},
-                "processed_files": {},
-                "uploaded_files": {},
-                "collected_files": {},
-                "wconcept_settings": {
-                    "license_count": 40,
-                    "license_cost": 80000,
-                    "updated_at": None
-                }
-            }
+            return self._empty_data()
         except Exception as e:
             print(f"어드민 데이터 로드 실패: {e}")
-            return {
-                "bill_amounts": {},
-                "processed_files": {},
-                "uploaded_files": {},
-                "collected_files": {},
-                "wconcept_settings": {
-                    "license_count": 40,
-                    "license_cost": 80000,
-                    "updated_at": None
-                }
-            }
-        finally:
-            self._release_lock()
+            return self._empty_data()
     
-    def save_data_direct(self, data):
-        """데이터를 직접 JSON 파일에 저장 (필수 섹션 보장, 락 사용)"""
-        if not self._acquire_lock(timeout=10):
-            print("락 획득 실패, 저장 취소")
-            return False
-        
+    def _write_unlocked(self, data):
+        """저장소 파일 원자적 쓰기 (호출자가 배타 락 보유)"""
         try:
             # 필수 섹션 보장 (기존 파일에 없을 수 있음)
             if "uploaded_files" not in data:
@@ -223,16 +310,16 @@ class AdminStorage:
             # 임시 파일에 먼저 저장 (원자적 쓰기)
             temp_file = f"{self.storage_file}.tmp"
             with open(temp_file, 'w', encoding='utf-8') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock (쓰기)
-                try:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())  # 디스크에 강제 쓰기
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())  # 디스크에 강제 쓰기
+                # rename은 inode/mtime/size를 바꾸지 않으므로 쓰기 직후 키를 잡는다.
+                written_key = _file_key(os.fstat(f.fileno()))
             
             # 원자적 이동 (rename은 원자적 연산)
             os.rename(temp_file, self.storage_file)
+            # 방금 쓴 내용으로 캐시 갱신 (다음 읽기에서 재파싱 생략)
+            _READ_CACHE[self.storage_file] = (written_key, _clone(data))
             print(f"어드민 데이터 저장 완료")
             return True
         except Exception as e:
@@ -244,8 +331,142 @@ class AdminStorage:
             except:
                 pass
             return False
+    
+    def load_data(self):
+        """저장된 데이터 로드 (지연 쓰기 중이면 아직 쓰지 않은 최신 내용 반환)"""
+        buffer = self._write_buffer
+        if buffer is not None:
+            pending = buffer.data
+            if pending is not None:
+                return _clone(pending)
+        return self._load_from_disk()
+    
+    def _load_from_disk(self):
+        """파일이 바뀌지 않았으면 캐시 복제본 반환, 바뀌었으면 공유 락 후 파싱"""
+        cached = self._cached_data()
+        if cached is not None:
+            return _clone(cached)
+        
+        lock_fd = self._acquire_lock()
+        if lock_fd is None:
+            print("락 획득 실패, 기본값 반환")
+            return self._empty_data()
+        try:
+            return self._read_unlocked()
+        finally:
+            self._release_lock(lock_fd)
+    
+    def save_data_direct(self, data):
+        """데이터를 직접 JSON 파일에 저장 (필수 섹션 보장, 배타 락 사용)"""
+        if self._write_buffer is not None:
+            with self.transaction() as current:
+                current.clear()
+                current.update(_clone(data))
+            return True
+        return self._save_now(data)
+    
+    def _save_now(self, data):
+        """지연 쓰기와 관계없이 바로 저장"""
+        lock_fd = self._acquire_lock(exclusive=True)
+        if lock_fd is None:
+            print("락 획득 실패, 저장 취소")
+            return False
+        try:
+            return self._write_unlocked(data)
+        finally:
+            self._release_lock(lock_fd)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        읽기-수정-쓰기를 배타 락 하나로 묶는다. 블록 안에서 yield된 데이터를 수정하면
+        블록이 끝날 때 한 번 저장하고, 바뀐 내용이 없거나 예외가 나면 쓰지 않는다.
+        락을 얻지 못하면 StorageLockError (호출한 라우트가 오류 응답).
+        지연 쓰기 모드에서는 버퍼에만 반영하고 저장은 flush()가 모아서 한다.
+        """
+        buffer = self._write_buffer
+        if buffer is not None:
+            with buffer.lock:
+                if buffer.data is None:
+                    buffer.base = buffer.data = self._load_from_disk()
+                data = _clone(buffer.data)
+                yield data
+                if data != buffer.data:
+                    buffer.data = data
+                    buffer.version += 1
+                    if buffer.timer is None:
+                        self._schedule_flush(buffer, buffer.window)
+            return
+        
+        lock_fd = self._acquire_lock(exclusive=True)
+        if lock_fd is None:
+            # 빈 데이터를 넘기면 호출자는 성공으로 알고 변경이 버려지므로 예외로 알린다
+            raise StorageLockError(f"저장소 락 획득 실패: {self.lock_file}")
+        try:
+            data = self._read_unlocked()
+            original = _clone(data)
+            yield data
+            if data != original:
+                self._write_unlocked(data)
         finally:
-            self._release_lock()
+            self._release_lock(lock_fd)
+    
+    def _schedule_flush(self, buffer, delay):
+        buffer.timer = threading.Timer(delay, self.flush)
+        buffer.timer.daemon = True
+        buffer.timer.start()
+    
+    def _retry_flush(self, buffer):
+        """반영 실패 시 간격을 늘려가며 다시 예약 (최대 FLUSH_RETRY_MAX_SEC)"""
+        buffer.failures += 1
+        delay = min(buffer.window * (2 ** buffer.failures), FLUSH_RETRY_MAX_SEC)
+        print(f"지연 쓰기 반영 {delay:.1f}초 후 재시도 ({buffer.failures}회 실패)")
+        self._schedule_flush(buffer, delay)
+    
+    def flush(self):
+        """
+        지연 쓰기 버퍼를 한 번의 원자적 쓰기로 디스크에 반영 (지연 쓰기 모드가 아니면 바로 True).
+        그 사이 다른 프로세스가 바꾼 내용은 유지하고 이 프로세스가 바꾼 키만 덮어쓴다.
+        실패하면 간격을 늘려 다시 예약하고 False 반환.
+        """
+        buffer = self._write_buffer
+        if buffer is None:
+            return True
+        with buffer.lock:
+            if buffer.timer is not None:
+                buffer.timer.cancel()
+                buffer.timer = None
+            if buffer.data is None:
+                return True
+            lock_fd = self._acquire_lock(exclusive=True)
+            if lock_fd is None:
+                print("락 획득 실패, 지연 쓰기 반영 보류")
+                self._retry_flush(buffer)
+                return False
+            try:
+                current = self._read_unlocked()
+                merged = _merge_changes(buffer.base, buffer.data, current)
+                saved = merged == current or self._write_unlocked(merged)
+                if saved:
+                    buffer.base = buffer.data = None
+                    buffer.failures = 0
+                else:
+                    self._retry_flush(buffer)
+                return saved
+            finally:
+                self._release_lock(lock_fd)
+    
+    def get_generation(self):
+        """저장소 파일 버전 식별자 (원자적 rename으로 저장하므로 저장할 때마다 inode/mtime이 바뀜)"""
+        try:
+            stat = os.stat(self.storage_file)
+            generation = f"{stat.st_ino}-{stat.st_mtime_ns}-{stat.st_size}"
+        except FileNotFoundError:
+            generation = "missing"
+        if self._write_buffer is not None:
+            # 아직 디스크에 쓰지 않은 변경도 버전에 반영
+            generation = f"{generation}-w{self._write_buffer.version}"
+        return generation
     
     # === 고지서 금액 관련 메서드 ===
     
@@ -255,26 +476,28 @@ class AdminStorage:
         return data.get("bill_amounts", {})
     
     def update_bill_amount(self, company_name, amount, update_date):
-        """고지서 금액 정보 업데이트 (파일에서 읽고 저장)"""
-        data = self.load_data()
-        if "bill_amounts" not in data:
-            data["bill_amounts"] = {}
-        
-        data["bill_amounts"][company_name] = {
-            "amount": amount,
-            "update_date": update_date
-        }
-        self.save_data_direct(data)
+        """고지서 금액 정보 업데이트 (하나의 트랜잭션으로 읽고 저장)"""
+        with self.transaction() as data:
+            if "bill_amounts" not in data:
+                data["bill_amounts"] = {}
+            
+            data["bill_amounts"][company_name] = {
+                "amount": amount,
+                "update_date": update_date
+            }
+        # 다른 프로세스(일괄 전처리 워커)와 다음 요청이 바로 읽으므로 지연 쓰기 중이어도 즉시 반영
+        self.flush()
         print(f"{company_name} 고지서 금액 업데이트: {amount}")
     
     def batch_update_bill_amounts(self, bill_data):
-        """고지서 금액 일괄 업데이트 (파일에서 읽고 저장)"""
-        data = self.load_data()
-        if "bill_amounts" not in data:
-            data["bill_amounts"] = {}
-        
-        data["bill_amounts"].update(bill_data)
-        self.save_data_direct(data)
+        """고지서 금액 일괄 업데이트 (하나의 트랜잭션으로 읽고 저장)"""
+        with self.transaction() as data:
+            if "bill_amounts" not in data:
+                data["bill_amounts"] = {}
+            
+            data["bill_amounts"].update(bill_data)
+        # 다른 프로세스(일괄 전처리 워커)와 다음 요청이 바로 읽으므로 지연 쓰기 중이어도 즉시 반영
+        self.flush()
         print(f"고지서 금액 일괄 업데이트: {len(bill_data)}개 고객사")
     
     # === 청구서 결과 관련 메서드 ===
@@ -285,54 +508,53 @@ class AdminStorage:
         return data.get("processed_files", {})
     
     def save_processed_files(self, company_name, processed_files):
-        """청구서 처리 결과 저장 (파일에서 읽고 저장)"""
-        data = self.load_data()
-        if "processed_files" not in data:
-            data["processed_files"] = {}
-        
-        data["processed_files"][company_name] = {
-            "processed_files": processed_files,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.save_data_direct(data)
+        """청구서 처리 결과 저장 (하나의 트랜잭션으로 읽고 저장)"""
+        with self.transaction() as data:
+            if "processed_files" not in data:
+                data["processed_files"] = {}
+            
+            data["processed_files"][company_name] = {
+                "processed_files": processed_files,
+                "timestamp": datetime.now().isoformat()
+            }
         print(f"{company_name} 청구서 결과 저장: {len(processed_files)}개 파일")
     
     def clear_processed_files(self, company_name):
-        """특정 회사의 청구서 결과 초기화 (파일에서 읽고 저장)"""
-        data = self.load_data()
-        if "processed_files" in data and company_name in data["processed_files"]:
-            del data["processed_files"][company_name]
-            self.save_data_direct(data)
-            print(f"{company_name} 청구서 결과 초기화")
+        """특정 회사의 청구서 결과 초기화 (하나의 트랜잭션으로 읽고 저장)"""
+        with self.transaction() as data:
+            if "processed_files" in data and company_name in data["processed_files"]:
+                del data["processed_files"][company_name]
+                print(f"{company_name} 청구서 결과 초기화")
     
     def clear_all(self):
         """모든 데이터 초기화. 청구서 공통(대표이사명)은 유지 — 전체 초기화로 사라지지 않게 함."""
-        existing = self.load_data()
-        inv = existing.get("invoice_common_settings")
-        if not isinstance(inv, dict):
-            inv = {}
-        invoice_common_settings = {
-            "ceo_name": str(inv.get("ceo_name") or ""),
-            "updated_at": inv.get("updated_at"),
-        }
+        with self.transaction() as data:
+            inv = data.get("invoice_common_settings")
+            if not isinstance(inv, dict):
+                inv = {}
+            invoice_common_settings = {
+                "ceo_name": str(inv.get("ceo_name") or ""),
+                "updated_at": inv.get("updated_at"),
+            }
 
-        default_data = {
-            "bill_amounts": {},
-            "processed_files": {},
-            "uploaded_files": {},
-            "collected_files": {},
-            "wconcept_settings": {
-                "license_count": 40,
-                "license_cost": 80000,
-                "updated_at": None
-            },
-            "sk_settings": {
-                "license_cost": 80000,
-                "updated_at": None
-            },
-            "invoice_common_settings": invoice_common_settings,
-        }
-        self.save_data_direct(default_data)
+            default_data = {
+                "bill_amounts": {},
+                "processed_files": {},
+                "uploaded_files": {},
+                "collected_files": {},
+                "wconcept_settings": {
+                    "license_count": 40,
+                    "license_cost": 80000,
+                    "updated_at": None
+                },
+                "sk_settings": {
+                    "license_cost": 80000,
+                    "updated_at": None
+                },
+                "invoice_common_settings": invoice_common_settings,
+            }
+            data.clear()
+            data.update(default_data)
         print("admin_storage.json 전체 초기화 완료 (대표이사명/청구서 공통 설정 유지)")
     
     # === 업로드된 파일 관련 메서드 ===
@@ -344,13 +566,38 @@ class AdminStorage:
     
     def save_uploaded_files(self, company_name, uploaded_files):
         """업로드된 파일 목록 저장"""
-        data = self.load_data()
-        if "uploaded_files" not in data:
-            data["uploaded_files"] = {}
-        data["uploaded_files"][company_name] = uploaded_files
-        self.save_data_direct(data)
+        with self.transaction() as data:
+            if "uploaded_files" not in data:
+                data["uploaded_files"] = {}
+            data["uploaded_files"][company_name] = uploaded_files
+        # 다른 프로세스(일괄 전처리 워커)와 다음 요청이 바로 읽으므로 지연 쓰기 중이어도 즉시 반영
+        self.flush()
         print(f"{company_name} 업로드된 파일 목록 저장: {len(uploaded_files)}개")
     
+    def update_uploaded_slots(self, company_name, slot_files, replace=False):
+        """
+        업로드 슬롯 여러 개를 한 번의 읽기/쓰기로 갱신하고 갱신된 슬롯 목록 반환.
+        slot_files: {슬롯 인덱스: 파일명}, replace=True면 기존 슬롯을 비우고 시작
+        """
+        invalid = [index for index in slot_files if index < 0]
+        if invalid:
+            raise ValueError(f"잘못된 슬롯 인덱스: {invalid}")
+        with self.transaction() as data:
+            if "uploaded_files" not in data:
+                data["uploaded_files"] = {}
+            company_files = [] if replace else data["uploaded_files"].get(company_name, [])
+            if not isinstance(company_files, list):
+                company_files = []
+            for index, filename in sorted(slot_files.items()):
+                while len(company_files) <= index:
+                    company_files.append(None)
+                company_files[index] = filename
+            data["uploaded_files"][company_name] = company_files
+        # 다른 프로세스(일괄 전처리 워커)와 다음 요청이 바로 읽으므로 지연 쓰기 중이어도 즉시 반영
+        self.flush()
+        print(f"{company_name} 업로드 슬롯 일괄 저장: {len(slot_files)}개")
+        return company_files
+    
     # === 수집된 파일 관련 메서드 ===
     
     def get_collected_files(self):
@@ -360,11 +607,10 @@ class AdminStorage:
     
     def save_collected_files(self, company_name, collected_files):
         """수집된 파일 목록 저장"""
-        data = self.load_data()
-        if "collected_files" not in data:
-            data["collected_files"] = {}
-        data["collected_files"][company_name] = collected_files
-        self.save_data_direct(data)
+        with self.transaction() as data:
+            if "collected_files" not in data:
+                data["collected_files"] = {}
+            data["collected_files"][company_name] = collected_files
         print(f"{company_name} 수집된 파일 목록 저장: {len(collected_files)}개")
 
     # === W컨셉 라이선스 설정 관련 메서드 ===
@@ -381,18 +627,17 @@ class AdminStorage:
 
     def save_wconcept_settings(self, license_count=None, license_cost=None):
         """W컨셉 실행 팝업 기본값 저장"""
-        data = self.load_data()
-        if "wconcept_settings" not in data:
-            data["wconcept_settings"] = {}
+        with self.transaction() as data:
+            if "wconcept_settings" not in data:
+                data["wconcept_settings"] = {}
 
-        current = data["wconcept_settings"]
-        if license_count is not None:
-            current["license_count"] = int(license_count)
-        if license_cost is not None:
-            current["license_cost"] = int(license_cost)
-        current["updated_at"] = datetime.now().isoformat()
+            current = data["wconcept_settings"]
+            if license_count is not None:
+                current["license_count"] = int(license_count)
+            if license_cost is not None:
+                current["license_cost"] = int(license_cost)
+            current["updated_at"] = datetime.now().isoformat()
 
-        self.save_data_direct(data)
         print(
             f"W컨셉 설정 저장: license_count={current.get('license_count')}, "
             f"license_cost={current.get('license_cost')}"
@@ -409,16 +654,15 @@ class AdminStorage:
 
     def save_sk_settings(self, license_cost=None):
         """SK일렉링크 실행 팝업 기본값 저장"""
-        data = self.load_data()
-        if "sk_settings" not in data:
-            data["sk_settings"] = {}
+        with self.transaction() as data:
+            if "sk_settings" not in data:
+                data["sk_settings"] = {}
 
-        current = data["sk_settings"]
-        if license_cost is not None:
-            current["license_cost"] = int(license_cost)
-        current["updated_at"] = datetime.now().isoformat()
+            current = data["sk_settings"]
+            if license_cost is not None:
+                current["license_cost"] = int(license_cost)
+            current["updated_at"] = datetime.now().isoformat()
 
-        self.save_data_direct(data)
         print(f"SK일렉링크 설정 저장: license_cost={current.get('license_cost')}")
 
     def get_invoice_common_settings(self):
@@ -436,14 +680,13 @@ class AdminStorage:
         }
 
     def save_invoice_common_settings(self, ceo_name=None):
-        data = self.load_data()
-        if "invoice_common_settings" not in data:
-            data["invoice_common_settings"] = {}
-        cur = data["invoice_common_settings"]
-        if ceo_name is not None:
-            cur["ceo_name"] = ceo_name if isinstance(ceo_name, str) else str(ceo_name)
-        cur["updated_at"] = datetime.now().isoformat()
-        self.save_data_direct(data)
+        with self.transaction() as data:
+            if "invoice_common_settings" not in data:
+                data["invoice_common_settings"] = {}
+            cur = data["invoice_common_settings"]
+            if ceo_name is not None:
+                cur["ceo_name"] = ceo_name if isinstance(ceo_name, str) else str(ceo_name)
+            cur["updated_at"] = datetime.now().isoformat()
         print(f"청구서 공통 설정 저장: ceo_name={cur.get('ceo_name')!r}")
     
     # === 마이그레이션 메서드 ===
@@ -508,3 +751,14 @@ class AdminStorage:
         except Exception as e:
             print(f"마이그레이션 실패: {e}")
             return False
+
+
+def create_admin_storage():
+    """ADMIN_STORAGE_BACKEND 환경변수(json|sqlite, 기본 json)에 맞는 저장소 생성"""
+    backend = os.environ.get("ADMIN_STORAGE_BACKEND", "json").strip().lower()
+    if backend == "sqlite":
+        from .sqlite_admin_storage import SQLiteAdminStorage
+        return SQLiteAdminStorage()
+    # ADMIN_STORAGE_WRITE_BEHIND_MS > 0이면 그 시간 안의 변경을 모아 한 번에 저장 (JSON 백엔드 전용)
+    write_behind_ms = int(os.environ.get("ADMIN_STORAGE_WRITE_BEHIND_MS", "0") or 0)
+    return AdminStorage(write_behind_ms=write_behind_ms)
@@ -0,0 +1,214 @@
+"""
+업로드/수집 입력 파일용 내용 주소(SHA-256) 저장소
+
+같은 내용은 temp_processing/.blobs/<앞 2자리>/<sha256>에 한 번만 저장하고,
+작업 디렉토리(temp_processing, kolon_inputs)에는 reflink → 복사 순으로 연결한다.
+- 하드링크는 blob과 inode를 공유해 작업 파일을 제자리 수정하면 blob과 다른 링크까지 바뀌므로
+  파일을 읽기만 하는 곳(read_only=True)에서만 쓴다.
+- 작업 파일의 mtime은 연결 시각으로 갱신한다 (최신 파일 선택/보관 정책이 업로드 시각을 보도록).
+- 하드링크가 남지 않은 blob(링크 수 1)은 collect_garbage()로 정리한다 (reflink/복사본은 blob과 무관하게 유지).
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+BLOB_DIR = os.path.join("temp_processing", ".blobs")
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409  # <linux/fs.h> ioctl: 같은 파일시스템 내 copy-on-write 복제
+
+
+def _stat_key(stat_result):
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._digest_cache = {}   # 원본 파일 stat → sha256 (같은 수집 파일 재업로드 시 재해싱 생략)
+        self._blob_stats = {}     # sha256 → 저장 시점 blob stat (제자리 수정 감지)
+        self._pinned_count = 0    # 저장~링크 사이인 작업 수 (그동안 정리 보류)
+        os.makedirs(self.root, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    # === 저장 ===
+
+    def _commit(self, temp_path, digest):
+        """해싱을 마친 임시 파일을 blob으로 등록 (이미 있으면 임시 파일 폐기)"""
+        path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            if self._is_intact(digest):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+                self._blob_stats[digest] = _stat_key(os.stat(path))
+        return digest
+
+    def _is_intact(self, digest):
+        """blob이 있고 저장 이후 바뀌지 않았는지 (링크된 입력을 누가 제자리 수정했으면 폐기)"""
+        path = self.blob_path(digest)
+        try:
+            current = _stat_key(os.stat(path))
+        except OSError:
+            self._blob_stats.pop(digest, None)
+            return False
+        recorded = self._blob_stats.get(digest)
+        if recorded is None:
+            # 이전 프로세스가 만든 blob: 내용을 한 번 검증하고 기록
+            if self._hash_file(path) != digest:
+                os.remove(path)
+                return False
+            self._blob_stats[digest] = current
+            return True
+        if current != recorded:
+            print(f"blob이 저장 후 변경되어 폐기: {digest}")
+            os.remove(path)
+            self._blob_stats.pop(digest, None)
+            return False
+        return True
+
+    def _hash_file(self, path):
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def put_stream(self, stream):
+        """파일 객체 내용을 해싱하면서 저장하고 sha256 반환"""
+        hasher = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".incoming_")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    out.write(chunk)
+            return self._commit(temp_path, hasher.hexdigest())
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put_file(self, source_path):
+        """파일을 저장하고 sha256 반환. 같은 원본(stat 동일)을 다시 넣으면 해싱/복사 생략"""
+        source_key = _stat_key(os.stat(source_path))
+        digest = self._digest_cache.get(source_key)
+        if digest is not None:
+            with self._lock:
+                if self._is_intact(digest):
+                    return digest
+        with open(source_path, "rb") as f:
+            digest = self.put_stream(f)
+        self._digest_cache[source_key] = digest
+        return digest
+
+    # === 작업 디렉토리에 연결 ===
+
+    def materialize(self, digest, target_path, read_only=False):
+        """
+        blob을 target_path에 연결하고 사용한 방식(link/reflink/copy) 반환 (기존 파일은 교체).
+        read_only=True면 하드링크를 먼저 시도한다 (소비자가 파일을 수정하지 않을 때만).
+        """
+        source = self.blob_path(digest)
+        temp_path = os.path.join(
+            os.path.dirname(target_path) or ".", f".{os.path.basename(target_path)}.{threading.get_ident()}.tmp"
+        )
+        try:
+            method = self._link_or_clone(source, temp_path, read_only)
+            os.replace(temp_path, target_path)
+            if method == "link":
+                # 하드링크는 blob과 inode를 공유하므로 바뀐 mtime을 blob 기록에도 반영 (제자리 수정으로 오인 방지)
+                with self._lock:
+                    os.utime(target_path)
+                    self._blob_stats[digest] = _stat_key(os.stat(source))
+            else:
+                os.utime(target_path)
+            return method
+        finally:
+            # 대상이 이미 같은 blob의 링크면 rename이 아무 일도 하지 않아 임시 링크가 남는다.
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+    def _link_or_clone(self, source, target_path, read_only=False):
+        if read_only:
+            try:
+                os.link(source, target_path)
+                return "link"
+            except OSError:
+                pass
+        try:
+            with open(source, "rb") as src, open(target_path, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, target_path)
+            return "reflink"
+        except OSError:
+            pass
+        shutil.copy2(source, target_path)
+        return "copy"
+
+    def _store(self, put, target_path, read_only=False):
+        with self._lock:
+            self._pinned_count += 1
+        try:
+            digest = put()
+            return digest, self.materialize(digest, target_path, read_only)
+        finally:
+            with self._lock:
+                self._pinned_count -= 1
+
+    def store_file(self, source_path, target_path, read_only=False):
+        """원본 파일을 저장소에 넣고 target_path에 연결. (sha256, 방식) 반환"""
+        return self._store(lambda: self.put_file(source_path), target_path, read_only)
+
+    def store_stream(self, stream, target_path, read_only=False):
+        """업로드 스트림을 저장소에 넣고 target_path에 연결. (sha256, 방식) 반환"""
+        return self._store(lambda: self.put_stream(stream), target_path, read_only)
+
+    # === 정리 ===
+
+    def collect_garbage(self):
+        """작업 디렉토리 링크가 모두 사라진 blob 삭제. (삭제 수, 회수 바이트) 반환"""
+        removed = 0
+        reclaimed = 0
+        with self._lock:
+            if self._pinned_count:
+                # 저장 후 링크 전인 blob이 있을 수 있으므로 다음 기회에 정리
+                return 0, 0
+            for dirpath, _dirnames, filenames in os.walk(self.root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat_result = os.stat(path)
+                        # .incoming_ 임시 파일은 쓰는 중일 수 있으므로 건드리지 않는다.
+                        if filename.startswith(".incoming_") or stat_result.st_nlink > 1:
+                            continue
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    self._blob_stats.pop(filename, None)
+                    removed += 1
+                    reclaimed += stat_result.st_size
+        if removed:
+            print(f"blob 정리: {removed}개, {reclaimed:,} bytes 회수")
+        return removed, reclaimed
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """프로세스 전역 blob 저장소"""
+    global _blob_store
+    if _blob_store is None:
+        with _blob_store_lock:
+            if _blob_store is None:
+                _blob_store = BlobStore()
+    return _blob_store
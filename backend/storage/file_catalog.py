@@ -0,0 +1,377 @@
+"""
+관리 디렉토리(/app/downloads, temp_processing, kolon_inputs, 고지서 PDF)의 파일 색인
+
+파일명/디렉토리/크기/시간/고객사/종류/생성 작업을 메모리에 유지하고 이름·고객사·종류·시간 범위로 조회한다.
+- Linux: inotify(ctypes) 이벤트를 조회 직전에 비블로킹으로 읽어 반영 (커널이 이벤트를 먼저 큐에 넣으므로
+  방금 만든 파일도 빠짐없이 보임)
+- 그 외/inotify 실패: 조회할 때 디렉토리 mtime을 확인해 바뀐 디렉토리만 다시 스캔하고,
+  결과 파일은 다시 stat 해서 같은 이름으로 덮어쓴 파일의 시간도 반영
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import threading
+
+DOWNLOAD_DIR = "/app/downloads"
+TEMP_DIR = "temp_processing"
+KOLON_INPUT_DIR = os.path.join(TEMP_DIR, "kolon_inputs")
+BILL_PDF_DIR = "bill_pdfs"
+BILL_IMAGE_DIR = "bill_images"
+
+DEFAULT_DIRECTORIES = (DOWNLOAD_DIR, TEMP_DIR, KOLON_INPUT_DIR, BILL_PDF_DIR, BILL_IMAGE_DIR)
+
+# 파일명에 들어가는 표기 → 고객사 (긴 표기부터 검사)
+COMPANY_ALIASES = (
+    ("디싸이더스/애드프로젝트", "디싸이더스/애드프로젝트"),
+    ("디싸이더스애드프로젝트", "디싸이더스/애드프로젝트"),
+    ("매스프레소(콴다)", "매스프레소(콴다)"),
+    ("SK일렉링크", "SK일렉링크"),
+    ("코오롱FnC", "코오롱Fnc"),
+    ("코오롱Fnc", "코오롱Fnc"),
+    ("디싸이더스", "디싸이더스/애드프로젝트"),
+    ("매스프레소", "매스프레소(콴다)"),
+    ("하이픈스", "매스프레소(콴다)"),
+    ("메디빌더", "메디빌더"),
+    ("앤하우스", "앤하우스"),
+    ("W컨셉", "W컨셉"),
+    ("코오롱", "코오롱Fnc"),
+    ("구쁘", "구쁘"),
+)
+
+# inotify 상수 (<sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def detect_company(filename):
+    for alias, company_name in COMPANY_ALIASES:
+        if alias in filename:
+            return company_name
+    return None
+
+
+def classify_kind(filename, directory):
+    """sms / call / chat / invoice / bill_pdf / other"""
+    if os.path.basename(os.path.normpath(directory)) in (BILL_PDF_DIR, BILL_IMAGE_DIR):
+        return "bill_pdf"
+    if "청구내역서" in filename:
+        return "invoice"
+    if "발송이력" in filename or "SMS" in filename:
+        return "sms"
+    if "통화내역" in filename or "CALL" in filename:
+        return "call"
+    if "채팅" in filename or "CHAT" in filename:
+        return "chat"
+    return "other"
+
+
+class _Inotify:
+    """비블로킹 inotify 핸들 (ctypes). 사용할 수 없으면 생성 시 OSError"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+
+    def add_watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch 실패: {path}")
+        return wd
+
+    def read_events(self):
+        """대기 중인 이벤트 (wd, mask, name) 목록. 없으면 빈 목록"""
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buffer):
+                wd, mask, _cookie, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = buffer[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+                events.append((wd, mask, os.fsdecode(name)))
+
+
+class FileCatalog:
+    """관리 디렉토리 파일 색인 (스레드 안전)"""
+
+    def __init__(self, directories=DEFAULT_DIRECTORIES, use_inotify=True):
+        self.directories = tuple(directories)
+        self._lock = threading.RLock()
+        self._entries = {}        # path → entry
+        self._by_name = {}        # 파일명 → {directory: path}
+        self._by_company = {}     # 고객사 → set(path)
+        self._by_kind = {}        # 종류 → set(path)
+        self._tags = {}           # path → 호출자가 지정한 company/kind/task_id
+        self._dir_mtimes = {}     # 디렉토리 → 마지막 스캔 시 mtime_ns (폴링 모드)
+        self._watches = {}        # wd → directory
+        self._watched_dirs = {}   # directory → wd
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"파일 카탈로그: inotify 사용 불가, 디렉토리 mtime 확인으로 대체 ({e})")
+        for directory in self.directories:
+            self._sync_directory(directory)
+
+    # === 색인 유지 ===
+
+    def _add_entry(self, directory, filename, stat_result):
+        path = os.path.join(directory, filename)
+        self._remove_entry(path)
+        tags = self._tags.get(path, {})
+        entry = {
+            "name": filename,
+            "directory": directory,
+            "path": path,
+            "size": stat_result.st_size,
+            "mtime": stat_result.st_mtime,
+            "ctime": stat_result.st_ctime,
+            "company": tags.get("company") or detect_company(filename),
+            "kind": tags.get("kind") or classify_kind(filename, directory),
+            "task_id": tags.get("task_id"),
+        }
+        self._entries[path] = entry
+        self._by_name.setdefault(filename, {})[directory] = path
+        if entry["company"]:
+            self._by_company.setdefault(entry["company"], set()).add(path)
+        self._by_kind.setdefault(entry["kind"], set()).add(path)
+
+    def _remove_entry(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            return
+        paths = self._by_name.get(entry["name"])
+        if paths is not None:
+            paths.pop(entry["directory"], None)
+            if not paths:
+                del self._by_name[entry["name"]]
+        if entry["company"]:
+            self._by_company.get(entry["company"], set()).discard(path)
+        self._by_kind.get(entry["kind"], set()).discard(path)
+
+    def _refresh_path(self, directory, filename):
+        path = os.path.join(directory, filename)
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            self._remove_entry(path)
+            self._tags.pop(path, None)
+            return
+        if os.path.isfile(path):
+            self._add_entry(directory, filename, stat_result)
+
+    def _scan_directory(self, directory):
+        for path in [p for p, e in self._entries.items() if e["directory"] == directory]:
+            self._remove_entry(path)
+        try:
+            with os.scandir(directory) as iterator:
+                for item in iterator:
+                    try:
+                        if item.is_file():
+                            self._add_entry(directory, item.name, item.stat())
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    def _sync_directory(self, directory):
+        """감시 등록(가능하면) 후 전체 스캔"""
+        if self._inotify is not None and directory not in self._watched_dirs and os.path.isdir(directory):
+            try:
+                wd = self._inotify.add_watch(directory)
+                self._watches[wd] = directory
+                self._watched_dirs[directory] = wd
+            except OSError as e:
+                print(f"파일 카탈로그: {directory} 감시 등록 실패 ({e})")
+        try:
+            self._dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._dir_mtimes[directory] = None
+        self._scan_directory(directory)
+
+    def _catch_up(self):
+        """조회 전에 색인을 최신으로 (inotify 이벤트 반영 + 감시되지 않는 디렉토리 mtime 확인)"""
+        if self._inotify is not None:
+            try:
+                events = self._inotify.read_events()
+            except OSError as e:
+                print(f"파일 카탈로그: inotify 읽기 실패, 폴링으로 전환 ({e})")
+                self._inotify = None
+                self._watches.clear()
+                self._watched_dirs.clear()
+                events = []
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    # 이벤트 유실 → 전체 재스캔
+                    for directory in self.directories:
+                        self._scan_directory(directory)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # 디렉토리 자체가 사라짐 → 폴링 대상으로 돌리고 다시 생기면 재등록
+                    self._watches.pop(wd, None)
+                    self._watched_dirs.pop(directory, None)
+                    self._dir_mtimes[directory] = None
+                    self._scan_directory(directory)
+                    continue
+                if name and not mask & IN_ISDIR:
+                    self._refresh_path(directory, name)
+
+        for directory in self.directories:
+            if directory in self._watched_dirs:
+                continue
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != self._dir_mtimes.get(directory):
+                self._sync_directory(directory)
+
+    # === 조회 ===
+
+    def lookup(self, filename, directories=None):
+        """파일명으로 첫 번째 항목 조회 (directories 순서대로 우선), 없으면 None"""
+        with self._lock:
+            self._catch_up()
+            paths = self._by_name.get(filename)
+            if not paths:
+                return None
+            for directory in directories or self.directories:
+                path = paths.get(directory)
+                if path is not None:
+                    return self._current(path)
+            return None
+
+    def exists(self, filename, directories=None):
+        return self.lookup(filename, directories) is not None
+
+    def find(self, company=None, kind=None, directories=None, since=None, match=None, time_key="ctime"):
+        """
+        조건에 맞는 항목을 최신순(time_key 기준)으로 반환.
+        since: 이 시각(epoch 초) 이후 항목만, match: 파일명 조건 함수
+        """
+        with self._lock:
+            self._catch_up()
+            candidates = None
+            if company is not None:
+                candidates = set(self._by_company.get(company, ()))
+            if kind is not None:
+                kind_paths = self._by_kind.get(kind, set())
+                candidates = kind_paths.copy() if candidates is None else candidates & kind_paths
+            if candidates is None:
+                candidates = self._entries.keys()
+            allowed_dirs = set(directories) if directories else None
+
+            results = []
+            for path in list(candidates):
+                entry = self._entries.get(path)
+                if entry is None:
+                    continue
+                if allowed_dirs is not None and entry["directory"] not in allowed_dirs:
+                    continue
+                if match is not None and not match(entry["name"]):
+                    continue
+                entry = self._current(path)
+                if entry is None:
+                    continue
+                if since is not None and entry[time_key] < since:
+                    continue
+                results.append(entry)
+            results.sort(key=lambda e: e[time_key], reverse=True)
+            return results
+
+    def _current(self, path):
+        """조회 결과 복사본. 폴링 모드에서는 같은 이름으로 덮어쓴 파일을 반영하도록 다시 stat"""
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        if entry["directory"] not in self._watched_dirs:
+            self._refresh_path(entry["directory"], entry["name"])
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+        return dict(entry)
+
+    # === 갱신 ===
+
+    def tag(self, filename, directories=None, **tags):
+        """파일에 company/kind/task_id를 지정 (파일이 지워질 때까지 유지). 지정한 항목 반환"""
+        with self._lock:
+            entry = self.lookup(filename, directories)
+            if entry is None:
+                return None
+            path = entry["path"]
+            self._tags.setdefault(path, {}).update({k: v for k, v in tags.items() if v is not None})
+            self._refresh_path(entry["directory"], entry["name"])
+            return self._current(path)
+
+    def invalidate(self, path):
+        """방금 만들거나 지운 파일을 바로 반영"""
+        with self._lock:
+            directory, filename = os.path.split(path)
+            if directory in self.directories:
+                self._refresh_path(directory, filename)
+
+    def refresh(self):
+        """전체 재스캔"""
+        with self._lock:
+            for directory in self.directories:
+                self._sync_directory(directory)
+
+    def stats(self):
+        with self._lock:
+            self._catch_up()
+            return {
+                "files": len(self._entries),
+                "inotify": self._inotify is not None,
+                "watched_directories": sorted(self._watched_dirs),
+                "by_kind": {kind: len(paths) for kind, paths in self._by_kind.items() if paths},
+            }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_file_catalog():
+    """프로세스 전역 카탈로그 (처음 호출할 때 생성·스캔)"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = FileCatalog()
+    return _catalog
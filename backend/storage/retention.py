@@ -0,0 +1,219 @@
+"""
+작업 디렉토리 보관 정책 (디렉토리별 용량/파일 수 예산)
+
+주기적으로 각 디렉토리를 확인해
+1) max_age_days보다 오래 쓰지 않은 파일을 지우고
+2) 그래도 max_bytes / max_files를 넘으면 가장 오래 쓰지 않은(LRU) 파일부터 지운다.
+AdminStorage의 uploaded_files / processed_files / collected_files가 가리키는 파일,
+min_age_minutes 이내에 바뀐 파일(작업 중일 수 있음), 저장소 파일은 지우지 않는다.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from .file_catalog import get_file_catalog, detect_company
+from .blob_store import get_blob_store
+from ..preprocessing.ingestion import get_table_cache
+from ..utils.metrics import registry as metrics_registry
+
+MB = 1024 * 1024
+
+DEFAULT_BUDGETS = {
+    "/app/downloads": {"max_bytes": 2048 * MB, "max_files": 2000, "max_age_days": 60},
+    "temp_processing": {"max_bytes": 2048 * MB, "max_files": 2000, "max_age_days": 60},
+    "bill_images": {"max_bytes": 512 * MB, "max_files": 500, "max_age_days": 180, "keep_latest_per_company": True},
+    "bill_pdfs": {"max_bytes": 512 * MB, "max_files": 500, "max_age_days": 180, "keep_latest_per_company": True},
+}
+DEFAULT_MIN_AGE_MINUTES = 60
+
+RETENTION_RECLAIMED = metrics_registry.counter(
+    "retention_reclaimed_bytes_total", "보관 정책으로 회수한 바이트", ("directory",)
+)
+RETENTION_EVICTED = metrics_registry.counter(
+    "retention_evicted_files_total", "보관 정책으로 삭제한 파일 수", ("directory", "reason")
+)
+
+
+def _referenced_names(value, names):
+    """저장소 섹션 안의 문자열 값(파일명/경로)을 파일명으로 모은다"""
+    if isinstance(value, str):
+        if value:
+            names.add(os.path.basename(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            _referenced_names(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            _referenced_names(item, names)
+    return names
+
+
+def load_budgets():
+    """RETENTION_BUDGETS 환경변수(JSON, 디렉토리별 일부 키만 덮어쓰기)를 기본 예산에 반영"""
+    budgets = {directory: dict(budget) for directory, budget in DEFAULT_BUDGETS.items()}
+    override = os.environ.get("RETENTION_BUDGETS", "").strip()
+    if override:
+        try:
+            for directory, budget in json.loads(override).items():
+                budgets.setdefault(directory, {}).update(budget)
+        except (ValueError, AttributeError) as e:
+            print(f"RETENTION_BUDGETS 형식 오류, 기본 예산 사용: {e}")
+    return budgets
+
+
+class RetentionManager:
+    def __init__(self, admin_storage, budgets=None, min_age_minutes=DEFAULT_MIN_AGE_MINUTES):
+        self.admin_storage = admin_storage
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.min_age_minutes = min_age_minutes
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_report = None
+
+    def _protected_names(self):
+        data = self.admin_storage.load_data()
+        names = set()
+        for section in ("uploaded_files", "processed_files", "collected_files"):
+            _referenced_names(data.get(section, {}), names)
+        storage_name = os.path.basename(self.admin_storage.storage_file)
+        names.update({
+            "admin_storage.json", storage_name,
+            f"{storage_name}.lock", f"{storage_name}-wal", f"{storage_name}-shm",
+        })
+        return names
+
+    def _plan_directory(self, directory, budget, protected_names, now):
+        """(삭제 대상 [(항목, 사유)], 디렉토리 요약) 반환"""
+        entries = get_file_catalog().find(directories=[directory], time_key="mtime")
+        total_bytes = sum(entry["size"] for entry in entries)
+        summary = {
+            "files": len(entries),
+            "bytes": total_bytes,
+            "max_files": budget.get("max_files"),
+            "max_bytes": budget.get("max_bytes"),
+            "protected": 0,
+        }
+
+        # 고객사별 최신 파일 (현재 월 고지서 등)은 예산과 무관하게 유지
+        latest_per_company = set()
+        if budget.get("keep_latest_per_company"):
+            seen = set()
+            for entry in entries:  # mtime 최신순
+                company = entry["company"] or detect_company(entry["name"]) or entry["name"]
+                if company not in seen:
+                    seen.add(company)
+                    latest_per_company.add(entry["path"])
+
+        min_age = self.min_age_minutes * 60
+        candidates = []
+        for entry in entries:
+            # blob 저장소에서 연결한 입력은 mtime이 원본 시각일 수 있으므로 링크/이름 변경 때 갱신되는 ctime도 본다
+            changed = max(entry["ctime"], entry["mtime"])
+            if (entry["name"] in protected_names or entry["path"] in latest_per_company
+                    or now - changed < min_age):
+                summary["protected"] += 1
+                continue
+            try:
+                atime = os.stat(entry["path"]).st_atime
+            except OSError:
+                continue
+            candidates.append((max(atime, changed), entry))
+        candidates.sort(key=lambda item: item[0])  # 가장 오래 쓰지 않은 순
+
+        evictions = []
+        remaining_files = len(entries)
+        remaining_bytes = total_bytes
+        max_age_days = budget.get("max_age_days")
+        for last_used, entry in candidates:
+            if max_age_days is not None and now - last_used > max_age_days * 86400:
+                reason = "age"
+            elif ((budget.get("max_files") is not None and remaining_files > budget["max_files"]) or
+                  (budget.get("max_bytes") is not None and remaining_bytes > budget["max_bytes"])):
+                reason = "budget"
+            else:
+                continue
+            evictions.append((entry, reason))
+            remaining_files -= 1
+            remaining_bytes -= entry["size"]
+
+        summary["over_budget_after"] = bool(
+            (budget.get("max_files") is not None and remaining_files > budget["max_files"]) or
+            (budget.get("max_bytes") is not None and remaining_bytes > budget["max_bytes"])
+        )
+        return evictions, summary
+
+    def run_once(self, dry_run=False):
+        """보관 정책을 한 번 적용하고 리포트 반환 (dry_run이면 삭제 대상만 계산)"""
+        with self._lock:
+            started = time.time()
+            protected_names = self._protected_names()
+            report = {
+                "started_at": datetime.now().isoformat(),
+                "dry_run": dry_run,
+                "directories": {},
+                "evicted_files": 0,
+                "reclaimed_bytes": 0,
+            }
+            for directory, budget in self.budgets.items():
+                evictions, summary = self._plan_directory(directory, budget, protected_names, started)
+                evicted = []
+                reclaimed = 0
+                for entry, reason in evictions:
+                    if not dry_run:
+                        try:
+                            os.remove(entry["path"])
+                        except OSError as e:
+                            print(f"보관 정책 삭제 실패: {entry['path']}, 오류: {e}")
+                            continue
+                        get_file_catalog().invalidate(entry["path"])
+                        RETENTION_EVICTED.inc(directory=directory, reason=reason)
+                        RETENTION_RECLAIMED.inc(entry["size"], directory=directory)
+                    evicted.append({"name": entry["name"], "size": entry["size"], "reason": reason})
+                    reclaimed += entry["size"]
+                summary.update({"evicted": evicted, "reclaimed_bytes": reclaimed})
+                report["directories"][directory] = summary
+                report["evicted_files"] += len(evicted)
+                report["reclaimed_bytes"] += reclaimed
+
+            if not dry_run:
+                # 작업 디렉토리 링크가 사라진 입력 blob도 함께 회수
+                blobs_removed, blob_bytes = get_blob_store().collect_garbage()
+                report["blobs_removed"] = blobs_removed
+                report["reclaimed_bytes"] += blob_bytes
+                # 오래 쓰지 않은 입력 표 캐시 항목
+                tables_removed, table_bytes = get_table_cache().prune()
+                report["table_cache_removed"] = tables_removed
+                report["reclaimed_bytes"] += table_bytes
+            report["elapsed_sec"] = round(time.time() - started, 3)
+
+            if report["evicted_files"]:
+                print(f"보관 정책 {'점검' if dry_run else '적용'}: {report['evicted_files']}개, "
+                      f"{report['reclaimed_bytes']:,} bytes")
+            if not dry_run:
+                self.last_report = report
+            return report
+
+    # === 백그라운드 실행 ===
+
+    def start(self, interval_sec):
+        """interval_sec마다 run_once 실행 (0 이하면 시작하지 않음)"""
+        if interval_sec <= 0 or self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval_sec):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"보관 정책 실행 오류: {e}")
+
+        self._thread = threading.Thread(target=loop, name="retention-manager", daemon=True)
+        self._thread.start()
+        print(f"보관 정책 시작: {interval_sec}초 간격")
+
+    def stop(self):
+        self._stop.set()
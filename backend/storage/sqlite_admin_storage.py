@@ -0,0 +1,222 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .admin_storage import AdminStorage, STORAGE_LOCK_WAIT, _clone
+
+# 섹션별 테이블 (행 = 섹션 안의 키 하나, 값은 JSON 문자열)
+SECTIONS = (
+    "bill_amounts",
+    "processed_files",
+    "uploaded_files",
+    "collected_files",
+    "wconcept_settings",
+    "sk_settings",
+    "invoice_common_settings",
+)
+# 위 섹션 외의 최상위 키는 misc 테이블에 통째로 저장
+MISC_TABLE = "misc"
+
+# DB 경로 → (세대 번호, 파싱된 데이터)
+_READ_CACHE = {}
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SQLiteAdminStorage(AdminStorage):
+    """
+    AdminStorage와 같은 메서드를 제공하는 SQLite(WAL) 저장소.
+    변경된 키만 행 단위로 upsert/delete 하므로 한 고객사 변경이 전체 재작성으로 이어지지 않는다.
+    """
+
+    def __init__(self, db_file="admin_storage.db", json_file="admin_storage.json"):
+        storage_dir = os.path.join(os.getcwd(), "temp_processing")
+        os.makedirs(storage_dir, exist_ok=True)
+        self.storage_file = db_file if os.path.isabs(db_file) else os.path.join(storage_dir, db_file)
+        self.json_file = json_file if os.path.isabs(json_file) else os.path.join(storage_dir, json_file)
+        self._local = threading.local()
+        self.ensure_file_exists()
+
+    # === 연결/스키마 ===
+
+    def _connect(self):
+        """스레드별 연결 (sqlite3 연결은 스레드 간 공유 불가)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: BEGIN/COMMIT을 직접 관리
+            conn = sqlite3.connect(self.storage_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def ensure_file_exists(self):
+        """스키마 생성 후 DB가 비어 있으면 기존 JSON 저장소에서 1회 이관"""
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for table in SECTIONS + (MISC_TABLE,):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+        self.migrate_from_json()
+
+    def migrate_from_json(self):
+        """기존 admin_storage.json 내용을 DB로 이관하고 JSON은 .migrated로 보관 (한 번만 실행)"""
+        if not os.path.exists(self.json_file):
+            return True
+        try:
+            with open(self.json_file, "r", encoding="utf-8") as f:
+                content = f.read()
+            json_data = json.loads(content) if content.strip() else {}
+            with self.transaction() as data:
+                if any(data.get(section) for section in SECTIONS):
+                    print(f"DB에 데이터가 있어 JSON 이관 건너뜀: {self.json_file}")
+                    return True
+                data.update(json_data)
+            shutil.move(self.json_file, f"{self.json_file}.migrated")
+            print(f"JSON 저장소 → SQLite 이관 완료: {self.json_file} → {self.storage_file}")
+            return True
+        except Exception as e:
+            print(f"JSON 저장소 이관 실패: {e}")
+            return False
+
+    # === 읽기/쓰기 ===
+
+    def _generation(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _read(self, conn):
+        """현재 세대의 전체 데이터 (캐시된 세대면 재조회 생략). 반환값은 캐시 원본"""
+        generation = self._generation(conn)
+        cached = _READ_CACHE.get(self.storage_file)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        data = {}
+        for section in SECTIONS:
+            data[section] = {
+                key: json.loads(value)
+                for key, value in conn.execute(f"SELECT key, value FROM {section}")
+            }
+        for key, value in conn.execute(f"SELECT key, value FROM {MISC_TABLE}"):
+            data[key] = json.loads(value)
+        _READ_CACHE[self.storage_file] = (generation, data)
+        return data
+
+    def _apply_changes(self, conn, original, data):
+        """original → data 차이만 행 단위로 반영. 변경된 행 수 반환"""
+        changed = 0
+        for section in SECTIONS:
+            old_rows = original.get(section) or {}
+            new_rows = data.get(section) or {}
+            if not isinstance(new_rows, dict):
+                raise ValueError(f"{section} 섹션은 dict여야 합니다")
+            for key, value in new_rows.items():
+                if key not in old_rows or old_rows[key] != value:
+                    conn.execute(
+                        f"INSERT INTO {section} (key, value) VALUES (?, ?) "
+                        f"ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (key, _dumps(value))
+                    )
+                    changed += 1
+            for key in old_rows.keys() - new_rows.keys():
+                conn.execute(f"DELETE FROM {section} WHERE key = ?", (key,))
+                changed += 1
+
+        old_misc = {key: value for key, value in original.items() if key not in SECTIONS}
+        new_misc = {key: value for key, value in data.items() if key not in SECTIONS}
+        for key, value in new_misc.items():
+            if key not in old_misc or old_misc[key] != value:
+                conn.execute(
+                    f"INSERT INTO {MISC_TABLE} (key, value) VALUES (?, ?) "
+                    f"ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, _dumps(value))
+                )
+                changed += 1
+        for key in old_misc.keys() - new_misc.keys():
+            conn.execute(f"DELETE FROM {MISC_TABLE} WHERE key = ?", (key,))
+            changed += 1
+        return changed
+
+    def load_data(self):
+        """저장된 데이터 로드 (세대 번호가 같으면 캐시 복제본 반환)"""
+        conn = self._connect()
+        try:
+            # 여러 테이블을 같은 스냅샷에서 읽도록 읽기 트랜잭션으로 묶는다.
+            conn.execute("BEGIN")
+            try:
+                return _clone(self._read(conn))
+            finally:
+                conn.execute("COMMIT")
+        except Exception as e:
+            print(f"어드민 데이터 로드 실패: {e}")
+            return self._empty_data()
+
+    def save_data_direct(self, data):
+        """전체 데이터 저장 (기존 내용과 다른 행만 반영)"""
+        try:
+            with self.transaction() as current:
+                current.clear()
+                current.update(_clone(data))
+            return True
+        except Exception as e:
+            print(f"어드민 데이터 저장 실패: {e}")
+            return False
+
+    @contextmanager
+    def transaction(self):
+        """
+        BEGIN IMMEDIATE로 쓰기 락을 잡고 읽기-수정-쓰기를 한 번에 처리.
+        바뀐 키만 upsert/delete 하며, 바뀐 내용이 없거나 예외가 나면 롤백한다.
+        """
+        conn = self._connect()
+        with STORAGE_LOCK_WAIT.time(mode="exclusive"):
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            original = self._read(conn)
+            data = _clone(original)
+            yield data
+            if data != original and self._apply_changes(conn, original, data):
+                conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+                # COMMIT 뒤에 읽으면 다른 스레드의 커밋 세대와 섞일 수 있으므로 트랜잭션 안에서 읽는다.
+                generation = self._generation(conn)
+                conn.execute("COMMIT")
+                _READ_CACHE[self.storage_file] = (generation, _clone(data))
+            else:
+                conn.execute("ROLLBACK")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_generation(self):
+        """저장소 버전 식별자 (쓰기마다 증가하는 세대 번호)"""
+        try:
+            return f"sqlite-{self._generation(self._connect())}"
+        except Exception:
+            return "missing"
+
+    # === 백업 ===
+
+    def export_json(self, export_path=None):
+        """
+        현재 데이터를 admin_storage.json과 같은 형식으로 내보내고 경로 반환.
+        기본 위치는 temp_processing/backups (/api/admin-storage/export, /api/reset 직전 백업에서 사용)
+        """
+        if export_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_dir = os.path.join(os.path.dirname(self.storage_file), "backups")
+            os.makedirs(backup_dir, exist_ok=True)
+            export_path = os.path.join(backup_dir, f"admin_storage_export_{timestamp}.json")
+        data = self.load_data()
+        temp_file = f"{export_path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.rename(temp_file, export_path)
+        print(f"어드민 데이터 내보내기 완료: {export_path}")
+        return export_path
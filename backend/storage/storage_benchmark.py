@@ -0,0 +1,197 @@
+"""
+AdminStorage 동시성 벤치마크/스트레스 테스트
+
+N개 reader와 M개 writer(스레드 또는 프로세스)를 동시에 돌려 읽기/쓰기 지연 백분위,
+락 대기 시간, 처리량, 유실된 쓰기 수를 출력한다. 운영 저장소가 아닌 임시 디렉토리를 사용한다.
+
+    python -m backend.storage.storage_benchmark --readers 8 --writers 4 --duration 10
+    python -m backend.storage.storage_benchmark --backend sqlite --mode process
+    python -m backend.storage.storage_benchmark --write-behind-ms 50 --json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .admin_storage import AdminStorage, STORAGE_LOCK_WAIT
+
+BENCH_PREFIX = "__bench_writer_"
+
+
+def _open_storage(backend, storage_dir, write_behind_ms):
+    if backend == "sqlite":
+        from .sqlite_admin_storage import SQLiteAdminStorage
+        return SQLiteAdminStorage(
+            db_file=os.path.join(storage_dir, "admin_storage.db"),
+            json_file=os.path.join(storage_dir, "admin_storage.json")
+        )
+    return AdminStorage(
+        storage_file=os.path.join(storage_dir, "admin_storage.json"),
+        write_behind_ms=write_behind_ms
+    )
+
+
+def _silence_stdout():
+    """저장소의 저장 로그(print)가 측정값에 섞이지 않도록 워커 프로세스 출력 차단"""
+    sys.stdout = open(os.devnull, "w")
+
+
+def _lock_wait_totals():
+    totals = {}
+    for mode in ("shared", "exclusive"):
+        totals[mode] = STORAGE_LOCK_WAIT.summary(mode=mode)
+    return totals
+
+
+def _run_worker(role, index, backend, storage_dir, duration, write_behind_ms):
+    """
+    reader: 대시보드 폴링처럼 get_processed_files/get_uploaded_files/get_bill_amounts 반복
+    writer: 자기 전용 키의 슬롯을 하나씩 늘림(update_uploaded_slots) - 끝난 뒤 슬롯 수로 유실 확인
+    """
+    storage = _open_storage(backend, storage_dir, write_behind_ms)
+    company_name = f"{BENCH_PREFIX}{index}"
+    latencies = []
+    writes = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if role == "reader":
+            storage.get_processed_files()
+            storage.get_uploaded_files()
+            storage.get_bill_amounts()
+        else:
+            storage.update_uploaded_slots(company_name, {writes: f"bench_{index}_{writes}.xlsx"})
+            writes += 1
+        latencies.append(time.perf_counter() - started)
+    storage.flush()
+    return {"role": role, "index": index, "latencies": latencies, "writes": writes}
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+def _latency_summary(latencies, duration):
+    values = sorted(latencies)
+    return {
+        "ops": len(values),
+        "throughput_per_sec": round(len(values) / duration, 1),
+        "p50_ms": round(_percentile(values, 50) * 1000, 3),
+        "p95_ms": round(_percentile(values, 95) * 1000, 3),
+        "p99_ms": round(_percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def run_benchmark(readers=4, writers=2, duration=5.0, mode="thread", backend="json", write_behind_ms=0):
+    """벤치마크 실행 후 결과 dict 반환"""
+    storage_dir = tempfile.mkdtemp(prefix="admin_storage_bench_")
+    try:
+        jobs = [("reader", i) for i in range(readers)] + [("writer", i) for i in range(writers)]
+        if mode == "process":
+            executor = ProcessPoolExecutor(
+                max_workers=len(jobs), mp_context=multiprocessing.get_context("spawn"),
+                initializer=_silence_stdout
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=len(jobs))
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            # 스키마/기본 파일 생성
+            _open_storage(backend, storage_dir, write_behind_ms).flush()
+
+            lock_wait_before = _lock_wait_totals()
+            started = time.perf_counter()
+            with executor:
+                futures = [
+                    executor.submit(_run_worker, role, index, backend, storage_dir, duration, write_behind_ms)
+                    for role, index in jobs
+                ]
+                results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+            lock_wait_after = _lock_wait_totals()
+
+            # 유실 확인: 각 writer가 성공시킨 쓰기 수와 저장된 슬롯 수 비교
+            uploaded_files = _open_storage(backend, storage_dir, 0).get_uploaded_files()
+        lost_updates = 0
+        for result in results:
+            if result["role"] != "writer":
+                continue
+            stored = [slot for slot in uploaded_files.get(f"{BENCH_PREFIX}{result['index']}", []) if slot]
+            lost_updates += max(0, result["writes"] - len(stored))
+
+        read_latencies = [value for r in results if r["role"] == "reader" for value in r["latencies"]]
+        write_latencies = [value for r in results if r["role"] == "writer" for value in r["latencies"]]
+        report = {
+            "backend": backend,
+            "mode": mode,
+            "readers": readers,
+            "writers": writers,
+            "duration_sec": round(elapsed, 2),
+            "write_behind_ms": write_behind_ms,
+            "read": _latency_summary(read_latencies, elapsed),
+            "write": _latency_summary(write_latencies, elapsed),
+            "lost_updates": lost_updates,
+        }
+        if mode == "thread":
+            # 프로세스 모드는 워커별 레지스트리라 부모에서 집계할 수 없음
+            report["lock_wait"] = {}
+            for lock_mode in ("shared", "exclusive"):
+                count = lock_wait_after[lock_mode]["count"] - lock_wait_before[lock_mode]["count"]
+                total = lock_wait_after[lock_mode]["sum"] - lock_wait_before[lock_mode]["sum"]
+                report["lock_wait"][lock_mode] = {
+                    "acquisitions": count,
+                    "total_sec": round(total, 4),
+                    "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                }
+        return report
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+def _print_report(report):
+    print(f"\n=== AdminStorage 벤치마크 ({report['backend']}, {report['mode']}) ===")
+    print(f"reader {report['readers']}개 / writer {report['writers']}개 / {report['duration_sec']}초"
+          f" / 지연 쓰기 {report['write_behind_ms']}ms")
+    for kind, label in (("read", "읽기"), ("write", "쓰기")):
+        s = report[kind]
+        print(f"{label}: {s['ops']}회 ({s['throughput_per_sec']}/s)  "
+              f"p50 {s['p50_ms']}ms  p95 {s['p95_ms']}ms  p99 {s['p99_ms']}ms  max {s['max_ms']}ms")
+    for lock_mode, s in report.get("lock_wait", {}).items():
+        print(f"락 대기({lock_mode}): {s['acquisitions']}회, 합계 {s['total_sec']}초, 평균 {s['avg_ms']}ms")
+    print(f"유실된 쓰기: {report['lost_updates']}건")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AdminStorage 동시성 벤치마크")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0, help="초")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--write-behind-ms", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        readers=args.readers, writers=args.writers, duration=args.duration,
+        mode=args.mode, backend=args.backend, write_behind_ms=args.write_behind_ms
+    )
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+프로세스 공용 Firebase 연결 (앱 / Firestore 클라이언트 / Storage 버킷)
+
+처음 사용할 때 한 번만 초기화하고 모든 모듈이 같은 연결을 재사용한다.
+전처리기마다 delete_app/initialize_app 하던 방식은 DatabaseManager의 연결까지 끊고
+요청마다 인증/TLS 연결을 새로 맺었으므로 여기서 한 곳으로 모은다.
+- 상태 확인 실패는 기록만 하고 연결은 그대로 둔다 (사용 중인 클라이언트를 끊지 않음).
+- 상태 확인이 실패한 뒤 실제 클라이언트 오류가 보고되면(report_error) 새 앱으로 다시 연결한다.
+  기존 앱은 삭제하지 않으므로 진행 중인 작업은 이전 클라이언트로 끝까지 실행된다.
+"""
+
+import threading
+import time
+
+import firebase_admin
+from firebase_admin import credentials, firestore, storage
+
+from .secrets_manager import get_firebase_secret
+
+BUCKET_NAME = "services-e42af.firebasestorage.app"
+HEALTH_CHECK_INTERVAL = 300  # 초
+
+
+class FirebaseRegistry:
+    def __init__(self, bucket_name=BUCKET_NAME, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.bucket_name = bucket_name
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._check_lock = threading.Lock()  # 상태 확인 요청은 한 번에 하나 (클라이언트 조회는 막지 않음)
+        self._app = None
+        self._generation = 0  # 재연결 횟수 (재연결 시 새 이름의 앱 생성)
+        self._firestore = None
+        self._bucket = None
+        self._last_check = None  # (시각, 결과)
+
+    def app(self):
+        """기본 Firebase 앱 (없으면 초기화, 이미 있으면 재사용)"""
+        if self._app is not None:
+            return self._app
+        with self._lock:
+            if self._app is None:
+                # 재연결 후에는 기본 앱을 지우지 않고 새 이름의 앱을 만든다
+                name_kwargs = {"name": f"reconnect-{self._generation}"} if self._generation else {}
+                try:
+                    self._app = firebase_admin.get_app(**name_kwargs)
+                except ValueError:
+                    self._app = firebase_admin.initialize_app(
+                        credentials.Certificate(get_firebase_secret()),
+                        {"storageBucket": self.bucket_name},
+                        **name_kwargs
+                    )
+                    print("Firebase 앱 초기화 완료")
+            return self._app
+
+    def firestore(self):
+        """공용 Firestore 클라이언트"""
+        if self._firestore is None:
+            with self._lock:
+                if self._firestore is None:
+                    self._firestore = firestore.client(app=self.app())
+        return self._firestore
+
+    def bucket(self):
+        """공용 Storage 버킷"""
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    self._bucket = storage.bucket(self.bucket_name, app=self.app())
+        return self._bucket
+
+    def reconnect(self):
+        """다음 사용 시 새 앱/클라이언트로 연결 (기존 앱은 삭제하지 않음 → 사용 중인 클라이언트 유지)"""
+        with self._lock:
+            self._generation += 1
+            self._app = None
+            self._firestore = None
+            self._bucket = None
+            self._last_check = None
+            print(f"Firebase 재연결 예약 (세대 {self._generation})")
+
+    def report_error(self, error):
+        """
+        Firestore/Storage 호출 오류 보고.
+        마지막 상태 확인이 실패한 상태일 때만 재연결한다 (일반 요청 오류로는 연결을 바꾸지 않음).
+        """
+        last_check = self._last_check
+        if last_check is not None and last_check[1]["error"] is not None:
+            print(f"Firebase 상태 확인 실패 후 클라이언트 오류, 재연결: {error}")
+            self.reconnect()
+
+    def health_check(self, force=False):
+        """
+        Firestore/Storage에 가벼운 요청을 보내 연결 상태 확인 (health_check_interval 동안 결과 재사용).
+        실패는 기록만 하고, 재연결은 이후 실제 클라이언트 오류(report_error) 때 한다.
+        """
+        last_check = self._last_check
+        if (not force and last_check is not None and
+                time.time() - last_check[0] < self.health_check_interval):
+            return last_check[1]
+        if not self._check_lock.acquire(blocking=False):
+            # 다른 요청이 확인 중 → 마지막 결과 반환 (없으면 확인이 끝날 때까지 대기)
+            if last_check is not None:
+                return last_check[1]
+            self._check_lock.acquire()
+        try:
+            result = {"firestore": False, "storage": False, "error": None}
+            try:
+                self.firestore().collection("accounts").limit(1).get()
+                result["firestore"] = True
+                self.bucket().get_blob("__health_check__")  # 없는 객체 메타데이터 조회 (None 반환)
+                result["storage"] = True
+            except Exception as e:
+                result["error"] = str(e)
+                print(f"Firebase 상태 확인 실패 (다음 클라이언트 오류 시 재연결): {e}")
+            result["checked_at"] = time.time()
+            self._last_check = (result["checked_at"], result)
+            return result
+        finally:
+            self._check_lock.release()
+
+
+_registry = FirebaseRegistry()
+
+
+def get_firebase_registry():
+    return _registry
@@ -0,0 +1,117 @@
+"""
+Firestore 참조 데이터(부서 코드, 수집 계정 등) TTL 캐시
+
+거의 바뀌지 않는 컬렉션을 실행마다 다시 읽지 않도록 키별로 값을 보관한다.
+- TTL 이내: 메모리 값 사용 (Firestore 요청 없음)
+- TTL 경과 또는 invalidate(): 다음 조회 때 loader로 다시 읽음
+- 조회 실패: 이전 값이 있으면 그대로 사용
+watch()로 컬렉션 스냅샷 리스너를 등록하면 변경 즉시 관련 키를 무효화한다.
+값은 사본을 돌려주므로 호출자가 수정해도 캐시에는 영향이 없다.
+"""
+
+import copy
+import os
+import threading
+import time
+
+from .metrics import registry as metrics_registry
+
+DEFAULT_TTL = 3600  # 초
+
+REFERENCE_CACHE_REQUESTS = metrics_registry.counter(
+    "reference_cache_requests_total", "참조 데이터 캐시 조회 결과", ("key", "result")
+)
+
+
+class ReferenceCache:
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # 키 → {"value", "loaded_at"}
+        self._key_locks = {}
+        self._watches = {}   # 컬렉션 이름 → (리스너 핸들, 무효화할 키 접두어)
+
+    def _lock_for(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, loader, ttl=None):
+        """key 값 반환. 없거나 TTL이 지났으면 loader()로 다시 읽는다."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["loaded_at"] < ttl:
+                REFERENCE_CACHE_REQUESTS.inc(key=key, result="hit")
+                return copy.deepcopy(entry["value"])
+            try:
+                value = loader()
+            except Exception as e:
+                if entry is not None:
+                    print(f"참조 데이터 조회 실패, 이전 값 사용: {key} ({e})")
+                    REFERENCE_CACHE_REQUESTS.inc(key=key, result="stale")
+                    return copy.deepcopy(entry["value"])
+                raise
+            with self._lock:
+                self._entries[key] = {"value": value, "loaded_at": time.time()}
+            REFERENCE_CACHE_REQUESTS.inc(key=key, result="loaded")
+            return copy.deepcopy(value)
+
+    def invalidate(self, prefix=None):
+        """prefix로 시작하는 키(생략 시 전체)를 무효화하고 무효화한 키 수 반환"""
+        with self._lock:
+            keys = [key for key in self._entries if prefix is None or key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            print(f"참조 데이터 캐시 무효화: {', '.join(keys)}")
+        return len(keys)
+
+    def watch(self, collection_ref, prefix):
+        """
+        컬렉션 스냅샷 리스너 등록: 문서가 바뀌면 prefix 키를 무효화한다.
+        (리스너는 등록 직후 초기 스냅샷을 한 번 보내므로 첫 콜백은 무시)
+        """
+        name = collection_ref.id
+        with self._lock:
+            if name in self._watches:
+                return
+        initial = threading.Event()
+
+        def on_snapshot(_docs, _changes, _read_time):
+            if not initial.is_set():
+                initial.set()
+                return
+            self.invalidate(prefix)
+
+        handle = collection_ref.on_snapshot(on_snapshot)
+        with self._lock:
+            self._watches[name] = (handle, prefix)
+        print(f"참조 데이터 변경 감시 시작: {name}")
+
+    def stop_watches(self):
+        with self._lock:
+            watches, self._watches = self._watches, {}
+        for handle, _prefix in watches.values():
+            try:
+                handle.unsubscribe()
+            except Exception:
+                pass
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "ttl_sec": self.ttl,
+                "watching": sorted(self._watches),
+                "entries": {
+                    key: {"age_sec": round(now - entry["loaded_at"], 1)}
+                    for key, entry in self._entries.items()
+                },
+            }
+
+
+_reference_cache = ReferenceCache(ttl=int(os.environ.get("REFERENCE_CACHE_TTL_SEC", DEFAULT_TTL)))
+
+
+def get_reference_cache():
+    return _reference_cache
@@ -465,81 +465,42 @@ const BillingAutomationAdmin = ({ user, onLogout, onShowAccountManager }) => {
           : comp
       ));
 
-      // 순차적으로 파일 업로드
-      for (let i = 0; i < allFiles.length; i++) {
-        const filename = allFiles[i];
+      // 수집 파일을 한 번의 요청으로 업로드하고 슬롯을 일괄 등록
+      const entries = allFiles.map((filename, i) => {
         let fileLabel = 'SMS 데이터';
         if (filename.includes('통화내역')) {
           fileLabel = 'CALL 데이터';
         } else if (filename.includes('채팅')) {
           fileLabel = 'CHAT 데이터';
         }
-        
-        try {
-          const formData = new FormData();
-          formData.append('company_name', companyName);
-          formData.append('collected_filename', filename);
-          formData.append('file_index', i.toString());
-          formData.append('file_label', fileLabel);
-
-          const response = await fetch(`${API_URL}/api/upload-file`, {
-            method: 'POST',
-            body: formData
-          });
+        return { file_index: i, file_label: fileLabel, collected_filename: filename };
+      });
 
-          const result = await response.json();
-          
-          if (response.ok) {
-            console.log(`자동 업로드 완료: ${filename} -> ${result.filename}`);
-            // 파일 업로드 후 상태 업데이트
-            setCompanies(prev => {
-              const updatedCompanies = prev.map(comp => 
-                comp.name === companyName 
-                  ? { ...comp, uploadedFiles: [...(comp.uploadedFiles || []), result.filename] }
-                  : comp
-              );
-              
-              // 업로드된 파일 목록 저장
-              const updatedCompany = updatedCompanies.find(c => c.name === companyName);
-              if (updatedCompany) {
-                fetch(`${API_URL}/api/save-uploaded-files`, {
-                  method: 'POST',
-                  headers: { 'Content-Type': 'application/json' },
-                  body: JSON.stringify({
-                    company_name: companyName,
-                    uploaded_files: updatedCompany.uploadedFiles
-                  })
-                }).catch(error => console.error('업로드된 파일 목록 저장 실패:', error));
-              }
-              
-              return updatedCompanies;
-            });
-          } else {
-            console.error(`자동 업로드 실패 (${filename}):`, result.error);
-          }
-        } catch (error) {
-          console.error(`자동 업로드 오류 (${filename}):`, error);
-        }
-      }
-      
-      console.log('모든 파일 업로드 완료');
-      
-      // 모든 파일 업로드 완료 후 저장
-      const finalCompany = companies.find(c => c.name === companyName);
-      if (finalCompany) {
-        try {
-          await fetch(`${API_URL}/api/save-uploaded-files`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              company_name: companyName,
-              uploaded_files: finalCompany.uploadedFiles || []
-            })
-          });
-        } catch (error) {
-          console.error('업로드된 파일 목록 저장 실패:', error);
-        }
+      const formData = new FormData();
+      formData.append('company_name', companyName);
+      formData.append('replace', 'true');
+      formData.append('entries', JSON.stringify(entries));
+
+      const response = await fetch(`${API_URL}/api/upload-files`, {
+        method: 'POST',
+        body: formData
+      });
+
+      const result = await response.json();
+
+      (result.errors || []).forEach(item => {
+        console.error(`자동 업로드 실패 (${item.file_index}):`, item.error);
+      });
+
+      if (Array.isArray(result.uploaded_files)) {
+        setCompanies(prev => prev.map(comp => 
+          comp.name === companyName 
+            ? { ...comp, uploadedFiles: result.uploaded_files }
+            : comp
+        ));
       }
+
+      console.log(`모든 파일 업로드 완료: ${(result.results || []).length}개`);
       
     } catch (error) {
       console.error('자동 업로드 오류:', error);
@@ -763,6 +724,9 @@ const BillingAutomationAdmin = ({ user, onLogout, onShowAccountManager }) => {
         ? [...syncedUploadedFiles]
         : [...company.uploadedFiles];
       let uploadIndex = 0;
+      const entries = [];
+      const formData = new FormData();
+      formData.append('company_name', companyName);
       
       for (const file of files) {
         // 빈 슬롯 찾기
@@ -775,50 +739,43 @@ const BillingAutomationAdmin = ({ user, onLogout, onShowAccountManager }) => {
           break;
         }
 
-        const fileLabel = company.fileLabels[uploadIndex];
+        const uploadField = `file_${uploadIndex}`;
+        formData.append(uploadField, file);
+        entries.push({
+          file_index: uploadIndex,
+          file_label: company.fileLabels[uploadIndex],
+          upload_field: uploadField
+        });
         
-        const formData = new FormData();
-        formData.append('file', file);
-        formData.append('company_name', companyName);
-        formData.append('file_index', uploadIndex.toString());
-        formData.append('file_label', fileLabel);
+        uploadIndex++;
+      }
 
-        const response = await fetch(`${API_URL}/api/upload-file`, {
+      if (entries.length > 0) {
+        formData.append('entries', JSON.stringify(entries));
+
+        // 선택한 파일을 한 번의 요청으로 업로드하고 슬롯을 일괄 등록
+        const response = await fetch(`${API_URL}/api/upload-files`, {
           method: 'POST',
           body: formData
         });
 
         const result = await response.json();
 
-        if (response.ok) {
-          uploadedFiles[uploadIndex] = result.filename;
-          console.log(`${fileLabel} 업로드 완료: ${result.filename}`);
-        } else {
-          console.error(`${fileLabel} 업로드 실패:`, result.error);
-        }
-        
-        uploadIndex++;
-      }
-      
-      // 상태 업데이트
-      setCompanies(prev => prev.map(comp => 
-        comp.name === companyName 
-          ? { ...comp, uploadedFiles: uploadedFiles }
-          : comp
-      ));
-      
-      // 업로드된 파일 목록 저장
-      try {
-        await fetch(`${API_URL}/api/save-uploaded-files`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            company_name: companyName,
-            uploaded_files: uploadedFiles
-          })
+        (result.results || []).forEach(item => {
+          console.log(`${item.file_label} 업로드 완료: ${item.filename}`);
         });
-      } catch (error) {
-        console.error('업로드된 파일 목록 저장 실패:', error);
+        (result.errors || []).forEach(item => {
+          console.error(`${company.fileLabels[item.file_index]} 업로드 실패:`, item.error);
+        });
+
+        const savedFiles = Array.isArray(result.uploaded_files) ? result.uploaded_files : uploadedFiles;
+        
+        // 상태 업데이트
+        setCompanies(prev => prev.map(comp => 
+          comp.name === companyName 
+            ? { ...comp, uploadedFiles: savedFiles }
+            : comp
+        ));
       }
       
     } catch (error) {
@@ -830,6 +787,21 @@ const BillingAutomationAdmin = ({ user, onLogout, onShowAccountManager }) => {
     event.target.value = '';
   };
 
+  // 전처리는 백그라운드 작업으로 실행되므로 완료/실패할 때까지 작업 상태를 폴링
+  const waitForPreprocessTask = async (taskId) => {
+    while (true) {
+      const response = await fetch(`${API_URL}/api/task-status/${taskId}`);
+      const status = await response.json();
+      if (!response.ok) {
+        return { status: 'failed', error: status.error };
+      }
+      if (status.status === 'completed' || status.status === 'failed') {
+        return status;
+      }
+      await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+  };
+
   const handleProcess = async (companyName, licenseCount = null, licenseCost = null) => {
     const company = companies.find(c => c.name === companyName);
     const syncedUploadedFiles = await syncUploadedFiles(companyName);
@@ -885,9 +857,12 @@ const BillingAutomationAdmin = ({ user, onLogout, onShowAccountManager }) => {
         body: JSON.stringify(requestBody)
       });
 
-      const result = await response.json();
+      const startResult = await response.json();
+      const result = response.ok
+        ? await waitForPreprocessTask(startResult.task_id)
+        : { status: 'failed', error: startResult.error };
       
-      if (response.ok) {
+      if (result.status === 'completed') {
         console.log(`${companyName} 전처리 완료:`, result);
         
         setCompanies(prev => prev.map(comp => 